@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# bench/check_throttle.py
+"""
+Offline check that track listings are paced by the adaptive throttle.
+
+Discovery runs against bench/fake_ytm.py, yt-dlp is bench/stub_ytdlp.py.  The
+stub answers a share of the ``--flat-playlist`` listings with HTTP 429 while
+every download succeeds, so any throttling event can only come from a
+listing.  Each mode (threads, asyncio) runs twice in a fresh child process
+and scratch folder:
+
+    with 429s     the throttle must back off at least once
+    without 429s  the throttle must never back off
+
+Exits with status 1 if a run does not behave like that.
+
+Example:
+
+    python bench/check_throttle.py
+    python bench/check_throttle.py --list-fail-rate 0.5 --artists 4
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+STUB_YTDLP = os.path.join(BENCH_DIR, "stub_ytdlp.py")
+
+sys.path.insert(0, BENCH_DIR)
+from fake_ytm import FakeCatalog, FakeYouTubeMusic  # noqa: E402
+
+
+def run_once(args, workdir):
+    """Discover and download the fake catalog; return the run's counters."""
+    sys.path.insert(0, REPO_DIR)
+    import youtubemusicartistdownloader as ytmad
+
+    os.chdir(workdir)
+    open(ytmad.COOKIE_BOOT_FILE, "w").close()
+    ytmad.YTM_BASE_URL = args.base_url
+    ytmad.YTDLP_BINARY = STUB_YTDLP
+    ytmad.DOWNLOAD_BACKEND = "subprocess"
+    ytmad.RETRY_BACKOFF_BASE = 0.1
+    ytmad.manifest = ytmad.DownloadManifest(ytmad.STATE_DB_FILE)
+    ytmad.library = ytmad.LibraryIndex(ytmad.FINISHED_FOLDER, ytmad.STATE_DB_FILE)
+
+    http_session = ytmad.HttpSession(base_url=args.base_url)
+    pool = ytmad.DiscoveryPool("http", 1, http_session)
+    artists = [(name, None) for name in FakeCatalog(args.artists).artist_names()]
+    with open("check.log", "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            if args.mode == "asyncio":
+                asyncio.run(ytmad.download_items_async(pool.discover(artists), args.threads))
+            else:
+                ytmad.download_items_in_parallel(pool.discover(artists), args.threads)
+        finally:
+            pool.close()
+            http_session.close()
+    ytmad.library.close()
+    ytmad.manifest.close()
+    return ytmad.metrics.snapshot()["counters"]
+
+
+def child_main(args):
+    workdir = tempfile.mkdtemp(prefix=f"ytmad-throttle-{args.mode}-")
+    try:
+        counters = run_once(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(counters), file=sys.__stdout__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that 429s on track listings reach the throttle.")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--artists", type=int, default=2)
+    parser.add_argument("--albums", type=int, default=6, help="albums per artist")
+    parser.add_argument("--list-fail-rate", type=float, default=0.3,
+                        help="probability a listing answers HTTP 429 (stub yt-dlp)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=("threads", "asyncio"), default="threads", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child_main(args)
+
+    catalog = FakeCatalog(args.artists, args.albums, 0)
+    server = FakeYouTubeMusic(("127.0.0.1", 0), catalog, 0.0, 0.0).start()
+    failed = False
+    for mode in ("threads", "asyncio"):
+        for fail_rate in (args.list_fail_rate, 0.0):
+            env = dict(os.environ, YTMAD_STUB_TRACKS="2", YTMAD_STUB_LATENCY="0.01",
+                       YTMAD_STUB_FAIL_RATE="0", YTMAD_STUB_LIST_FAIL_RATE=str(fail_rate))
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", "--mode", mode,
+                   "--base-url", server.base_url, "--threads", str(args.threads), "--artists", str(args.artists)]
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{mode:>8}, 429 rate {fail_rate:.2f}: run failed\n{proc.stderr}")
+                failed = True
+                continue
+            counters = json.loads(proc.stdout.strip().splitlines()[-1])
+            events = counters.get("throttle_events", 0)
+            ok = events > 0 if fail_rate else events == 0
+            failed |= not ok
+            print(f"{mode:>8}, 429 rate {fail_rate:.2f}: {events} throttling events, "
+                  f"{counters.get('albums_committed', 0)} albums committed – {'ok' if ok else 'FAILED'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# bench/fake_ytm.py
+"""
+Local stand-in for music.youtube.com, serving the pages both discovery
+backends read:
+
+    GET  /search?q=…            search results (DOM for Selenium + initialData for HTTP)
+    GET  /channel/<id>          artist page with an "Albums" and a "Singles" shelf, plus
+                                video, "appears on" and related-artist shelves to ignore
+    GET  /browse/<MPAD…>        "see all" grid with infinite scroll (Selenium)
+    POST /youtubei/v1/browse    the same grid as innertube JSON with continuations (HTTP)
+
+The pages are filled from the templates in bench/fixtures/.  Artists are
+synthetic ("Bench Artist 001" …) and every artist has the same number of
+albums and singles, so runs are comparable.  With ``--lang de`` the shelf
+titles are German, like the site in a German locale.
+
+Run standalone to look at the pages in a browser:
+
+    python bench/fake_ytm.py --port 8765 --artists 3 --albums 40
+"""
+
+import argparse
+import json
+import os
+import string
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+API_KEY = "bench-api-key"
+CLIENT_VERSION = "1.20240101.01.00"
+
+# Releases shown inline on the artist page before "see all"
+SHELF_PREVIEW = 10
+
+# Shelf titles per page language: albums, singles, videos, appears on, fans might also like
+SHELF_TITLES = {
+    "en": ("Albums", "Singles", "Videos", "Appears on", "Fans might also like"),
+    "de": ("Alben", "Singles & EPs", "Videos", "Enthalten in", "Fans gefällt auch"),
+}
+
+# Release labels in grid item subtitles ("Single • 2020") per page language: albums, singles
+ITEM_TYPES = {
+    "en": ("Album", "Single"),
+    "de": ("Album", "Single"),
+}
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), "r", encoding="utf-8") as fh:
+        return string.Template(fh.read())
+
+
+def js_escape(text):
+    """Escape *text* for a single-quoted JS string the way YouTube Music does."""
+    out = []
+    for ch in text:
+        if ch.isalnum() or ch in " _-.,:":
+            out.append(ch)
+        elif ord(ch) < 0x100:
+            out.append(f"\\x{ord(ch):02x}")
+        else:
+            out.append(f"\\u{ord(ch):04x}")
+    return "".join(out)
+
+
+def html_escape(text):
+    return (text.replace("&", "&amp;").replace("<", "&lt;")
+            .replace(">", "&gt;").replace('"', "&quot;"))
+
+
+def browse_endpoint(browse_id, page_type=None, params=None):
+    endpoint = {"browseId": browse_id}
+    if params:
+        endpoint["params"] = params
+    if page_type:
+        endpoint["browseEndpointContextSupportedConfigs"] = {
+            "browseEndpointContextMusicConfig": {"pageType": page_type}}
+    return endpoint
+
+
+def two_row_item(browse_id, page_type="MUSIC_PAGE_TYPE_ALBUM", credit=None, label=None):
+    """
+    A carousel/grid item; *credit* ``(channel_id, name)`` links another artist
+    in the subtitle, *label* ("Album", "Single" …) gives it a grid-style subtitle.
+    """
+    item = {"title": {"runs": [{"text": browse_id}]},
+            "navigationEndpoint": {"browseEndpoint": browse_endpoint(browse_id, page_type)}}
+    if label:
+        item["subtitle"] = {"runs": [{"text": label}, {"text": " • "}, {"text": "2020"}]}
+    if credit:
+        artist = browse_endpoint(credit[0], "MUSIC_PAGE_TYPE_ARTIST")
+        item["subtitle"] = {"runs": [{"text": "Album • "},
+                                     {"text": credit[1], "navigationEndpoint": {"browseEndpoint": artist}}]}
+    return {"musicTwoRowItemRenderer": item}
+
+def video_item(video_id):
+    return {"musicTwoRowItemRenderer": {
+        "title": {"runs": [{"text": video_id}]},
+        "navigationEndpoint": {"watchEndpoint": {"videoId": video_id}},
+    }}
+
+
+class FakeCatalog:
+    """The synthetic artists and releases served by FakeYouTubeMusic."""
+
+    SECTIONS = (("Albums", "albums", "a"), ("Singles", "singles", "s"))
+
+    def __init__(self, artists=8, albums=12, singles=6, page_size=10):
+        self.page_size = max(1, page_size)
+        self.counts = {"albums": albums, "singles": singles}
+        self.artists = {f"UCbench{i:04d}": f"Bench Artist {i:03d}" for i in range(1, artists + 1)}
+
+    def artist_names(self):
+        return list(self.artists.values())
+
+    def find_artist(self, query):
+        wanted = query.strip().casefold()
+        for channel_id, name in self.artists.items():
+            if name.casefold() == wanted:
+                return channel_id, name
+        return None, None
+
+    def release_ids(self, channel_id, params):
+        prefix = dict((p, code) for _, p, code in self.SECTIONS)[params]
+        num = channel_id[-4:]
+        return [f"MPREb_{prefix}{num}_{n:04d}" for n in range(1, self.counts[params] + 1)]
+
+    @staticmethod
+    def more_id(channel_id, params):
+        return f"MPAD{channel_id}_{params}"
+
+    @staticmethod
+    def parse_more_id(browse_id):
+        channel_id, _, params = browse_id[len("MPAD"):].rpartition("_")
+        return channel_id, params
+
+
+class FakeYouTubeMusic(ThreadingHTTPServer):
+    """Threaded HTTP server with an optional fixed per-request latency."""
+
+    daemon_threads = True
+
+    def __init__(self, address, catalog, page_latency=0.0, scroll_delay=0.2, lang="en"):
+        super().__init__(address, _Handler)
+        self.catalog = catalog
+        self.titles = SHELF_TITLES[lang]
+        self.item_types = ITEM_TYPES[lang]
+        self.page_latency = page_latency
+        self.scroll_delay = scroll_delay
+        self.requests = 0
+        self._count_lock = threading.Lock()
+        self.templates = {name: load_fixture(f"{name}.html") for name in ("search", "artist", "grid")}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="FakeYouTubeMusic", daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real site
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, body, content_type="text/html; charset=utf-8", status=200):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _begin(self):
+        with self.server._count_lock:
+            self.server.requests += 1
+        if self.server.page_latency:
+            time.sleep(self.server.page_latency)
+
+    def do_GET(self):
+        self._begin()
+        url = urllib.parse.urlparse(self.path)
+        if url.path in ("/", "/search"):
+            query = urllib.parse.parse_qs(url.query).get("q", [""])[0]
+            return self._send(self.search_page(query))
+        if url.path.startswith("/channel/"):
+            channel_id = url.path[len("/channel/"):]
+            if channel_id in self.server.catalog.artists:
+                return self._send(self.artist_page(channel_id))
+        if url.path.startswith("/browse/MPAD"):
+            channel_id, params = FakeCatalog.parse_more_id(url.path[len("/browse/"):])
+            if channel_id in self.server.catalog.artists and params in self.server.catalog.counts:
+                return self._send(self.grid_page(channel_id, params))
+        self._send("not found", "text/plain", 404)
+
+    def do_POST(self):
+        self._begin()
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if urllib.parse.urlparse(self.path).path != "/youtubei/v1/browse":
+            return self._send("not found", "text/plain", 404)
+        self._send(json.dumps(self.browse_response(body)), "application/json")
+
+    # ── pages ──
+
+    def _common(self):
+        return {"api_key": API_KEY, "client_version": CLIENT_VERSION}
+
+    def search_page(self, query):
+        catalog = self.server.catalog
+        channel_id, name = catalog.find_artist(query)
+        # The wanted artist (if any) plus a decoy that must not match
+        results = [(channel_id, name)] if channel_id else []
+        results.append(("UCdecoy0000", "Completely Different Band"))
+        data = {"contents": {"sectionListRenderer": {"contents": [{"musicShelfRenderer": {"contents": [
+            {"musicResponsiveListItemRenderer": {
+                "navigationEndpoint": {"browseEndpoint": browse_endpoint(cid, "MUSIC_PAGE_TYPE_ARTIST")},
+                "flexColumns": [{"musicResponsiveListItemFlexColumnRenderer": {"text": {"runs": [{"text": n}]}}}],
+            }} for cid, n in results]}}]}}}
+        markup = "\n".join(
+            f'      <ytmusic-responsive-list-item-renderer><a class="yt-simple-endpoint thumbnail-link" '
+            f'href="/channel/{cid}" title="{html_escape(n)}"></a></ytmusic-responsive-list-item-renderer>'
+            for cid, n in results)
+        return self.server.templates["search"].substitute(
+            self._common(), query=html_escape(query), results=markup, initial_data=js_escape(json.dumps(data)))
+
+    def artist_page(self, channel_id):
+        catalog = self.server.catalog
+        shelves, markup = [], []
+        for (_, params, _), title in zip(FakeCatalog.SECTIONS, self.server.titles):
+            ids = catalog.release_ids(channel_id, params)
+            if not ids:
+                continue
+            more = browse_endpoint(FakeCatalog.more_id(channel_id, params), params=params)
+            shelves.append({"musicCarouselShelfRenderer": {
+                "header": {"musicCarouselShelfBasicHeaderRenderer": {
+                    "title": {"runs": [{"text": title, "navigationEndpoint": {"browseEndpoint": more}}]}}},
+                "contents": [two_row_item(i) for i in ids[:SHELF_PREVIEW]],
+            }})
+            items = "\n".join(
+                f'      <ytmusic-two-row-item-renderer><a class="yt-simple-endpoint image-wrapper style-scope '
+                f'ytmusic-two-row-item-renderer" href="/browse/{i}" title="{i}"></a></ytmusic-two-row-item-renderer>'
+                for i in ids[:SHELF_PREVIEW])
+            markup.append(
+                f'    <div class="ytmusic-shelf">\n'
+                f'      <ytmusic-carousel-shelf-basic-header-renderer>\n'
+                f'        <yt-formatted-string class="title text style-scope ytmusic-carousel-shelf-basic-header-renderer">'
+                f'<a class="yt-simple-endpoint" href="/browse/{more["browseId"]}">{title}</a></yt-formatted-string>\n'
+                f'      </ytmusic-carousel-shelf-basic-header-renderer>\n{items}\n    </div>')
+        # Shelves that are not the artist's releases, whatever their title says
+        videos, appears_on, related = self.server.titles[2:]
+        decoy = ("UCdecoy0000", "Completely Different Band")
+        shelves += [
+            {"musicCarouselShelfRenderer": {
+                "header": {"musicCarouselShelfBasicHeaderRenderer": {"title": {"runs": [{
+                    "text": videos, "navigationEndpoint": {"browseEndpoint": browse_endpoint(f"VL{channel_id}")}}]}}},
+                "contents": [video_item(f"vid{channel_id[-4:]}{n}") for n in range(3)]}},
+            {"musicCarouselShelfRenderer": {
+                "header": {"musicCarouselShelfBasicHeaderRenderer": {"title": {"runs": [{"text": appears_on}]}}},
+                "contents": [two_row_item(f"MPREb_x{channel_id[-4:]}_{n:04d}", credit=decoy) for n in range(2)]}},
+            {"musicCarouselShelfRenderer": {
+                "header": {"musicCarouselShelfBasicHeaderRenderer": {"title": {"runs": [{"text": related}]}}},
+                "contents": [two_row_item(decoy[0], "MUSIC_PAGE_TYPE_ARTIST")]}},
+        ]
+        data = {"contents": {"singleColumnBrowseResultsRenderer": {"tabs": [{"tabRenderer": {"content": {
+            "sectionListRenderer": {"contents": shelves}}}}]}}}
+        return self.server.templates["artist"].substitute(
+            self._common(), artist=html_escape(catalog.artists[channel_id]), shelves="\n".join(markup),
+            initial_data=js_escape(json.dumps(data)))
+
+    def grid_page(self, channel_id, params):
+        catalog = self.server.catalog
+        title = dict((p, t) for (_, p, _), t in zip(FakeCatalog.SECTIONS, self.server.titles))[params]
+        return self.server.templates["grid"].substitute(
+            self._common(), artist=html_escape(catalog.artists[channel_id]), section=title,
+            ids=json.dumps(catalog.release_ids(channel_id, params)), page_size=catalog.page_size,
+            scroll_delay_ms=int(self.server.scroll_delay * 1000), subtitle=self.grid_label(params))
+
+    def grid_label(self, params):
+        return dict((p, t) for (_, p, _), t in zip(FakeCatalog.SECTIONS, self.server.item_types))[params]
+
+    def browse_response(self, body):
+        catalog = self.server.catalog
+        token = body.get("continuation")
+        if token:
+            browse_id, _, offset = token.rpartition(":")
+            offset = int(offset)
+        else:
+            browse_id, offset = body.get("browseId", ""), 0
+        channel_id, params = FakeCatalog.parse_more_id(browse_id)
+        if channel_id not in catalog.artists or params not in catalog.counts:
+            return {}
+        ids = catalog.release_ids(channel_id, params)
+        page = ids[offset:offset + catalog.page_size]
+        grid = {"items": [two_row_item(i, label=self.grid_label(params)) for i in page]}
+        if offset + catalog.page_size < len(ids):
+            grid["continuations"] = [{"nextContinuationData": {
+                "continuation": f"{browse_id}:{offset + catalog.page_size}"}}]
+        if token:
+            return {"continuationContents": {"gridContinuation": grid}}
+        return {"contents": {"singleColumnBrowseResultsRenderer": {"tabs": [{"tabRenderer": {"content": {
+            "sectionListRenderer": {"contents": [{"gridRenderer": grid}]}}}}]}}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake YouTube Music pages for the benchmarks.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--artists", type=int, default=8)
+    parser.add_argument("--albums", type=int, default=12)
+    parser.add_argument("--singles", type=int, default=6)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--page-latency", type=float, default=0.0)
+    parser.add_argument("--scroll-delay", type=float, default=0.2)
+    parser.add_argument("--lang", choices=sorted(SHELF_TITLES), default="en", help="language of the shelf titles")
+    args = parser.parse_args()
+    catalog = FakeCatalog(args.artists, args.albums, args.singles, args.page_size)
+    server = FakeYouTubeMusic(("127.0.0.1", args.port), catalog, args.page_latency, args.scroll_delay, args.lang)
+    print(f"Serving {len(catalog.artists)} fake artists on {server.base_url} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
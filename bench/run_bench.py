@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# bench/run_bench.py
+"""
+Offline benchmark for discovery, downloading and committing.
+
+Starts bench/fake_ytm.py on a local port, points the downloader at it and swaps
+yt-dlp for bench/stub_ytdlp.py.  Each thread count then runs in a fresh child
+process inside its own scratch folder.  Per run it reports:
+
+    discovery   seconds per artist (search + all release grids)
+    albums/min  committed albums and singles per minute of wall time
+    commit      latency of move_to_finished_folder() (mean / max)
+    pp          latency of one post-processing run per track (mean)
+    peak RSS    of the downloader process (the stub processes are not included)
+
+Example:
+
+    python bench/run_bench.py --threads 1,4,10,32 --artists 8 --albums 24 --tracks 6
+    python bench/run_bench.py --discovery selenium --threads 4   # needs Chrome + chromedriver
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+STUB_YTDLP = os.path.join(BENCH_DIR, "stub_ytdlp.py")
+
+sys.path.insert(0, BENCH_DIR)
+from fake_ytm import FakeCatalog, FakeYouTubeMusic  # noqa: E402
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_once(args, workdir):
+    """One benchmark run in the current process; returns the result dict."""
+    sys.path.insert(0, REPO_DIR)
+    import youtubemusicartistdownloader as ytmad
+
+    os.chdir(workdir)
+    open(ytmad.COOKIE_BOOT_FILE, "w").close()
+    ytmad.YTM_BASE_URL = args.base_url
+    ytmad.YTDLP_BINARY = STUB_YTDLP
+    ytmad.DOWNLOAD_BACKEND = "subprocess"
+    ytmad.THROTTLE_MAX_RATE = args.start_rate
+    ytmad.RETRY_BACKOFF_BASE = args.retry_backoff
+    ytmad.manifest = ytmad.DownloadManifest(ytmad.STATE_DB_FILE)
+    ytmad.library = ytmad.LibraryIndex(ytmad.FINISHED_FOLDER, ytmad.STATE_DB_FILE)
+
+    discovery_times = []
+    lock = threading.Lock()
+
+    class TimedDiscoveryPool(ytmad.DiscoveryPool):
+        # An artist's discovery time = search (if any) + every release grid
+        def _resolve(self, session, artist):
+            start = time.monotonic()
+            try:
+                return super()._resolve(session, artist)
+            finally:
+                threading.current_thread().bench_resolve = time.monotonic() - start
+
+        def _scrape(self, session, artist_name, artist_href, click_privacy):
+            start = time.monotonic()
+            try:
+                return super()._scrape(session, artist_name, artist_href, click_privacy)
+            finally:
+                elapsed = time.monotonic() - start + getattr(threading.current_thread(), "bench_resolve", 0.0)
+                threading.current_thread().bench_resolve = 0.0
+                with lock:
+                    discovery_times.append(elapsed)
+
+    http_session = ytmad.HttpSession(base_url=args.base_url) if args.discovery == "http" else None
+    pool = TimedDiscoveryPool(args.discovery, args.discovery_sessions, http_session)
+    artists = [(name, None) for name in FakeCatalog(args.artists).artist_names()]
+
+    start = time.monotonic()
+    with open("bench.log", "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            ytmad.download_items_in_parallel(pool.discover(artists), args.threads,
+                                              postprocess_threads=args.postprocess_threads)
+        finally:
+            pool.close()
+            if http_session:
+                http_session.close()
+    wall = time.monotonic() - start
+
+    with ytmad.manifest._lock:
+        statuses = dict(ytmad.manifest._db.execute(
+            "SELECT status, COUNT(*) FROM items GROUP BY status").fetchall())
+    ytmad.library.close()
+    ytmad.manifest.close()
+    # move_to_finished_folder() is recorded as the "commit" stage
+    stages = ytmad.metrics.snapshot()["stages"]
+    commit = stages.get("commit", {"count": 0})
+    return {
+        "threads": args.threads,
+        "discovery": args.discovery,
+        "artists": len(discovery_times),
+        "discovery_s_per_artist": statistics.mean(discovery_times) if discovery_times else None,
+        "albums": commit["count"],
+        "albums_per_min": commit["count"] / wall * 60 if wall else 0.0,
+        "commit_ms_mean": commit["mean_seconds"] * 1000 if commit["count"] else None,
+        "commit_ms_max": commit["max_seconds"] * 1000 if commit["count"] else None,
+        "pp_ms_mean": stages["postprocess"]["mean_seconds"] * 1000 if "postprocess" in stages else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "wall_s": wall,
+        "statuses": statuses,
+        "stages": stages,
+    }
+
+
+def child_main(args):
+    workdir = tempfile.mkdtemp(prefix=f"ytmad-bench-{args.threads}t-")
+    result = run_once(args, workdir)
+    result["workdir"] = workdir
+    print(json.dumps(result), file=sys.__stdout__)
+
+
+def fmt(value, spec):
+    return "–" if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark against fake YouTube Music pages.")
+    parser.add_argument("--threads", default="1,4,10,32", help="comma-separated download thread counts")
+    parser.add_argument("--discovery", choices=("http", "selenium"), default="http")
+    parser.add_argument("--discovery-sessions", type=int, default=1)
+    parser.add_argument("--artists", type=int, default=8)
+    parser.add_argument("--albums", type=int, default=12, help="albums per artist")
+    parser.add_argument("--singles", type=int, default=6, help="singles per artist")
+    parser.add_argument("--page-size", type=int, default=10, help="grid items per scroll/continuation page")
+    parser.add_argument("--page-latency", type=float, default=0.02, help="seconds per fake page request")
+    parser.add_argument("--scroll-delay", type=float, default=0.2, help="seconds until the next grid page appears")
+    parser.add_argument("--lang", choices=("en", "de"), default="en", help="language of the fake shelf titles")
+    parser.add_argument("--tracks", type=int, default=8, help="tracks per release (stub yt-dlp)")
+    parser.add_argument("--track-latency", type=float, default=0.05, help="seconds per track (stub yt-dlp)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="probability a track fails (stub yt-dlp)")
+    parser.add_argument("--track-size", type=int, default=65536, help="bytes per synthetic m4a")
+    parser.add_argument("--pp-latency", type=float, default=0.02,
+                        help="CPU seconds per post-processed track (stub yt-dlp)")
+    parser.add_argument("--postprocess-threads", type=int, default=None,
+                        help="post-processing workers (default: one per core)")
+    parser.add_argument("--start-rate", type=float, default=100.0,
+                        help="throttle start rate (yt-dlp runs/s); the script's default would dominate")
+    parser.add_argument("--retry-backoff", type=float, default=0.1, help="RETRY_BACKOFF_BASE in seconds")
+    parser.add_argument("--json", help="also write all results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch folders")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.threads = int(args.threads)
+        return child_main(args)
+
+    catalog = FakeCatalog(args.artists, args.albums, args.singles, args.page_size)
+    server = FakeYouTubeMusic(("127.0.0.1", 0), catalog, args.page_latency, args.scroll_delay,
+                              args.lang).start()
+    env = dict(os.environ,
+               YTMAD_STUB_TRACKS=str(args.tracks), YTMAD_STUB_LATENCY=str(args.track_latency),
+               YTMAD_STUB_FAIL_RATE=str(args.fail_rate), YTMAD_STUB_SIZE=str(args.track_size),
+               YTMAD_STUB_PP_LATENCY=str(args.pp_latency))
+    print(f"Fake YouTube Music on {server.base_url}: {args.artists} artists × "
+          f"{args.albums} albums + {args.singles} singles, {args.tracks} tracks each")
+
+    results = []
+    for threads in [int(t) for t in args.threads.split(",") if t.strip()]:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", "--base-url", server.base_url,
+               "--threads", str(threads)]
+        for name in ("discovery", "discovery_sessions", "artists", "albums", "singles", "start_rate",
+                     "retry_backoff", "postprocess_threads"):
+            if getattr(args, name) is not None:
+                cmd += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{threads:>3} threads: failed\n{proc.stderr}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        if not args.keep:
+            import shutil
+            shutil.rmtree(result.pop("workdir"), ignore_errors=True)
+        results.append(result)
+
+    print(f"{'threads':>7}  {'discovery s/artist':>18}  {'albums/min':>10}  {'commit ms (mean/max)':>20}  {'pp ms':>6}  "
+          f"{'peak RSS MB':>11}  {'wall s':>7}  statuses")
+    for r in results:
+        commit = f"{fmt(r['commit_ms_mean'], '.1f')}/{fmt(r['commit_ms_max'], '.1f')}"
+        print(f"{r['threads']:>7}  {fmt(r['discovery_s_per_artist'], '.3f'):>18}  {r['albums_per_min']:>10.1f}  "
+              f"{commit:>20}  {fmt(r['pp_ms_mean'], '.1f'):>6}  {r['peak_rss_mb']:>11.1f}  {r['wall_s']:>7.1f}  {r['statuses']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
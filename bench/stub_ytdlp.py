@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# bench/stub_ytdlp.py
+"""
+Stand-in for the ``yt-dlp`` executable used by the benchmarks.
+
+It understands the options youtubemusicartistdownloader.py passes
+(``--output``, ``--download-archive``, ``--print-to-file``, ``--flat-playlist``
+with ``--print``, ``--write-info-json``, ``--write-thumbnail`` and
+``--load-info-json``, ``--progress-template``) and ignores everything else.  Every album/single gets
+YTMAD_STUB_TRACKS tracks with stable video IDs.
+
+A download run (no ``--load-info-json``) takes YTMAD_STUB_LATENCY seconds per
+track and leaves the raw .webm, its .webp thumbnail and its .info.json.  With
+probability YTMAD_STUB_FAIL_RATE a track fails instead: a .webm.part stays
+behind and an HTTP 429 error is printed, like a throttled real run.  Without
+``--write-info-json`` (the single-pass layout) the .m4a is written directly.
+
+A post-processing run (``--load-info-json FILE``) burns CPU for
+YTMAD_STUB_PP_LATENCY seconds, like an ffmpeg transcode, and turns the raw
+.webm into a small but valid .m4a file (mutagen can tag it).
+
+With ``--progress-template download:…`` every downloaded track reports its
+progress in a few steps through that template, like yt-dlp with ``--newline``.
+
+Environment:
+    YTMAD_STUB_TRACKS     tracks per release (default 8)
+    YTMAD_STUB_LATENCY    seconds per track (default 0.05)
+    YTMAD_STUB_FAIL_RATE  probability that a track fails (default 0.0)
+    YTMAD_STUB_LIST_FAIL_RATE
+                          probability that a ``--flat-playlist`` listing fails
+                          with HTTP 429 (default 0.0)
+    YTMAD_STUB_SIZE       bytes of audio payload per track (default 65536)
+    YTMAD_STUB_PP_LATENCY CPU seconds per post-processed track (default 0.02)
+    YTMAD_STUB_SHARED     leading tracks with the same video IDs on every release,
+                          like singles that reappear on albums (default 0)
+"""
+
+import hashlib
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+
+def env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+TRACKS = int(env_float("YTMAD_STUB_TRACKS", 8))
+LATENCY = env_float("YTMAD_STUB_LATENCY", 0.05)
+FAIL_RATE = env_float("YTMAD_STUB_FAIL_RATE", 0.0)
+LIST_FAIL_RATE = env_float("YTMAD_STUB_LIST_FAIL_RATE", 0.0)
+SIZE = int(env_float("YTMAD_STUB_SIZE", 65536))
+PP_LATENCY = env_float("YTMAD_STUB_PP_LATENCY", 0.02)
+SHARED = int(env_float("YTMAD_STUB_SHARED", 0))
+
+
+def atom(kind, payload=b""):
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def m4a_bytes(size):
+    """Smallest MP4 layout mutagen accepts (ftyp + moov/mvhd) plus *size* bytes of mdat."""
+    mvhd = atom(b"mvhd", bytes(4) + struct.pack(">IIII", 0, 0, 1000, 0) + struct.pack(">IH", 0x10000, 0x100)
+                + bytes(70) + struct.pack(">I", 2))
+    return (atom(b"ftyp", b"M4A " + bytes(4) + b"M4A mp42isom")
+            + atom(b"moov", mvhd) + atom(b"mdat", bytes(size)))
+
+
+def release_id(url):
+    """Browse/playlist ID at the end of *url* (``…/browse/ID`` or ``…?list=ID``)."""
+    if "list=" in url:
+        return url.split("list=", 1)[1].split("&", 1)[0]
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def tracks_of(url):
+    rid = release_id(url)
+    digest = hashlib.sha1(rid.encode("utf-8")).hexdigest()[:8]
+    return rid, [(f"shared{n:05d}", f"Shared Track {n:02d}") if n <= SHARED else (f"{digest}{n:03d}", f"Track {n:02d}")
+                 for n in range(1, TRACKS + 1)]
+
+
+def parse_args(argv):
+    opts = {"quiet": False, "flat": False, "print": None, "output": "%(title)s.%(ext)s", "archive": None,
+            "print_to_file": None, "info_json": False, "thumbnail": False, "load_info": None,
+            "progress": None, "urls": []}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in ("-q", "--quiet"):
+            opts["quiet"] = True
+        elif arg == "--flat-playlist":
+            opts["flat"] = True
+        elif arg == "--write-info-json":
+            opts["info_json"] = True
+        elif arg == "--write-thumbnail":
+            opts["thumbnail"] = True
+        elif arg == "--load-info-json":
+            opts["load_info"] = argv[i + 1]
+            i += 1
+        elif arg == "--print":
+            opts["print"] = argv[i + 1]
+            i += 1
+        elif arg in ("-o", "--output"):
+            opts["output"] = argv[i + 1]
+            i += 1
+        elif arg == "--download-archive":
+            opts["archive"] = argv[i + 1]
+            i += 1
+        elif arg == "--progress-template":
+            template = argv[i + 1]
+            if template.startswith("download:"):
+                opts["progress"] = template[len("download:"):]
+            i += 1
+        elif arg == "--print-to-file":
+            opts["print_to_file"] = (argv[i + 1], argv[i + 2])
+            i += 2
+        elif arg in ("--cookies", "--retries", "--retry-sleep", "--concurrent-fragments", "-f", "-t",
+                     "--parse-metadata", "--audio-format", "--compat-options"):
+            i += 1
+        elif not arg.startswith("-"):
+            opts["urls"].append(arg)
+        i += 1
+    return opts
+
+
+def render(template, fields):
+    for key, value in fields.items():
+        template = template.replace(f"%({key})s", str(value))
+    return template
+
+
+def download_delay(opts, video_id):
+    """Wait like a track download, printing progress lines if a template was given."""
+    delay = LATENCY * random.uniform(0.5, 1.5)
+    if not opts["progress"]:
+        time.sleep(delay)
+        return
+    steps = 4
+    for step in range(1, steps + 1):
+        time.sleep(delay / steps)
+        print(render(opts["progress"], {"info.id": video_id, "progress.downloaded_bytes": SIZE * step // steps}),
+              flush=True)
+
+
+def burn_cpu(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        hashlib.sha256(bytes(4096)).digest()
+
+
+def write_m4a(opts, path, video_id):
+    with open(path, "wb") as fh:
+        fh.write(m4a_bytes(SIZE))
+    if opts["print_to_file"]:
+        template, out = opts["print_to_file"]
+        template = template.split(":", 1)[1] if template.startswith("after_move:") else template
+        with open(out, "a", encoding="utf-8") as fh:
+            fh.write(render(template, {"id": video_id, "filepath": path}).replace("\\t", "\t") + "\n")
+    if not opts["quiet"]:
+        print(f"[ExtractAudio] Destination: {path}")
+
+
+def postprocess(opts):
+    """Post-processing run: raw .webm (+ .webp) from the info JSON → tagged .m4a."""
+    with open(opts["load_info"], "r", encoding="utf-8") as fh:
+        info = json.load(fh)
+    path = render(opts["output"], {"album": info["album"], "title": info["title"], "ext": "m4a",
+                                   "id": info["id"]})
+    raw = os.path.splitext(path)[0] + ".webm"
+    if not os.path.exists(raw):
+        print(f"ERROR: [youtube] {info['id']}: no downloaded file to post-process", file=sys.stderr)
+        return 1
+    burn_cpu(PP_LATENCY)
+    write_m4a(opts, path, info["id"])
+    for leftover in (raw, os.path.splitext(path)[0] + ".webp"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    return 0
+
+
+def main(argv):
+    opts = parse_args(argv)
+    if opts["load_info"]:
+        return postprocess(opts)
+    failed = False
+    for url in opts["urls"]:
+        rid, tracks = tracks_of(url)
+        if opts["flat"]:
+            if random.random() < LIST_FAIL_RATE:
+                print(f"ERROR: [youtube:tab] {rid}: Unable to download API page: HTTP Error 429: "
+                      f"Too Many Requests", file=sys.stderr)
+                failed = True
+                continue
+            for video_id, title in tracks:
+                print(render(opts["print"] or "%(id)s", {"id": video_id, "title": title}).replace("\\t", "\t"))
+            continue
+
+        archived = set()
+        if opts["archive"] and os.path.exists(opts["archive"]):
+            with open(opts["archive"], "r", encoding="utf-8") as fh:
+                archived = {line.split()[-1] for line in fh if line.strip()}
+        album = f"Album {rid}"
+        for video_id, title in tracks:
+            if video_id in archived:
+                if not opts["quiet"]:
+                    print(f"[download] {title} has already been recorded in the archive")
+                continue
+            download_delay(opts, video_id)
+            path = render(opts["output"], {"album": album, "title": title, "ext": "m4a", "id": video_id})
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            base = os.path.splitext(path)[0]
+            if random.random() < FAIL_RATE:
+                with open(base + ".webm.part", "wb") as fh:
+                    fh.write(bytes(1024))
+                print(f"ERROR: [youtube] {video_id}: Unable to download webpage: HTTP Error 429: "
+                      f"Too Many Requests", file=sys.stderr)
+                failed = True
+                continue
+            if opts["info_json"]:
+                # Network stage only: raw audio, thumbnail and metadata for the post-processing run
+                with open(base + ".webm", "wb") as fh:
+                    fh.write(bytes(SIZE))
+                if opts["thumbnail"]:
+                    with open(base + ".webp", "wb") as fh:
+                        fh.write(bytes(1024))
+                with open(base + ".info.json", "w", encoding="utf-8") as fh:
+                    json.dump({"id": video_id, "title": title, "album": album}, fh)
+                if not opts["quiet"]:
+                    print(f"[download] Destination: {base}.webm")
+            else:
+                burn_cpu(PP_LATENCY)
+                write_m4a(opts, path, video_id)
+            if opts["archive"]:
+                with open(opts["archive"], "a", encoding="utf-8") as fh:
+                    fh.write(f"youtube {video_id}\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
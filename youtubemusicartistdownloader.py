@@ -2,22 +2,34 @@
 # youtubemusicartistdownloader.py
 
 import argparse
+import asyncio
+import collections
 import concurrent.futures
+import contextlib
 import difflib
+import functools
+import gzip
+import hashlib
+import heapq
+import itertools
+import json
 import os
+import queue
+import random
 import re
 import shutil
+import socket
+import sqlite3
 import subprocess
+import sys
 import time
 import unicodedata
 import urllib.parse
 import tempfile
-from mutagen.easymp4 import EasyMP4
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from threading import Thread, Semaphore, Event, Lock   # ← added Lock already present but needed again
+import threading
+from dataclasses import dataclass, field
+from threading import Thread, Event, Lock   # ← added Lock already present but needed again
+from typing import Optional
 
 # ──────────────────────────────────────────────────────────────────────────────
 # ── COOKIE / SELENIUM CONFIG ──────────────────────────────────────────────────
@@ -28,13 +40,13 @@ chromedriver_path = '/usr/bin/chromedriver'
 # Mandatory initial Netscape-cookie file (provided by the user)
 COOKIE_BOOT_FILE = "logincookies.txt"
 
-# Folder for periodically refreshed cookie dumps
+# Folder for cookie dumps (subprocess backend only)
 TMP_COOKIE_DIR = "tmp-cookie"
 
 # Stable, atomically replaced cookie file used by yt-dlp
 COOKIE_ACTIVE_FILE = os.path.join(TMP_COOKIE_DIR, "cookies-latest.txt")
 
-# Interval (seconds) to refresh cookies in the background browser
+# Interval (seconds) between background cookie refreshes
 COOKIE_DUMP_INTERVAL = 60
 
 # Suffix whitelist for all Google/YouTube auth cookies
@@ -53,29 +65,345 @@ def cookie_allowed(domain: str) -> bool:
 # Global stop event for cookie refresher thread
 stop_cookie_refresher = Event()
 
-# Signals that at least one valid cookie dump is ready
-first_cookie_dump_ready = Event()
-
 # Lock to guard reads/writes if ever needed elsewhere
 _cookie_lock = Lock()
 
-# NEW: global lock to serialize moves into the final "music" folder
-move_lock = Lock()
+# Commits into "music" are serialized per artist folder only (see artist_commit_lock)
+_commit_locks = {}
+_commit_locks_guard = Lock()
+
+# Set by main() for --shard: other hosts commit into the same "music" tree
+SHARED_LIBRARY = False
+
+# Persistent SQLite state (download manifest) shared across runs
+STATE_DB_FILE = "ytmad-state.db"
+
+# Final library folder
+FINISHED_FOLDER = "music"
+
+# On-disk user-agent cache, keyed by the installed Chrome/chromedriver version
+UA_CACHE_FILE = "ytmad-useragent.json"
+
+# Resolved artist channels are reused for this long before searching again
+ARTIST_CACHE_TTL = 30 * 24 * 3600
+
+# Selenium is imported on first use (see load_selenium()) so that --help and
+# browser-free runs start as fast as the bare interpreter
+webdriver = By = Service = Options = None
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── RUN METRICS (STAGE TIMINGS, COUNTERS, LIVE SUMMARY) ──────────────────────
+
+# "Debug:" lines are only printed with -v/--verbose; otherwise a live summary line is shown
+VERBOSE = False
+
+# Written at the end of every run (paths can be changed with --report/--prometheus-file)
+RUN_REPORT_FILE = "ytmad-run-report.json"
+PROMETHEUS_FILE = "ytmad-metrics.prom"
+
+# Seconds between live summary updates (and Prometheus textfile rewrites)
+SUMMARY_INTERVAL = 2.0
+
+def debug(message):
+    if VERBOSE:
+        print(f"Debug: {message}")
+
+class RunMetrics:
+    """
+    Thread-safe collector for one run: per-stage durations (count, total, max),
+    monotonically increasing counters and point-in-time gauges.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = Lock()
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.gauge_peaks = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            count, total, longest = self.stages.get(stage, (0, 0.0, 0.0))
+            self.stages[stage] = (count + 1, total + seconds, max(longest, seconds))
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - start)
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        with self._lock:
+            self._set_gauge(name, value)
+
+    def adjust(self, name, delta):
+        """Add *delta* to a gauge (e.g. +1/-1 around an active job)."""
+        with self._lock:
+            self._set_gauge(name, self.gauges.get(name, 0) + delta)
+
+    def _set_gauge(self, name, value):
+        self.gauges[name] = value
+        self.gauge_peaks[name] = max(self.gauge_peaks.get(name, value), value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "stages": {name: {"count": c, "total_seconds": round(t, 3), "max_seconds": round(m, 3),
+                                  "mean_seconds": round(t / c, 3) if c else 0.0}
+                           for name, (c, t, m) in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+                "gauge_peaks": dict(sorted(self.gauge_peaks.items())),
+            }
+
+    def write_report(self, path, extra=None):
+        report = self.snapshot()
+        report.update(extra or {})
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+
+    def write_prometheus(self, path):
+        """Write the metrics in the Prometheus text format, atomically (node_exporter textfile collector)."""
+        snap = self.snapshot()
+        lines = [
+            "# HELP ytmad_run_start_timestamp_seconds Start of the current run.",
+            "# TYPE ytmad_run_start_timestamp_seconds gauge",
+            f"ytmad_run_start_timestamp_seconds {self.started:.0f}",
+            "# HELP ytmad_stage_seconds_total Time spent per stage.",
+            "# TYPE ytmad_stage_seconds_total counter",
+        ]
+        lines += [f'ytmad_stage_seconds_total{{stage="{n}"}} {s["total_seconds"]}' for n, s in snap["stages"].items()]
+        lines += ["# HELP ytmad_stage_calls_total Completed calls per stage.",
+                  "# TYPE ytmad_stage_calls_total counter"]
+        lines += [f'ytmad_stage_calls_total{{stage="{n}"}} {s["count"]}' for n, s in snap["stages"].items()]
+        lines += ["# HELP ytmad_stage_max_seconds Slowest call per stage.",
+                  "# TYPE ytmad_stage_max_seconds gauge"]
+        lines += [f'ytmad_stage_max_seconds{{stage="{n}"}} {s["max_seconds"]}' for n, s in snap["stages"].items()]
+        for name, value in snap["counters"].items():
+            lines += [f"# TYPE ytmad_{name}_total counter", f"ytmad_{name}_total {value}"]
+        for name, value in snap["gauges"].items():
+            lines += [f"# TYPE ytmad_{name} gauge", f"ytmad_{name} {value}"]
+        directory = os.path.dirname(os.path.abspath(path))
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".ytmad-", suffix=".prom.tmp")
+        with os.fdopen(tmp_fd, "w", encoding="utf-8") as fh:
+            fh.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    def summary_line(self):
+        snap = self.snapshot()
+        c, g, stages = snap["counters"], snap["gauges"], snap["stages"]
+        elapsed = snap["elapsed_seconds"]
+        done = c.get("albums_committed", 0) + c.get("albums_partial", 0) + c.get("albums_failed", 0)
+        total = c.get("albums_queued", 0)
+        # Albums left at the average pace so far (discovery may still add more)
+        eta = clock(elapsed / done * (total - done)) if done and total > done else "--:--:--"
+        parts = [
+            clock(elapsed),
+            f"artists {stages.get('search', {}).get('count', 0)}",
+            f"found {c.get('releases_found', 0)}",
+            f"queue {g.get('discovery_queue_depth', 0)}",
+            f"active {g.get('downloads_active', 0)}",
+            f"done {done}/{total}",
+            f"failed {c.get('albums_failed', 0)}",
+            f"retries {c.get('retries', 0)}",
+            f"{transfers.rate() / 2**20:.1f} MB/s",
+            f"{c.get('bytes_transferred', 0) / 2**20:.0f} MB",
+            f"ETA {eta}",
+        ]
+        if throttle is not None:
+            parts.append(f"limit {int(throttle.limit)}/{throttle.max_concurrency} @ {throttle.rate:.2f}/s")
+        return " | ".join(parts)
+
+def clock(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+metrics = RunMetrics()
 
-# ── FIX 3: keep a global handle to the cookie driver so we can shut it down safely ──
-_cookie_driver = None
+# Seconds of progress updates the live download rate is averaged over
+TRANSFER_RATE_WINDOW = 10.0
+
+class TransferProgress:
+    """
+    Bytes received by all running yt-dlp downloads, fed by their progress
+    lines (see JobOutput). Each source reports how far each of its tracks
+    got; the increments add up to the ``bytes_transferred`` counter and the
+    rate over the last TRANSFER_RATE_WINDOW seconds.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._tracks = {}                      # (source, video_id) → bytes so far
+        self._total = 0
+        self._samples = collections.deque()    # (monotonic time, total bytes)
+
+    def update(self, source, video_id, downloaded):
+        with self._lock:
+            last = self._tracks.get((source, video_id), 0)
+            # Less than last time: the track started over (retry, next format)
+            delta = downloaded - last if downloaded >= last else downloaded
+            self._tracks[(source, video_id)] = downloaded
+            self._total += delta
+            now = time.monotonic()
+            self._samples.append((now, self._total))
+            self._trim(now)
+        metrics.inc("bytes_transferred", delta)
+
+    def finish(self, source):
+        """Forget the tracks of *source* (its job is done)."""
+        with self._lock:
+            for key in [k for k in self._tracks if k[0] is source]:
+                del self._tracks[key]
+
+    def rate(self):
+        """Bytes per second over the last TRANSFER_RATE_WINDOW seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if not self._samples:
+                return 0.0
+            since, base = self._samples[0]
+            return (self._total - base) / max(now - since, 1.0)
+
+    def _trim(self, now):
+        while self._samples and now - self._samples[0][0] > TRANSFER_RATE_WINDOW:
+            self._samples.popleft()
+
+transfers = TransferProgress()
+
+def timed(stage):
+    """Decorator: record every call of the function as *stage* in ``metrics``."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.time(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+@contextlib.contextmanager
+def timed_acquire(lock, stage):
+    """Hold *lock*, recording how long it took to get it as *stage*."""
+    start = time.monotonic()
+    with lock:
+        metrics.observe(stage, time.monotonic() - start)
+        yield
+
+def start_summary_thread(prometheus_file=None):
+    """
+    Refresh the live summary line (and the Prometheus textfile) every
+    SUMMARY_INTERVAL seconds until the returned event is set.
+    """
+    stop = Event()
+    tick, clear = summary_printer(prometheus_file)
+
+    def loop():
+        while not stop.wait(SUMMARY_INTERVAL):
+            tick()
+        clear()
+
+    Thread(target=loop, name="Summary", daemon=True).start()
+    return stop
+
+def summary_printer(prometheus_file=None):
+    """
+    Return ``(tick, clear)``: ``tick()`` redraws the live summary line (or
+    prints a plain status line every 30 s when stderr is not a terminal) and
+    refreshes the Prometheus textfile; ``clear()`` removes the live line.
+    """
+    live = sys.stderr.isatty() and not VERBOSE
+    last_plain = 0.0
+
+    def tick():
+        nonlocal last_plain
+        if live:
+            sys.stderr.write("\r\033[K" + metrics.summary_line())
+            sys.stderr.flush()
+        elif time.monotonic() - last_plain >= 30:
+            last_plain = time.monotonic()
+            print(f"Status: {metrics.summary_line()}")
+        if prometheus_file:
+            try:
+                metrics.write_prometheus(prometheus_file)
+            except OSError as e:
+                debug(f"Could not write {prometheus_file} – {e}")
+
+    def clear():
+        if live:
+            sys.stderr.write("\r\033[K")
+
+    return tick, clear
 
 # ──────────────────────────────────────────────────────────────────────────────
 # ── ORIGINAL UTILITIES (UNTOUCHED EXCEPT WHERE NOTED) ─────────────────────────
 
+def load_selenium():
+    """Import Selenium into the module namespace on first use."""
+    global webdriver, By, Service, Options
+    if webdriver is None:
+        from selenium import webdriver as _webdriver
+        from selenium.webdriver.common.by import By as _By
+        from selenium.webdriver.chrome.service import Service as _Service
+        from selenium.webdriver.chrome.options import Options as _Options
+        webdriver, By, Service, Options = _webdriver, _By, _Service, _Options
+
 def build_headless_options():
+    load_selenium()
     opt = Options()
     opt.add_argument("--headless")
     opt.add_argument("--no-sandbox")
     opt.add_argument("--disable-dev-shm-usage")
     return opt
 
+def browser_version_key(chromedriver_path):
+    """Return a string identifying the installed chromedriver + Chrome builds."""
+    parts = []
+    for cmd in ([chromedriver_path, "--version"],
+                [shutil.which("google-chrome") or shutil.which("chromium") or "google-chrome", "--version"]):
+        try:
+            out = subprocess.run(cmd, capture_output=True, text=True, timeout=10).stdout
+            parts.append(out.strip())
+        except (OSError, subprocess.SubprocessError):
+            parts.append("")
+    return " | ".join(parts)
+
+def cached_user_agent(chromedriver_path=None):
+    """
+    Return the cached user agent if it matches the installed browser, else None.
+    Without *chromedriver_path* the browser version is not checked (and no
+    browser binary is run): plain HTTP requests only need a plausible string.
+    """
+    try:
+        with open(UA_CACHE_FILE, "r", encoding="utf-8") as fh:
+            cache = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if chromedriver_path is None or cache.get("version") == browser_version_key(chromedriver_path):
+        return cache.get("user_agent")
+    return None
+
 def get_user_agent(chromedriver_path):
+    """
+    Return Chrome's (non-headless) user agent. A throwaway browser is only
+    started when the on-disk cache is missing or the browser was updated.
+    """
+    global user_agent
+    if user_agent:
+        return user_agent
+    user_agent = cached_user_agent(chromedriver_path)
+    if user_agent:
+        debug(f"cached useragent: {user_agent}")
+        return user_agent
+
     # Setze die Optionen für den temporären Chrome-Browser
     temp_options = build_headless_options()
 
@@ -92,201 +420,628 @@ def get_user_agent(chromedriver_path):
     user_agent = str(user_agent)
     user_agent = user_agent.replace("Headless", "")
 
-    print(f"Debug: latest useragent: {user_agent}")
+    debug(f"latest useragent: {user_agent}")
+
+    try:
+        with open(UA_CACHE_FILE, "w", encoding="utf-8") as fh:
+            json.dump({"version": browser_version_key(chromedriver_path), "user_agent": user_agent}, fh)
+    except OSError as e:
+        debug(f"Could not write user-agent cache – {e}")
 
     return user_agent
 
-# Erfasse den User-Agent
-user_agent = get_user_agent(chromedriver_path)
+# Erfasse den User-Agent lazily (first browser launch or cache hit), never at import
+user_agent = None
 
 # Setze die Optionen für den Chrome-Browser mit dem erfassten User-Agent
 def build_main_driver():
     chrome_options = build_headless_options()
-    chrome_options.add_argument(f'user-agent={user_agent}')
+    chrome_options.add_argument(f'user-agent={get_user_agent(chromedriver_path)}')
     service = Service(chromedriver_path)
-    return webdriver.Chrome(service=service, options=chrome_options)
+    return instrument_driver(webdriver.Chrome(service=service, options=chrome_options))
 
-# ── FIX: defer driver creation to main() to avoid zombie driver on early exit ──
-driver = None  # will be initialized lazily inside main()
+# WebDriver round trips per page (every command, incl. WebElement calls, goes through execute())
+round_trip_stats = {}
+_round_trip_lock = Lock()
 
-def save_page_source(filename):
-    with open(filename, 'w', encoding='utf-8') as file:
-        file.write(driver.page_source)
+def instrument_driver(drv):
+    """Count the WebDriver HTTP round trips *drv* makes, attributed to the last page it loaded."""
+    original_execute = drv.execute
+    drv.current_page = "about:blank"
 
-def click_privacy_button():
-    try:
-        button = driver.find_element(By.XPATH, '//button[@aria-label="Reject all"]')
-        button.click()
-        time.sleep(1)  # Kurze Wartezeit, um sicherzustellen, dass die Aktion abgeschlossen ist
-        print("Debug: 'Alle ablehnen' button clicked successfully.")
-    except Exception:
-        print(f"Debug: Privacy button not found or could not be clicked.")
+    def execute(driver_command, params=None):
+        if driver_command == "get" and params:
+            drv.current_page = params.get("url", drv.current_page)
+        with _round_trip_lock:
+            round_trip_stats[drv.current_page] = round_trip_stats.get(drv.current_page, 0) + 1
+        return original_execute(driver_command, params)
+
+    drv.execute = execute
+    return drv
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── PAGE READINESS (ADAPTIVE WAITS INSTEAD OF FIXED SLEEPS) ───────────────────
+
+# Upper bound in seconds for a single adaptive wait (see --wait-ceiling)
+WAIT_CEILING = 10.0
+
+# The DOM has to stay unchanged this long before a page counts as settled
+DOM_QUIET_PERIOD = 0.4
+
+# Poll interval while waiting
+WAIT_POLL_INTERVAL = 0.1
+
+# Installs a MutationObserver once per document and reports page state in one round trip:
+# [readyState, ms since last DOM mutation, scrollHeight, grid item count, spinner visible]
+_PAGE_STATE_JS = """
+if (!window.__ymadObserver) {
+    window.__ymadLastMutation = Date.now();
+    window.__ymadObserver = new MutationObserver(function () { window.__ymadLastMutation = Date.now(); });
+    window.__ymadObserver.observe(document.documentElement, {childList: true, subtree: true});
+}
+var spinner = document.querySelector('ytmusic-continuation-item-renderer, tp-yt-paper-spinner[active]');
+return [document.readyState,
+        Date.now() - window.__ymadLastMutation,
+        document.body ? document.body.scrollHeight : 0,
+        document.querySelectorAll('ytmusic-two-row-item-renderer, ytmusic-responsive-list-item-renderer').length,
+        !!(spinner && spinner.offsetParent !== null)];
+"""
+
+# Seconds spent waiting, per page
+wait_stats = {}
+_wait_stats_lock = Lock()
+
+def record_wait(page, seconds):
+    with _wait_stats_lock:
+        wait_stats[page] = wait_stats.get(page, 0.0) + seconds
+
+def page_state(drv):
+    state, idle_ms, height, items, spinner = drv.execute_script(_PAGE_STATE_JS)
+    return state, idle_ms / 1000.0, height, items, spinner
+
+def wait_for_page_settled(drv, page, ceiling=None):
+    """
+    Return as soon as *page* has finished loading and its DOM has been quiet
+    for DOM_QUIET_PERIOD seconds, or after *ceiling* (default WAIT_CEILING).
+    """
+    start = time.monotonic()
+    deadline = start + (WAIT_CEILING if ceiling is None else ceiling)
+    while True:
+        try:
+            state, idle, _, _, _ = page_state(drv)
+            if state == "complete" and idle >= DOM_QUIET_PERIOD:
+                break
+        except Exception:
+            pass  # page is navigating – try again
+        if time.monotonic() >= deadline:
+            debug(f"Wait ceiling reached for {page}")
+            break
+        time.sleep(WAIT_POLL_INTERVAL)
+    elapsed = time.monotonic() - start
+    record_wait(page, elapsed)
+    return elapsed
+
+def print_wait_stats():
+    with _wait_stats_lock:
+        stats = dict(wait_stats)
+    if stats:
+        debug(f"Waited {sum(stats.values()):.1f}s in total for {len(stats)} pages to become ready")
+        for page, seconds in sorted(stats.items(), key=lambda kv: -kv[1])[:10]:
+            debug(f"  {seconds:6.2f}s  {page}")
+    with _round_trip_lock:
+        trips = dict(round_trip_stats)
+    if trips:
+        debug(f"{sum(trips.values())} WebDriver round trips for {len(trips)} pages")
+        for page, count in sorted(trips.items(), key=lambda kv: -kv[1])[:10]:
+            debug(f"  {count:6d}  {page}")
+
+# Collects href, title and release type of all matching links in ONE script call
+_BULK_LINKS_JS = """
+var root = arguments[1] || document;
+return Array.prototype.map.call(root.querySelectorAll(arguments[0]), function (a) {
+    var item = a.closest('ytmusic-two-row-item-renderer, ytmusic-responsive-list-item-renderer');
+    var subtitle = item && item.querySelector('.subtitle, .secondary-flex-columns');
+    return {
+        href: a.href || '',
+        title: a.title || a.getAttribute('aria-label') || '',
+        type: subtitle ? subtitle.textContent.split('\\u2022')[0].trim() : ''
+    };
+});
+"""
+
+def bulk_extract_links(drv, css_selector, root=None):
+    """
+    Return ``[{"href", "title", "type"}, ...]`` for every element matching
+    *css_selector* (inside *root*, a WebElement, if given) using a single
+    WebDriver round trip instead of one get_attribute() call per element.
+    """
+    return drv.execute_script(_BULK_LINKS_JS, css_selector, root) or []
+
+# ── Every Selenium helper takes the WebDriver ("session") it should operate on,
+#    so several discovery sessions can run side by side (see DiscoveryPool) ──
+
+def save_page_source(drv, filename):
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write(drv.page_source)
 
-# ── NEW: driver-aware variant to avoid touching the global driver from threads ──
-def click_privacy_button_on(drv):
-    """Same as click_privacy_button(), but operates on the given WebDriver instance."""
+def click_privacy_button(drv):
     try:
         button = drv.find_element(By.XPATH, '//button[@aria-label="Reject all"]')
         button.click()
-        time.sleep(1)
-        print("Debug: 'Alle ablehnen' button clicked successfully (thread-local).")
+        wait_for_page_settled(drv, "privacy dialog")  # wartet, bis die Aktion abgeschlossen ist
+        debug("'Alle ablehnen' button clicked successfully.")
     except Exception:
-        print("Debug: Privacy button not found or could not be clicked (thread-local).")
+        debug(f"Privacy button not found or could not be clicked.")
 
 def similarity_ratio(str1, str2):
     return difflib.SequenceMatcher(None, str1, str2).ratio()
 
-def extract_artist_href(search_term, artist):
-    youtube_music_search_link = f"https://music.youtube.com/search?q={search_term}"
-    print(f"Debug: Loading search page: {youtube_music_search_link}")
-    driver.get(youtube_music_search_link)
-    time.sleep(1)
-    click_privacy_button()
+@timed("search")
+def extract_artist_href(drv, search_term, artist):
+    youtube_music_search_link = f"{YTM_BASE_URL}/search?q={search_term}"
+    debug(f"Loading search page: {youtube_music_search_link}")
+    drv.get(youtube_music_search_link)
+    wait_for_page_settled(drv, youtube_music_search_link)
+    click_privacy_button(drv)
 
-    artist_elements = driver.find_elements(By.CSS_SELECTOR, 'a.yt-simple-endpoint.thumbnail-link[href*="channel/"]')
-    print(f"Debug: Found {len(artist_elements)} elements with selector 'a.yt-simple-endpoint.thumbnail-link'")
+    artist_links = bulk_extract_links(drv, 'a.yt-simple-endpoint.thumbnail-link[href*="channel/"]')
+    debug(f"Found {len(artist_links)} elements with selector 'a.yt-simple-endpoint.thumbnail-link'")
 
-    for element in artist_elements:
-        title = element.get_attribute('title')
-        href = element.get_attribute('href')
+    for link in artist_links:
+        title = link['title']
+        href = link['href']
         similarity = similarity_ratio(artist.lower(), title.lower())
-        print(f"Debug: Found element with title '{title}' and href '{href}' with similarity {similarity:.2f}")
+        debug(f"Found element with title '{title}' and href '{href}' with similarity {similarity:.2f}")
         if similarity > 0.6 and "channel/" in href:
-            print(f"Debug: Matching element found with href: {href}")
-            return title, href
-    print("Debug: No matching element found.")
-    return None, None
-
-def extract_section_hrefs(section_name):
-    sections = driver.find_elements(By.CSS_SELECTOR, 'div.ytmusic-shelf')
-    for section in sections:
-        try:
-            link_element = section.find_element(
-                By.XPATH,
-                f"//yt-formatted-string[contains(@class, 'title text style-scope ytmusic-carousel-shelf-basic-header-renderer') and .//a[contains(@href, 'browse/') and contains(text(), '{section_name}')]]//a"
-            )
-            href = link_element.get_attribute('href')
-            print(f"Debug: Found {section_name} section with href: {href}")
-            link_element.click()
-            time.sleep(1)
-            return section, True
-        except Exception:
-            print(f"Debug: No <a> tag found for {section_name}.")
-            try:
-                title_element = section.find_element(By.XPATH, f'.//yt-formatted-string[contains(text(), "{section_name}")]')
-                print(f"Debug: Found {section_name} section without href")
-                return section, False
-            except Exception:
-                print(f"Debug: No <yt-formatted-string> tag found for {section_name}.")
-                continue
-    print(f"Debug: {section_name} section not found.")
-    return None, False
+            debug(f"Matching element found with href: {href}")
+            return title, href, similarity
+    debug("No matching element found.")
+    return None, None, None
+
+@timed("section")
+def extract_release_shelves(drv, artist_href, click_privacy=False):
+    """
+    Load *artist_href* once and return its release shelves (see
+    parse_artist_shelves and is_release_shelf), each with the ``url`` of its
+    "see all" grid or None. Shelves are told apart by their browse endpoints,
+    not by their (localized) titles.
+    """
+    drv.get(artist_href)
+    wait_for_page_settled(drv, artist_href)
+    if click_privacy:
+        click_privacy_button(drv)
+    shelves = [shelf for shelf in parse_artist_shelves(parse_initial_data(drv.page_source))
+               if is_release_shelf(shelf)]
+    # The header links carry the exact grid URLs (browse ID plus params, if any)
+    links = [link["href"] for link in bulk_extract_links(drv, 'a[href*="browse/MPAD"]')]
+    if not shelves:
+        # No initial data on the page: every discography link is a release grid
+        return [{"title": "", "more": None, "items": [], "types": {}, "url": href} for href in dict.fromkeys(links)]
+    for shelf in shelves:
+        shelf["url"] = None
+        if shelf["more"]:
+            browse_id = shelf["more"]["browseId"]
+            shelf["url"] = next((href for href in links if browse_id in href), f"{YTM_BASE_URL}/browse/{browse_id}")
+    return shelves
 
-def scroll_to_bottom(driver, scroll_pause_time=2):
-    last_height = driver.execute_script("return document.body.scrollHeight")
+@timed("scroll")
+def scroll_to_bottom(driver, page="grid", ceiling=None):
+    """
+    Scroll until the grid stops growing. After each scroll step the next one
+    starts as soon as the item count or page height changes; the grid counts as
+    complete once the DOM is quiet with no continuation spinner, or when a step
+    waits longer than *ceiling* (default WAIT_CEILING) seconds.
+    """
+    ceiling = WAIT_CEILING if ceiling is None else ceiling
+    start = time.monotonic()
+    _, _, last_height, last_items, _ = page_state(driver)
     while True:
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(scroll_pause_time)
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
+        step_deadline = time.monotonic() + ceiling
+        grew = False
+        while time.monotonic() < step_deadline:
+            time.sleep(WAIT_POLL_INTERVAL)
+            _, idle, height, items, spinner = page_state(driver)
+            if height != last_height or items != last_items:
+                last_height, last_items, grew = height, items, True
+                break
+            if idle >= DOM_QUIET_PERIOD and not spinner:
+                break
+        if not grew:
             break
-        last_height = new_height
-    print("Debug: Scrolling completed or maximum scroll count reached.")
+    elapsed = time.monotonic() - start
+    record_wait(page, elapsed)
+    debug(f"Scrolling completed after {elapsed:.1f}s ({last_items} items).")
 
-def extract_item_hrefs_from_page(section=None):
-    if section is None:
-        scroll_to_bottom(driver)
-        item_elements = driver.find_elements(By.CSS_SELECTOR, 'a.yt-simple-endpoint.image-wrapper.style-scope.ytmusic-two-row-item-renderer')
-    else:
-        scroll_to_bottom(driver)
-        item_elements = section.find_elements(By.CSS_SELECTOR, 'a.yt-simple-endpoint.image-wrapper.style-scope.ytmusic-two-row-item-renderer')
+def extract_item_hrefs_from_page(drv, section=None, types=None):
+    page = drv.current_url
+    scroll_to_bottom(drv, page)
+    item_links = bulk_extract_links(
+        drv, 'a.yt-simple-endpoint.image-wrapper.style-scope.ytmusic-two-row-item-renderer', section)
 
     item_hrefs = []
-    for element in item_elements:
-        href = element.get_attribute('href')
-        if "browse/" in href:
-            item_hrefs.append(href)
+    for link in item_links:
+        if "browse/" in link['href']:
+            item_hrefs.append(link['href'])
+            release_type = release_item_type(link['type'])
+            if types is not None and release_type:
+                types.setdefault(link['href'], release_type)
 
-    print(f"Debug: Total number of items found: {len(item_hrefs)}")
+    debug(f"Total number of items found: {len(item_hrefs)}")
     return item_hrefs
 
+def extract_grid_hrefs(drv, grid_url, types=None):
+    """
+    Load a "see all" grid and return the hrefs of all its releases; their
+    types, where the item subtitles name them, are added to *types*, if given.
+    """
+    drv.get(grid_url)
+    wait_for_page_settled(drv, grid_url)
+    return extract_item_hrefs_from_page(drv, types=types)
+
+@timed("tag")
 def update_metadata(file_path, album_artist):
+    from mutagen.easymp4 import EasyMP4
     audio = EasyMP4(file_path)
     audio['albumartist'] = album_artist
     audio.save()
-    print(f"Debug: Updated metadata with album artist {album_artist} for {file_path}")
+    debug(f"Updated metadata with album artist {album_artist} for {file_path}")
+
+def retag_like(file_path, sibling_path, track_number=None):
+    """Give a copied track the album tags (album, date, disc, cover, album artist) of *sibling_path*."""
+    from mutagen.mp4 import MP4
+    sibling, audio = MP4(sibling_path), MP4(file_path)
+    if audio.tags is None:
+        audio.add_tags()
+    for key in ("\xa9alb", "\xa9day", "disk", "covr", "aART"):
+        if sibling.tags and key in sibling.tags:
+            audio.tags[key] = sibling.tags[key]
+    if track_number:
+        total = sibling.tags.get("trkn", [(0, 0)])[0][1] if sibling.tags else 0
+        audio.tags["trkn"] = [(track_number, total)]
+    audio.save()
+    debug(f"Retagged {file_path} like {sibling_path}")
+
+# Extensions yt-dlp leaves behind when a track's download/conversion did not finish
+PARTIAL_EXTENSIONS = (".webm", ".webp", ".part", ".ytdl")
+
+@dataclass
+class AlbumScan:
+    """Files of one staging folder, classified in a single directory walk."""
+    root: str
+    complete: list = field(default_factory=list)   # finished .m4a tracks
+    partial: list = field(default_factory=list)    # leftovers of unfinished tracks
+    other: list = field(default_factory=list)      # anything else (covers, logs …)
+    tagged: list = field(default_factory=list)     # complete tracks whose tags were updated
+
+    @property
+    def files(self):
+        return self.complete + self.partial + self.other
+
+    @property
+    def album_folder(self):
+        """Deepest folder holding files (``<root>/<artist>/<album>``), or None if empty."""
+        folders = [os.path.dirname(f) for f in self.files]
+        return max(folders, key=lambda d: d.count(os.sep), default=None)
+
+    def relocate(self, old_folder, new_folder):
+        """Rewrite file paths after *old_folder* was renamed to *new_folder*."""
+        def move(paths):
+            return [new_folder + p[len(old_folder):] if p.startswith(old_folder + os.sep) else p
+                    for p in paths]
+        self.complete, self.partial = move(self.complete), move(self.partial)
+        self.other, self.tagged = move(self.other), move(self.tagged)
+
+def scan_staging_folder(folder):
+    """Walk *folder* once and classify every file it contains."""
+    scan = AlbumScan(folder)
+    stack = [folder]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.name.endswith(".m4a"):
+                scan.complete.append(entry.path)
+            elif entry.name.endswith(PARTIAL_EXTENSIONS):
+                scan.partial.append(entry.path)
+            else:
+                scan.other.append(entry.path)
+    return scan
 
-def handle_album_conflicts(src_folder, dest_folder):
-    deepest_folder = get_deepest_folder(src_folder)
-    print(f"Debug: Deepest folder in src_folder: {deepest_folder}")
+def handle_album_conflicts(src_folder, dest_folder, scan=None):
+    """Resolve album name clashes; return the new source album path if it was renamed."""
+    scan = scan or scan_staging_folder(src_folder)
+    deepest_folder = scan.album_folder
+    debug(f"Deepest folder in src_folder: {deepest_folder}")
+    if deepest_folder is None:
+        return None
 
     relative_path = os.path.relpath(deepest_folder, src_folder)
     dest_deepest_folder = os.path.join(dest_folder, relative_path)
-    print(f"Debug: Checking for deepest folder in dest_folder: {dest_deepest_folder}")
+    debug(f"Checking for deepest folder in dest_folder: {dest_deepest_folder}")
 
-    if os.path.exists(dest_deepest_folder):
-        src_file_count = count_files(deepest_folder)
-        dest_file_count = count_files(dest_deepest_folder)
+    dest_file_count = library_track_count(dest_deepest_folder, verify=True)
+    if dest_file_count is not None:
+        src_file_count = sum(1 for f in scan.files if os.path.dirname(f) == deepest_folder)
 
         if src_file_count < dest_file_count:
             rename_to = determine_unique_name(dest_deepest_folder, "(EP) " + os.path.basename(deepest_folder))
             new_deepest_folder = os.path.join(os.path.dirname(deepest_folder), rename_to)
             os.rename(deepest_folder, new_deepest_folder)
-            print(f"Debug: Renamed {deepest_folder} to {new_deepest_folder}")
+            scan.relocate(deepest_folder, new_deepest_folder)
+            debug(f"Renamed {deepest_folder} to {new_deepest_folder}")
+            return new_deepest_folder
         else:
             rename_to = determine_unique_name(dest_deepest_folder, "(EP) " + os.path.basename(dest_deepest_folder))
             new_dest_deepest_folder = os.path.join(os.path.dirname(dest_deepest_folder), rename_to)
             os.rename(dest_deepest_folder, new_dest_deepest_folder)
-            print(f"Debug: Renamed {dest_deepest_folder} to {new_dest_deepest_folder}")
+            debug(f"Renamed {dest_deepest_folder} to {new_dest_deepest_folder}")
+            if manifest is not None:
+                manifest.relocate(dest_deepest_folder, new_dest_deepest_folder)
+            if library is not None:
+                library.rename_album(dest_deepest_folder, new_dest_deepest_folder)
     else:
-        print(f"Debug: No path conflict found.")
+        debug(f"No path conflict found.")
+    return None
+
+def library_track_count(album_folder, verify=False):
+    """
+    Files in a library album folder, or None if it does not exist (index
+    lookup if loaded; other hosts may have committed if SHARED_LIBRARY).
+    With *verify*, an index hit is checked against the disk as well.
+    """
+    if library is not None and not SHARED_LIBRARY:
+        # The index spares each probe a stat: determine_unique_name() asks for every
+        # candidate name. The disk is only asked on a miss (a folder created outside
+        # this tool) and, with verify, before a clash is acted on (one deleted since).
+        count = library.track_count(album_folder)
+        if count is not None:
+            if not verify or os.path.isdir(album_folder):
+                return count
+            library.remove_album(album_folder)
+            return None
+        if os.path.isdir(album_folder):
+            count = count_files(album_folder)
+            library.add_album(album_folder, count)
+            return count
+        return None
+    return count_files(album_folder) if os.path.exists(album_folder) else None
 
 def determine_unique_name(base_folder, base_name):
     index = 1
     new_name = base_name
-    while os.path.exists(os.path.join(os.path.dirname(base_folder), new_name)):
+    while library_track_count(os.path.join(os.path.dirname(base_folder), new_name)) is not None:
         new_name = f"{base_name}{index}"
         index += 1
     return new_name
 
-def get_deepest_folder(folder):
-    deepest_path = ""
-    max_depth = 0
-    for root, dirs, files in os.walk(folder):
-        depth = root[len(folder):].count(os.sep)
-        if depth > max_depth:
-            max_depth = depth
-            deepest_path = root
-    return deepest_path
-
 def count_files(folder):
     return sum([len(files) for r, d, files in os.walk(folder)])
 
-# ── FIXED: single-writer lock around final move to avoid race conditions ──────
-def move_to_finished_folder(src_folder, dest_folder):
-    """Move *src_folder* into *dest_folder* atomically under a global lock."""
-    with move_lock:
-        if not os.path.exists(dest_folder):
-            os.makedirs(dest_folder)
+# Hidden folder inside "music" used when tmp folders live on another filesystem
+LIBRARY_STAGING_DIR = ".staging"
+
+# Lock files of artist folders, next to the artist folders in "music"
+COMMIT_LOCK_DIR = ".locks"
+# A lock file older than this (seconds) is left over from a crashed host
+COMMIT_LOCK_STALE = 600
+COMMIT_LOCK_POLL = 0.2
+# A held lock file is touched this often, so a long commit never looks stale
+COMMIT_LOCK_REFRESH = COMMIT_LOCK_STALE / 4
+
+class LibraryLock:
+    """
+    Per-artist commit lock that also holds across hosts sharing the library:
+    a lock file created with O_EXCL (honoured by NFS and SMB) in
+    ``<music>/.locks``, taken after the in-process lock. While it is held,
+    its mtime is refreshed every COMMIT_LOCK_REFRESH seconds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = Lock()
+        self._token = None
+        self._held = None
+
+    def _break_if_stale(self):
+        """
+        Remove a lock file nobody refreshed for COMMIT_LOCK_STALE seconds.
+        It is first renamed to a name only this process uses, so when two
+        hosts break the same lock, only one of them gets the file. If that
+        file turns out to be fresh (replaced since the age check), it is put
+        back.
+        """
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return
+        if age <= COMMIT_LOCK_STALE:
+            return
+        claimed = f"{self.path}.{socket.gethostname()}.{os.getpid()}.{random.getrandbits(32):08x}.stale"
+        try:
+            os.rename(self.path, claimed)
+        except FileNotFoundError:
+            return   # another host broke it first
+        if time.time() - os.path.getmtime(claimed) > COMMIT_LOCK_STALE:
+            print(f"Warn: Removing stale commit lock '{self.path}' ({age:.0f}s old)")
+            os.remove(claimed)
+            return
+        try:
+            os.link(claimed, self.path)   # never replaces a lock taken in the meantime
+        except FileExistsError:
+            pass
+        except OSError:
+            # No hard links (e.g. SMB): put it back unless a new lock appeared
+            if not os.path.exists(self.path):
+                os.rename(claimed, self.path)
+                return
+        os.remove(claimed)
+
+    def _refresh(self, held):
+        while not held.wait(COMMIT_LOCK_REFRESH):
+            with contextlib.suppress(OSError):
+                os.utime(self.path)
+
+    def acquire(self):
+        self._local.acquire()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                self._break_if_stale()
+                time.sleep(COMMIT_LOCK_POLL * random.uniform(0.5, 1.5))
+                continue
+            self._token = f"{socket.gethostname()} {os.getpid()} {random.getrandbits(64):016x}\n"
+            with os.fdopen(fd, "w") as fh:
+                fh.write(self._token)
+            self._held = Event()
+            Thread(target=self._refresh, args=(self._held,), name="CommitLockRefresh", daemon=True).start()
+            return True
+
+    def release(self):
+        self._held.set()
+        # Only remove the file if it is still ours
+        with contextlib.suppress(OSError):
+            with open(self.path, "r") as fh:
+                ours = fh.read() == self._token
+            if ours:
+                os.remove(self.path)
+        self._local.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+def artist_commit_lock(artist_folder):
+    """
+    Return the lock guarding commits into one artist folder of the library
+    (a LibraryLock if SHARED_LIBRARY).
+    """
+    key = os.path.normcase(os.path.abspath(artist_folder))
+    with _commit_locks_guard:
+        lock = _commit_locks.get(key)
+        if lock is None:
+            lock = _commit_locks[key] = LibraryLock(os.path.join(
+                os.path.dirname(artist_folder), COMMIT_LOCK_DIR,
+                os.path.basename(artist_folder) + ".lock")) if SHARED_LIBRARY else Lock()
+        return lock
+
+def same_filesystem(path_a, path_b):
+    return os.stat(path_a).st_dev == os.stat(path_b).st_dev
+
+def stage_on_library_filesystem(src_folder, dest_folder, scan, tracks):
+    """
+    Copy *src_folder* into ``<dest_folder>/.staging`` (no lock held) so the
+    commit can rename instead of copying. Returns the staged folder and the
+    rebased *scan* and *tracks*.
+    """
+    staging_root = os.path.join(dest_folder, LIBRARY_STAGING_DIR)
+    os.makedirs(staging_root, exist_ok=True)
+    staged = tempfile.mkdtemp(dir=staging_root, prefix=os.path.basename(src_folder) + "-")
+    shutil.copytree(src_folder, staged, dirs_exist_ok=True)
+    shutil.rmtree(src_folder)
+    debug(f"Copied {src_folder} across filesystems to {staged}")
+
+    def rebase(path):
+        return os.path.join(staged, os.path.relpath(path, src_folder))
+    scan = AlbumScan(staged, [rebase(p) for p in scan.complete], [rebase(p) for p in scan.partial],
+                     [rebase(p) for p in scan.other], [rebase(p) for p in scan.tagged])
+    tracks = {vid: rebase(path) for vid, path in (tracks or {}).items()}
+    return staged, scan, tracks
+
+@timed("commit")
+def move_to_finished_folder(src_folder, dest_folder, item_id=None, item_url=None,
+                            artist_name=None, tracks=None, scan=None, status="complete"):
+    """
+    Publish the album in *src_folder* into *dest_folder* with one atomic rename.
+
+    Only the target artist folder is locked, so workers committing different
+    artists never wait for each other. If *src_folder* is on another
+    filesystem it is first copied into ``<dest_folder>/.staging`` outside any
+    lock. *scan* is the AlbumScan of *src_folder* from finalization; without it
+    the folder is scanned here. If *item_id* is given, the album (and the video
+    IDs in *tracks*, a ``{video_id: path_inside_src_folder}`` dict) is
+    committed to the manifest with *status*. Tracks of a resumed partial album
+    are merged into its existing folder instead of being treated as a conflict.
+    """
+    scan = scan or scan_staging_folder(src_folder)
+    os.makedirs(dest_folder, exist_ok=True)
+    if not scan.files:
+        shutil.rmtree(src_folder, ignore_errors=True)
+        return
+    if not same_filesystem(src_folder, dest_folder):
+        src_folder, scan, tracks = stage_on_library_filesystem(src_folder, dest_folder, scan, tracks)
+
+    album_folder = scan.album_folder
+    dest_album = os.path.join(dest_folder, os.path.relpath(album_folder, src_folder))
+    artist_folder = os.path.dirname(dest_album)
 
-        handle_album_conflicts(src_folder, dest_folder)
+    with timed_acquire(artist_commit_lock(artist_folder), "commit_lock_wait"):
+        resumed = (manifest is not None and item_id and manifest.album_folder(item_id) == dest_album
+                   and os.path.isdir(dest_album))
+        renamed_folder = None if resumed else handle_album_conflicts(src_folder, dest_folder, scan)
+        if renamed_folder:
+            tracks = {vid: path.replace(album_folder, renamed_folder, 1)
+                      for vid, path in (tracks or {}).items()}
+            album_folder = renamed_folder
+            dest_album = os.path.join(dest_folder, os.path.relpath(album_folder, src_folder))
 
-        for root, dirs, files in os.walk(src_folder, topdown=False):
-            for name in dirs:
-                dest_dir = os.path.join(dest_folder, os.path.relpath(os.path.join(root, name), src_folder))
-                if not os.path.exists(dest_dir):
-                    os.makedirs(dest_dir)
+        os.makedirs(artist_folder, exist_ok=True)
+        # Appeared since the conflict check (created outside this tool): merge instead of failing the rename
+        clash = not resumed and os.path.isdir(dest_album)
+        if resumed or clash:
+            # Merge the newly fetched tracks into the already published folder
+            for src_file in scan.files:
+                if os.path.dirname(src_file) == album_folder:
+                    dest_file = os.path.join(dest_album, os.path.basename(src_file))
+                    if clash:
+                        dest_file = unique_path(dest_file)
+                        # Recorded paths follow the file under its new name
+                        renamed = os.path.join(album_folder, os.path.basename(dest_file))
+                        tracks = {vid: renamed if path == src_file else path
+                                  for vid, path in (tracks or {}).items()}
+                    os.replace(src_file, dest_file)
+        else:
+            os.rename(album_folder, dest_album)  # atomic publish of the whole album
+        if library is not None:
+            if clash:
+                # The index had no (or a stale) entry for this folder – count what is there now
+                library.add_album(dest_album, count_files(dest_album), set((tracks or {}).keys()))
+            else:
+                library.add_album(dest_album, sum(1 for f in scan.files if os.path.dirname(f) == album_folder),
+                                  set((tracks or {}).keys()), merge=bool(resumed))
+
+    # Stray files outside the album folder (rare) are moved individually
+    for src_file in scan.files:
+        if os.path.dirname(src_file) != album_folder and os.path.exists(src_file):
+            dest_file = os.path.join(dest_folder, os.path.relpath(src_file, src_folder))
+            os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+            shutil.move(src_file, dest_file)
+
+    shutil.rmtree(src_folder, ignore_errors=True)
+    debug(f"Moved {src_folder} to {dest_album}")
 
-            for name in files:
-                src_file = os.path.join(root, name)
-                dest_file = os.path.join(dest_folder, os.path.relpath(src_file, src_folder))
-                dest_dir = os.path.dirname(dest_file)
-                if not os.path.exists(dest_dir):
-                    os.makedirs(dest_dir)
-                shutil.move(src_file, dest_file)
+    if manifest is not None and item_id:
+        final_tracks = {vid: os.path.join(dest_folder, os.path.relpath(path, src_folder))
+                        for vid, path in (tracks or {}).items()}
+        manifest.mark_complete(item_id, item_url, artist_name, dest_album, final_tracks, status)
 
-        shutil.rmtree(src_folder)
-        print(f"Debug: Moved {src_folder} to {dest_folder}")
+def finalize_album(tmp_folder, artist_name, scan, item_id=None, item_url=None, tracks=None,
+                   status="complete"):
+    """Tag and commit a downloaded staging folder, using *scan* as its file manifest."""
+    for file_path in scan.complete:
+        update_metadata(file_path, artist_name)
+        scan.tagged.append(file_path)
+    move_to_finished_folder(tmp_folder, FINISHED_FOLDER, item_id=item_id, item_url=item_url,
+                            artist_name=artist_name, tracks=tracks, scan=scan, status=status)
 
 def sanitize_filename(name):
     if name == '':
@@ -367,7 +1122,434 @@ def write_netscape_cookies(cookies, out_path: str):
             fh.write("\t".join([domain, flag, path, secure, expiry, name, value]) + "\n")
 
 # ──────────────────────────────────────────────────────────────────────────────
-# ── COOKIE REFRESHER THREAD (FIXED: ATOMIC WRITES, STABLE FILE) ───────────────
+# ── BROWSERLESS DISCOVERY (HTTP + ytInitialData) ─────────────────────────────
+
+# Origin used by both discovery backends (pointed at a local fake server by bench/)
+YTM_BASE_URL = "https://music.youtube.com"
+
+# Innertube client name of the YouTube Music web app
+INNERTUBE_CLIENT_NAME = "WEB_REMIX"
+
+class HttpSession:
+    """
+    Minimal keep-alive HTTPS client for YouTube Music.
+
+    Every thread gets its own persistent connection (http.client connections
+    are not thread-safe), so a single session can serve a pool of discovery
+    threads without reconnecting for every page.
+    """
+
+    def __init__(self, base_url=None, cookies=None, user_agent=None, timeout=30):
+        base_url = base_url or YTM_BASE_URL
+        parsed = urllib.parse.urlparse(base_url)
+        self.base_url = base_url.rstrip("/")
+        self.scheme = parsed.scheme
+        self.host = parsed.netloc
+        self.timeout = timeout
+        self.user_agent = user_agent or "Mozilla/5.0"
+        self.hostname = parsed.hostname or ""
+        # Shared jar: picks up refreshed cookies and feeds back Set-Cookie headers
+        self.cookies = cookies if cookies is not None else session_cookies
+        self.innertube_api_key = None
+        self.innertube_client_version = None
+        self._local = threading.local()
+
+    def _connection(self):
+        import http.client  # deferred: pulls in ssl, not needed for --help / -da
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn_cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = self._local.conn = conn_cls(self.host, timeout=self.timeout)
+        return conn
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request over this thread's pooled connection and return the decoded body."""
+        all_headers = {
+            "User-Agent": self.user_agent,
+            "Accept-Language": "en-US,en;q=0.9",
+            "Accept-Encoding": "gzip",
+        }
+        cookie_header = self.cookies.header_for(self.hostname)
+        if cookie_header:
+            all_headers["Cookie"] = cookie_header
+        all_headers.update(headers or {})
+
+        from http.client import HTTPException
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=all_headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                set_cookies = resp.msg.get_all("Set-Cookie") or []
+                break
+            except (HTTPException, OSError):
+                # Stale keep-alive connection – reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+        if set_cookies:
+            self.cookies.update_from_headers(set_cookies, self.hostname)
+        if resp.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        if resp.status >= 400:
+            raise RuntimeError(f"HTTP {resp.status} for {method} {path}")
+        return data.decode("utf-8", errors="replace")
+
+    def get_page(self, url):
+        """Fetch a YouTube Music page and return its parsed initial data."""
+        parsed = urllib.parse.urlparse(url)
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        html = self.request("GET", path or "/")
+        if self.innertube_api_key is None:
+            self.innertube_api_key, self.innertube_client_version = parse_innertube_config(html)
+        return parse_initial_data(html)
+
+    def innertube(self, endpoint, payload, query=None):
+        """POST *payload* to the innertube API (``/youtubei/v1/<endpoint>``)."""
+        if self.innertube_client_version is None:
+            self.get_page(self.base_url + "/")
+        params = {"prettyPrint": "false"}
+        if self.innertube_api_key:
+            params["key"] = self.innertube_api_key
+        params.update(query or {})
+        body = dict(payload)
+        body["context"] = {"client": {
+            "clientName": INNERTUBE_CLIENT_NAME,
+            "clientVersion": self.innertube_client_version,
+            "hl": "en",
+        }}
+        text = self.request(
+            "POST", f"/youtubei/v1/{endpoint}?{urllib.parse.urlencode(params)}",
+            body=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Origin": self.base_url},
+        )
+        return json.loads(text)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+# ── page parsing (pure functions, testable against saved HTML/JSON fixtures) ──
+
+_JS_ESCAPE_RE = re.compile(r"\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|.)", re.S)
+
+_INITIAL_DATA_PUSH_RE = re.compile(
+    r"initialData\.push\(\{path:\s*'((?:[^'\\]|\\.)*)',\s*"
+    r"params:\s*JSON\.parse\('((?:[^'\\]|\\.)*)'\),\s*"
+    r"data:\s*'((?:[^'\\]|\\.)*)'\}\);",
+    re.S,
+)
+
+def _js_unescape(text):
+    """Undo JavaScript string-literal escaping (``\\x7b``, ``\\u00e4``, ``\\/`` …)."""
+    simple = {"n": "\n", "r": "\r", "t": "\t", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+
+    def repl(m):
+        esc = m.group(1)
+        if esc[0] in "xu" and len(esc) > 1:
+            return chr(int(esc[1:], 16))
+        return simple.get(esc, esc)
+    return _JS_ESCAPE_RE.sub(repl, text)
+
+def parse_initial_data(html):
+    """
+    Return the list of initial-data responses embedded in a page.
+
+    YouTube Music pages push one or more JS-escaped JSON blobs through
+    ``initialData.push({... data: '...'})``; regular YouTube pages assign
+    ``ytInitialData = {...};``. Both forms are understood.
+    """
+    responses = []
+    for m in _INITIAL_DATA_PUSH_RE.finditer(html):
+        try:
+            responses.append(json.loads(_js_unescape(m.group(3))))
+        except ValueError:
+            continue
+    if not responses:
+        m = re.search(r"ytInitialData\"?\]?\s*=\s*", html)
+        if m:
+            try:
+                responses.append(json.JSONDecoder().raw_decode(html, m.end())[0])
+            except ValueError:
+                pass
+    return responses
+
+def parse_innertube_config(html):
+    """Extract ``(INNERTUBE_API_KEY, INNERTUBE_CLIENT_VERSION)`` from a page's ytcfg."""
+    key = re.search(r'"INNERTUBE_API_KEY"\s*:\s*"([^"]+)"', html)
+    version = re.search(r'"INNERTUBE_CLIENT_VERSION"\s*:\s*"([^"]+)"', html)
+    return (key.group(1) if key else None, version.group(1) if version else None)
+
+def iter_key(obj, key):
+    """Yield every value stored under *key* anywhere inside a nested JSON object."""
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            for k, v in cur.items():
+                if k == key:
+                    yield v
+                if isinstance(v, (dict, list)):
+                    stack.append(v)
+        elif isinstance(cur, list):
+            stack.extend(reversed(cur))
+
+def runs_text(text_obj):
+    """Flatten a ``{"runs": [...]}`` / ``{"simpleText": ...}`` text object."""
+    if not isinstance(text_obj, dict):
+        return ""
+    if "simpleText" in text_obj:
+        return text_obj["simpleText"]
+    return "".join(run.get("text", "") for run in text_obj.get("runs", []))
+
+def endpoint_page_type(browse_endpoint):
+    return (browse_endpoint.get("browseEndpointContextSupportedConfigs", {})
+            .get("browseEndpointContextMusicConfig", {})
+            .get("pageType"))
+
+def parse_search_artists(responses):
+    """Return ``[(title, channel_id), ...]`` for every artist result on a search page."""
+    artists = []
+    for data in responses:
+        for renderer in iter_key(data, "musicResponsiveListItemRenderer"):
+            endpoint = renderer.get("navigationEndpoint", {}).get("browseEndpoint", {})
+            if endpoint_page_type(endpoint) != "MUSIC_PAGE_TYPE_ARTIST":
+                continue
+            columns = renderer.get("flexColumns") or [{}]
+            title = runs_text(columns[0].get("musicResponsiveListItemFlexColumnRenderer", {}).get("text"))
+            artists.append((title, endpoint["browseId"]))
+        for renderer in iter_key(data, "musicCardShelfRenderer"):
+            for run in renderer.get("title", {}).get("runs", []):
+                endpoint = run.get("navigationEndpoint", {}).get("browseEndpoint", {})
+                if endpoint_page_type(endpoint) == "MUSIC_PAGE_TYPE_ARTIST":
+                    artists.append((run.get("text", ""), endpoint["browseId"]))
+    return artists
+
+def parse_artist_shelves(responses):
+    """
+    Return the carousel shelves of an artist page as dicts with ``title``,
+    ``more`` (the "see all" browse endpoint or None), ``items`` (release
+    browse IDs), ``types`` (see parse_release_types), ``size`` (all items)
+    and ``foreign`` (an item links to an artist, as on "appears on" shelves).
+    """
+    shelves = []
+    for data in responses:
+        for shelf in iter_key(data, "musicCarouselShelfRenderer"):
+            header = shelf.get("header", {}).get("musicCarouselShelfBasicHeaderRenderer", {})
+            more = None
+            for run in header.get("title", {}).get("runs", []):
+                more = run.get("navigationEndpoint", {}).get("browseEndpoint") or more
+            button = header.get("moreContentButton", {}).get("buttonRenderer", {})
+            more = more or button.get("navigationEndpoint", {}).get("browseEndpoint")
+            contents = shelf.get("contents", [])
+            subtitles = [item.get("subtitle", {}) for item in iter_key(contents, "musicTwoRowItemRenderer")]
+            shelves.append({
+                "title": runs_text(header.get("title")),
+                "more": more,
+                "items": parse_release_ids(contents),
+                "types": parse_release_types(contents),
+                "size": len(subtitles),
+                "foreign": any(endpoint_page_type(e) == "MUSIC_PAGE_TYPE_ARTIST"
+                               for e in iter_key(subtitles, "browseEndpoint")),
+            })
+    return shelves
+
+def is_release_shelf(shelf):
+    """
+    True for the artist's own album, single and EP shelves in any language:
+    they hold only album pages, none of them credited to another artist, and
+    their "see all" (short shelves have none) opens the artist's discography,
+    an ``MPAD…`` browse ID.
+    """
+    if not shelf["items"] or len(shelf["items"]) < shelf["size"] or shelf["foreign"]:
+        return False
+    return shelf["more"] is None or shelf["more"].get("browseId", "").startswith("MPAD")
+
+# The first part of a release item's subtitle ("Single • 2021") names its type, but
+# localized. Labels not listed here (or a bare year, as on artist pages) leave it unknown.
+RELEASE_TYPE_LABELS = {
+    "album": ("album", "álbum", "albüm", "albumi", "альбом", "アルバム", "앨범", "专辑", "專輯"),
+    "single": ("single", "sencillo", "singolo", "singiel", "singel", "сингл", "シングル", "싱글", "单曲", "單曲"),
+    "ep": ("ep",),
+}
+_RELEASE_TYPE_BY_LABEL = {label: release_type for release_type, labels in RELEASE_TYPE_LABELS.items()
+                          for label in labels}
+
+def release_item_type(subtitle):
+    """'album', 'single' or 'ep' for the subtitle text of a release item, or None."""
+    return _RELEASE_TYPE_BY_LABEL.get(subtitle.split("\u2022")[0].strip().casefold())
+
+def iter_release_items(data):
+    """Yield ``(browse_id, item)`` for the album/single two-row items (grid or carousel) in *data*."""
+    for item in iter_key(data, "musicTwoRowItemRenderer"):
+        endpoint = item.get("navigationEndpoint", {}).get("browseEndpoint", {})
+        browse_id = endpoint.get("browseId", "")
+        if endpoint_page_type(endpoint) == "MUSIC_PAGE_TYPE_ALBUM" or browse_id.startswith("MPRE"):
+            yield browse_id, item
+
+def parse_release_ids(data):
+    """Return the album/single browse IDs of all two-row items (grid or carousel) in *data*."""
+    return list(dict.fromkeys(browse_id for browse_id, _ in iter_release_items(data)))
+
+def parse_release_types(data):
+    """Return ``{browse_id: type}`` for the releases in *data* whose subtitle names their type."""
+    types = {}
+    for browse_id, item in iter_release_items(data):
+        release_type = release_item_type(runs_text(item.get("subtitle")))
+        if release_type:
+            types.setdefault(browse_id, release_type)
+    return types
+
+def parse_continuation(data):
+    """Return the next continuation token of a grid response, or None."""
+    for cont in iter_key(data, "nextContinuationData"):
+        return cont.get("continuation")
+    for command in iter_key(data, "continuationCommand"):
+        return command.get("token")
+    return None
+
+# ── HTTP counterparts of the Selenium extract_* functions ──
+
+@timed("search")
+def http_extract_artist_href(session, search_term, artist):
+    """Browserless extract_artist_href(): returns ``(title, channel_href, similarity)`` or Nones."""
+    url = f"{session.base_url}/search?q={search_term}"
+    debug(f"Fetching search page: {url}")
+    for title, channel_id in parse_search_artists(session.get_page(url)):
+        similarity = similarity_ratio(artist.lower(), title.lower())
+        debug(f"Found artist '{title}' ({channel_id}) with similarity {similarity:.2f}")
+        if similarity > 0.6:
+            href = f"{session.base_url}/channel/{channel_id}"
+            debug(f"Matching element found with href: {href}")
+            return title, href, similarity
+    debug("No matching element found.")
+    return None, None, None
+
+@timed("grid")
+def http_extract_grid_ids(session, browse_endpoint, types=None):
+    """
+    Fetch a "see all" grid through innertube, following continuations. The
+    release types found (see parse_release_types) are added to *types*, if given.
+    """
+    payload = {"browseId": browse_endpoint["browseId"]}
+    if browse_endpoint.get("params"):
+        payload["params"] = browse_endpoint["params"]
+    data = session.innertube("browse", payload)
+    ids = parse_release_ids(data)
+    if types is not None:
+        types.update(parse_release_types(data))
+    token = parse_continuation(data)
+    while token:
+        data = session.innertube("browse", {"continuation": token},
+                                 query={"ctoken": token, "continuation": token, "type": "next"})
+        if types is not None:
+            types.update(parse_release_types(data))
+        new_ids = [i for i in parse_release_ids(data) if i not in ids]
+        next_token = parse_continuation(data)
+        if not new_ids or next_token == token:
+            break
+        ids.extend(new_ids)
+        token = next_token
+    return ids
+
+def http_extract_release_shelves(session, artist_href):
+    """Browserless extract_release_shelves(): one request for the artist page."""
+    return [shelf for shelf in parse_artist_shelves(session.get_page(artist_href)) if is_release_shelf(shelf)]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── COOKIE REFRESHER THREAD (IN-MEMORY JAR, PLAIN HTTP) ──────────────────────
+
+class SessionCookieJar:
+    """
+    Thread-safe, versioned in-memory cookie store.
+
+    The refresher, the HTTP discovery session and the in-process yt-dlp
+    workers all read from the same jar.  Every change bumps ``version`` so
+    readers can cheaply tell whether they have to reload (version 0 = empty).
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._cookies = {}
+        self._snapshot = []
+        self.version = 0
+
+    def load(self, path):
+        """Merge the allowed cookies of a Netscape cookie file into the jar."""
+        self.update(read_netscape_cookies(path))
+
+    def update(self, cookies) -> bool:
+        """Merge *cookies* (dicts as returned by read_netscape_cookies); return True on change."""
+        now = time.time()
+        changed = False
+        with self._lock:
+            for c in cookies:
+                if not cookie_allowed(c["domain"]):
+                    continue
+                key = (c["domain"], c.get("path") or "/", c["name"])
+                if c.get("expiry") is not None and c["expiry"] <= now:
+                    changed |= self._cookies.pop(key, None) is not None
+                elif self._cookies.get(key) != c:
+                    self._cookies[key] = c
+                    changed = True
+            if changed:
+                self._snapshot = list(self._cookies.values())
+                self.version += 1
+        return changed
+
+    def update_from_headers(self, set_cookie_headers, hostname) -> bool:
+        """Merge raw ``Set-Cookie`` header values received from *hostname*."""
+        return self.update(c for c in (parse_set_cookie(h, hostname) for h in set_cookie_headers) if c)
+
+    def snapshot(self):
+        """Return ``(version, cookies)``; the list is never mutated afterwards."""
+        with self._lock:
+            return self.version, self._snapshot
+
+    def header_for(self, hostname) -> str:
+        """Build a ``Cookie`` request header for *hostname*."""
+        _, cookies = self.snapshot()
+        return "; ".join(
+            f"{c['name']}={c['value']}" for c in cookies
+            if hostname == c["domain"] or hostname.endswith("." + c["domain"])
+        )
+
+def parse_set_cookie(header, hostname):
+    """Parse one ``Set-Cookie`` header value into a cookie dict (None if malformed)."""
+    parts = [p.strip() for p in header.split(";")]
+    name, sep, value = parts[0].partition("=")
+    if not sep or not name:
+        return None
+    cookie = {"domain": hostname, "path": "/", "secure": False, "expiry": None,
+              "name": name.strip(), "value": value.strip()}
+    for attr in parts[1:]:
+        key, _, val = attr.partition("=")
+        key = key.strip().lower()
+        if key == "domain" and val:
+            cookie["domain"] = val.strip().lstrip(".")
+        elif key == "path" and val:
+            cookie["path"] = val.strip()
+        elif key == "secure":
+            cookie["secure"] = True
+        elif key == "max-age":
+            try:
+                cookie["expiry"] = int(time.time()) + int(val)
+            except ValueError:
+                pass
+        elif key == "expires" and cookie["expiry"] is None:
+            try:
+                from email.utils import parsedate_to_datetime
+                cookie["expiry"] = int(parsedate_to_datetime(val.strip()).timestamp())
+            except (TypeError, ValueError):
+                pass
+    return cookie
+
+# Shared by every thread; filled from COOKIE_BOOT_FILE in main()
+session_cookies = SessionCookieJar()
 
 def _atomic_replace_cookie_file(cookies):
     """
@@ -379,65 +1561,48 @@ def _atomic_replace_cookie_file(cookies):
         os.close(tmp_fd)  # We'll reopen with text mode
         write_netscape_cookies(cookies, tmp_path)
         os.replace(tmp_path, COOKIE_ACTIVE_FILE)  # atomic on POSIX/NTFS
-    first_cookie_dump_ready.set()
 
-def start_cookie_refresher() -> Thread:
+def cookie_refresh_session(dump_file=False, user_agent=None):
     """
-    Launch a second Selenium browser that keeps the session fresh and dumps
-    cookies every COOKIE_DUMP_INTERVAL seconds into COOKIE_ACTIVE_FILE atomically.
+    Return ``(session, refresh)``: ``refresh()`` does one plain HTTP request to
+    music.youtube.com and merges the returned cookies into ``session_cookies``.
+    Only the subprocess backend needs a file on disk, so COOKIE_ACTIVE_FILE is
+    written only if *dump_file* is set.  The first refresh is done right away.
     """
-    os.makedirs(TMP_COOKIE_DIR, exist_ok=True)
-
-    # Use the SAME user agent as the main driver to avoid inconsistencies
-    opt = build_headless_options()
-    opt.add_argument(f'user-agent={user_agent}')
-    svc = Service(chromedriver_path)
+    if dump_file:
+        os.makedirs(TMP_COOKIE_DIR, exist_ok=True)
+    session = HttpSession(cookies=session_cookies, user_agent=user_agent)
+    dumped_version = None
 
-    # ── FIX 3: store driver globally for guaranteed shutdown ──
-    global _cookie_driver
-    _cookie_driver = webdriver.Chrome(service=svc, options=opt)
-    cdriver = _cookie_driver
+    def refresh():
+        nonlocal dumped_version
+        session.request("GET", "/")
+        version, cookies = session_cookies.snapshot()
+        if dump_file and version != dumped_version:
+            _atomic_replace_cookie_file(cookies)
+            dumped_version = version
+        return version
 
-    # Initial visit so we can add cookies
-    cdriver.get("https://music.youtube.com")
-    time.sleep(1)
-
-    # Import boot cookies (filtered)
-    boot_cookies = read_netscape_cookies(COOKIE_BOOT_FILE)
-    for ck in boot_cookies:
-        if cookie_allowed(ck["domain"]):
-            try:
-                cdriver.add_cookie(ck)
-            except Exception:
-                pass
-
-    # Do an immediate first dump so downloads don't start with an outdated file
+    # Do an immediate first refresh so downloads don't start with an outdated session
     try:
-        cdriver.get("https://music.youtube.com")
-        click_privacy_button_on(cdriver)
-        cookies = [c for c in cdriver.get_cookies() if cookie_allowed(c["domain"])]
-        _atomic_replace_cookie_file(cookies)
-        print("Debug: Initial cookie dump written.")
+        debug(f"Initial cookie refresh done (jar version {refresh()}).")
     except Exception as e:
-        print(f"Debug: Initial cookie dump failed – {e}")
+        debug(f"Initial cookie refresh failed – {e}")
+        if dump_file:
+            _atomic_replace_cookie_file(session_cookies.snapshot()[1])
+    return session, refresh
+
+def start_cookie_refresher(dump_file=False, user_agent=None) -> Thread:
+    """Refresh the cookies (see cookie_refresh_session) every COOKIE_DUMP_INTERVAL seconds."""
+    session, refresh = cookie_refresh_session(dump_file, user_agent)
 
     def loop():
-        while not stop_cookie_refresher.is_set():
+        while not stop_cookie_refresher.wait(COOKIE_DUMP_INTERVAL):
             try:
-                cdriver.get("https://music.youtube.com")
-                click_privacy_button_on(cdriver)
-                cookies = [c for c in cdriver.get_cookies() if cookie_allowed(c["domain"])]
-                _atomic_replace_cookie_file(cookies)
-                print("Debug: Refreshed cookies written atomically.")
+                debug(f"Refreshed cookies (jar version {refresh()}).")
             except Exception as e:
-                print(f"Debug: Cookie refresh failed – {e}")
-            stop_cookie_refresher.wait(COOKIE_DUMP_INTERVAL)
-
-        # graceful shutdown
-        try:
-            cdriver.quit()
-        except Exception:
-            pass
+                debug(f"Cookie refresh failed – {e}")
+        session.close()
 
     t = Thread(target=loop, name="CookieRefresher", daemon=True)
     t.start()
@@ -454,99 +1619,2524 @@ def latest_cookie_file() -> str:
     return COOKIE_BOOT_FILE
 
 # ──────────────────────────────────────────────────────────────────────────────
-# ── DOWNLOADER (MODIFIED TO ALWAYS USE LATEST COOKIES SAFELY) ────────────────
+# ── DOWNLOAD MANIFEST (PERSISTENT STATE ACROSS RUNS) ─────────────────────────
 
-def download_item(item_url, artist_name, tmp_folder):
-    sanitized_artist_name = sanitize_filename(artist_name)
+def item_id_from_url(item_url: str) -> str:
+    """
+    Return a stable ID for an album/single URL: the browse ID for
+    ``/browse/<id>`` links, the ``list`` parameter for playlist links and the
+    URL itself for anything else (e.g. ``ytsearch:`` queries).
+    """
+    parsed = urllib.parse.urlparse(item_url)
+    if "/browse/" in parsed.path:
+        return parsed.path.rsplit("/browse/", 1)[1].strip("/")
+    playlist = urllib.parse.parse_qs(parsed.query).get("list")
+    if playlist:
+        return playlist[0]
+    return item_url
 
-    if not os.path.exists(tmp_folder):
-        os.makedirs(tmp_folder)
+class DownloadManifest:
+    """
+    SQLite record of finished albums/singles (keyed by browse/playlist ID) and
+    their tracks (keyed by release and video ID, a track may be on several
+    releases). Safe to use from all download threads.
+    """
+
+    def __init__(self, path=STATE_DB_FILE):
+        self.path = path
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS items (
+                    item_id      TEXT PRIMARY KEY,
+                    url          TEXT,
+                    artist       TEXT,
+                    status       TEXT NOT NULL,
+                    album_folder TEXT,
+                    updated_at   REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS tracks (
+                    video_id TEXT NOT NULL,
+                    item_id  TEXT NOT NULL,
+                    path     TEXT NOT NULL,
+                    PRIMARY KEY (item_id, video_id)
+                );
+                CREATE INDEX IF NOT EXISTS tracks_video ON tracks(video_id);
+                CREATE TABLE IF NOT EXISTS track_refs (
+                    item_id  TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    path     TEXT NOT NULL,
+                    PRIMARY KEY (item_id, video_id)
+                );
+            """)
+            self._migrate_tracks()
+
+    def _migrate_tracks(self):
+        """Older state DBs keyed tracks by video ID alone (the last release to commit a shared track won)."""
+        key = [row[1] for row in sorted(self._db.execute("PRAGMA table_info(tracks)"), key=lambda r: r[5]) if row[5]]
+        if key != ["video_id"]:
+            return
+        self._db.executescript("""
+            DROP INDEX IF EXISTS tracks_item;
+            ALTER TABLE tracks RENAME TO tracks_old;
+            CREATE TABLE tracks (
+                video_id TEXT NOT NULL,
+                item_id  TEXT NOT NULL,
+                path     TEXT NOT NULL,
+                PRIMARY KEY (item_id, video_id)
+            );
+            INSERT INTO tracks (video_id, item_id, path) SELECT video_id, item_id, path FROM tracks_old;
+            DROP TABLE tracks_old;
+            CREATE INDEX IF NOT EXISTS tracks_video ON tracks(video_id);
+        """)
+
+    def status(self, item_id: str) -> Optional[str]:
+        """Last recorded status of *item_id*, or None if it was never queued."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status FROM items WHERE item_id = ?", (item_id,)).fetchone()
+        return row[0] if row else None
+
+    def is_complete(self, item_id: str) -> bool:
+        """True if *item_id* was committed completely and its album folder is still there."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, album_folder FROM items WHERE item_id = ?", (item_id,)).fetchone()
+        if row is None or row[0] != "complete":
+            return False
+        # An album deleted from the library is fetched again
+        return row[1] is None or os.path.isdir(row[1])
+
+    def mark_status(self, item_id, item_url, artist_name, status):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO items (item_id, url, artist, status, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(item_id) DO UPDATE SET status = excluded.status, "
+                "updated_at = excluded.updated_at",
+                (item_id, item_url, artist_name, status, time.time()))
+
+    def mark_complete(self, item_id, item_url, artist_name, album_folder, tracks, status="complete"):
+        """
+        Record *item_id* as committed, together with its ``{video_id: path}`` tracks.
+        *status* is 'partial' if some tracks are still missing.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO items (item_id, url, artist, status, album_folder, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (item_id, item_url, artist_name, status, album_folder, time.time()))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO tracks (video_id, item_id, path) VALUES (?, ?, ?)",
+                [(vid, item_id, path) for vid, path in tracks.items()])
+
+    def add_refs(self, item_id, refs):
+        """
+        Record ``{video_id: path}`` tracks of *item_id* that reuse a file another
+        release downloaded (see reuse_duplicates); the original's row is kept.
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO track_refs (item_id, video_id, path) VALUES (?, ?, ?)",
+                [(item_id, vid, path) for vid, path in refs.items()])
+
+    def track_path(self, video_id):
+        """Library file of a downloaded track (one that still exists, if any), or None."""
+        with self._lock:
+            rows = self._db.execute("SELECT path FROM tracks WHERE video_id = ?", (video_id,)).fetchall()
+        paths = [r[0] for r in rows]
+        return next((p for p in paths if os.path.isfile(p)), paths[0] if paths else None)
+
+    def album_folder(self, item_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT album_folder FROM items WHERE item_id = ?", (item_id,)).fetchone()
+        return row[0] if row else None
+
+    def track_ids(self, item_id):
+        """
+        Video IDs already committed for *item_id* whose files are still in the
+        library (used to resume partial albums).
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT video_id, path FROM tracks WHERE item_id = ? "
+                "UNION SELECT video_id, path FROM track_refs WHERE item_id = ?", (item_id, item_id)).fetchall()
+        return {vid for vid, path in rows if os.path.isfile(path)}
+
+    def album_tracks(self):
+        """Yield ``(album_folder, video_id)`` for every committed track."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT items.album_folder, tracks.video_id FROM tracks "
+                "JOIN items ON items.item_id = tracks.item_id WHERE items.album_folder IS NOT NULL").fetchall()
+        return rows
+
+    def relocate(self, old_folder, new_folder):
+        """Keep recorded paths valid after an album folder was renamed on disk."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE items SET album_folder = ? WHERE album_folder = ?", (new_folder, old_folder))
+            for table in ("tracks", "track_refs"):
+                self._db.execute(
+                    f"UPDATE {table} SET path = ? || substr(path, ?) WHERE substr(path, 1, ?) = ?",
+                    (new_folder, len(old_folder) + 1, len(old_folder) + 1, old_folder + os.sep))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# Opened in main(); None means "no manifest" (e.g. when imported as a module)
+manifest = None
+
+class LibraryIndex:
+    """
+    In-memory index of the music library (artist folder → album folder →
+    track count and video IDs), persisted in the state DB. It is loaded once at
+    startup and updated on every commit, so conflict checks and EP renames are
+    dictionary lookups instead of directory walks.
+    """
+
+    def __init__(self, library_folder=FINISHED_FOLDER, path=STATE_DB_FILE, rebuild_if_empty=True):
+        self.library_folder = library_folder
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS library (
+                    artist      TEXT NOT NULL,
+                    album       TEXT NOT NULL,
+                    track_count INTEGER NOT NULL,
+                    track_ids   TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (artist, album)
+                )""")
+            rows = self._db.execute("SELECT artist, album, track_count, track_ids FROM library").fetchall()
+        self._albums = {}
+        for artist, album, count, ids in rows:
+            self._albums.setdefault(artist, {})[album] = (count, set(filter(None, ids.split(","))))
+        if rebuild_if_empty and not rows and os.path.isdir(library_folder) and os.listdir(library_folder):
+            debug(f"Library index is empty – indexing '{library_folder}' once")
+            self.rebuild()
+
+    def _key(self, album_folder):
+        rel = os.path.relpath(album_folder, self.library_folder)
+        artist, _, album = rel.partition(os.sep)
+        return artist, album
+
+    def track_count(self, album_folder):
+        artist, album = self._key(album_folder)
+        with self._lock:
+            entry = self._albums.get(artist, {}).get(album)
+        return entry[0] if entry else None
+
+    def albums(self, artist):
+        with self._lock:
+            return dict(self._albums.get(artist, {}))
+
+    def add_album(self, album_folder, track_count, track_ids=(), merge=False):
+        artist, album = self._key(album_folder)
+        with self._lock:
+            if merge and album in self._albums.get(artist, {}):
+                old_count, old_ids = self._albums[artist][album]
+                track_count, track_ids = old_count + track_count, old_ids | set(track_ids)
+            self._albums.setdefault(artist, {})[album] = (track_count, set(track_ids))
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO library (artist, album, track_count, track_ids) VALUES (?, ?, ?, ?)",
+                    (artist, album, track_count, ",".join(sorted(track_ids))))
+
+    def remove_album(self, album_folder):
+        artist, album = self._key(album_folder)
+        with self._lock:
+            if self._albums.get(artist, {}).pop(album, None) is None:
+                return
+            with self._db:
+                self._db.execute("DELETE FROM library WHERE artist = ? AND album = ?", (artist, album))
+
+    def rename_album(self, old_folder, new_folder):
+        artist, old_album = self._key(old_folder)
+        _, new_album = self._key(new_folder)
+        with self._lock:
+            entry = self._albums.get(artist, {}).pop(old_album, None)
+            if entry is None:
+                return
+            self._albums[artist][new_album] = entry
+            with self._db:
+                self._db.execute("UPDATE library SET album = ? WHERE artist = ? AND album = ?",
+                                 (new_album, artist, old_album))
+
+    def rebuild(self):
+        """Re-index the library folder from disk (for libraries edited outside this tool)."""
+        albums = {}
+        if os.path.isdir(self.library_folder):
+            for artist_entry in os.scandir(self.library_folder):
+                if not artist_entry.is_dir() or artist_entry.name.startswith("."):
+                    continue
+                for album_entry in os.scandir(artist_entry.path):
+                    if album_entry.is_dir():
+                        albums.setdefault(artist_entry.name, {})[album_entry.name] = (
+                            count_files(album_entry.path), set())
+        # Keep known video IDs of albums that still exist
+        known = {}
+        if manifest is not None:
+            for album_folder, video_id in manifest.album_tracks():
+                known.setdefault(self._key(album_folder), set()).add(video_id)
+        with self._lock:
+            self._albums = {
+                artist: {album: (count, known.get((artist, album), set())) for album, (count, _) in items.items()}
+                for artist, items in albums.items()
+            }
+            with self._db:
+                self._db.execute("DELETE FROM library")
+                self._db.executemany(
+                    "INSERT INTO library (artist, album, track_count, track_ids) VALUES (?, ?, ?, ?)",
+                    [(artist, album, count, ",".join(sorted(ids)))
+                     for artist, items in self._albums.items() for album, (count, ids) in items.items()])
+        debug(f"Indexed {sum(len(a) for a in self._albums.values())} albums "
+              f"of {len(self._albums)} artists in '{self.library_folder}'")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# Loaded in main(); None means "look at the filesystem directly"
+library = None
+
+def normalize_artist_query(name):
+    """Cache key for an artists.txt line: NFKC, case-folded, single spaces."""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+class ArtistCache:
+    """
+    Persistent search results: normalized artist query → (title, channel href,
+    similarity, timestamp). Entries older than *ttl* seconds are ignored, so
+    renamed or moved channels are picked up again eventually.
+    """
+
+    def __init__(self, path=STATE_DB_FILE, ttl=ARTIST_CACHE_TTL):
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS artists (
+                    query       TEXT PRIMARY KEY,
+                    title       TEXT NOT NULL,
+                    href        TEXT NOT NULL,
+                    similarity  REAL NOT NULL,
+                    resolved_at REAL NOT NULL
+                )""")
+
+    def get(self, artist):
+        """Return ``(title, href)`` for *artist* if cached and fresh, else None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT title, href, resolved_at FROM artists WHERE query = ?",
+                (normalize_artist_query(artist),)).fetchone()
+            fresh = row is not None and time.time() - row[2] < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return (row[0], row[1]) if fresh else None
+
+    def put(self, artist, title, href, similarity):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO artists (query, title, href, similarity, resolved_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (normalize_artist_query(artist), title, href, similarity, time.time()))
+
+    def export(self, path):
+        """Write all cached artists in the ``-all`` format (artist_name, artist_href)."""
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT title, href FROM artists ORDER BY title").fetchall()
+        with open(path, "w", encoding="utf-8") as fh:
+            for title, href in rows:
+                fh.write(f"{title}, {href}\n")
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def read_track_log(path):
+    """Parse the ``video_id<TAB>filepath`` lines yt-dlp printed for finished tracks."""
+    tracks = {}
+    if not os.path.exists(path):
+        return tracks
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            video_id, _, filepath = line.rstrip("\n").partition("\t")
+            if video_id and filepath:
+                tracks[video_id] = filepath
+    return tracks
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── YT-DLP BACKENDS (IN-PROCESS API, SUBPROCESS FALLBACK) ────────────────────
+
+# 'api' runs yt-dlp in-process, 'subprocess' launches the CLI, 'auto' prefers 'api'
+DOWNLOAD_BACKEND = "auto"
+
+# Executable run by the subprocess backend (bench/ swaps in a stub)
+YTDLP_BINARY = "yt-dlp"
+
+@dataclass
+class DownloadResult:
+    """Outcome of one yt-dlp run over an album/single URL."""
+    ok: bool
+    returncode: int
+    backend: str
+    duration: float = 0.0
+    error: Optional[str] = None
+    errors: list = field(default_factory=list)    # yt-dlp's ERROR messages, one per failure
+
+    def track_errors(self):
+        """``{video_id: message}`` for the errors yt-dlp attributed to a track (last one wins)."""
+        found = {}
+        for message in self.errors:
+            match = _TRACK_ERROR_RE.match(message)
+            if match:
+                found[match.group(1)] = message
+        return found
+
+# "ERROR: [youtube] <video id>: …" – the prefix is missing in messages from the API backend
+_TRACK_ERROR_RE = re.compile(r"(?:ERROR: )?\[[^\]]+\] ([\w-]+): ")
+
+# yt-dlp prints download progress as "<marker> <video id> <bytes so far>" lines (parsed, never logged)
+PROGRESS_MARKER = "[ytmad-progress]"
+PROGRESS_TEMPLATE = f"download:{PROGRESS_MARKER} %(info.id)s %(progress.downloaded_bytes)s"
+
+# Failed jobs keep their yt-dlp output here (see job_log_name)
+JOB_LOG_DIR = "ytmad-logs"
+
+def job_log_name(item_id):
+    """
+    File name of a failed job's log: the sanitized *item_id* plus a short hash,
+    since IDs such as "ytsearch:AC/DC Back in Black" are no file names.
+    """
+    digest = hashlib.sha1(item_id.encode("utf-8")).hexdigest()[:8]
+    return f"{sanitize_filename(item_id)[:80]}-{digest}.log"
+
+class JobOutput:
+    """
+    Everything yt-dlp prints for one job (all attempts and both stages).
+    Progress lines go to ``transfers``, the rest to the job's log file next
+    to its staging folder, and with -v to the terminal as well. close()
+    keeps the log only when asked to, i.e. for a failed job.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = Lock()
+        self._fh = None
+
+    def write(self, line):
+        line = line.rstrip("\r\n")
+        # The logger backend numbers lines of concurrent fragments ("2: …")
+        at = line.find(PROGRESS_MARKER)
+        if at >= 0:
+            video_id, _, downloaded = line[at + len(PROGRESS_MARKER):].strip().partition(" ")
+            if downloaded.isdigit():
+                transfers.update(self, video_id, int(downloaded))
+            return
+        if VERBOSE:
+            print(line)
+        with self._lock:
+            if self._fh is None:
+                self._fh = open(self.path, "a", encoding="utf-8", errors="replace")
+            self._fh.write(line + "\n")
+            self._fh.flush()
+
+    def close(self, keep_as=None):
+        """
+        Close the log. With *keep_as* (an item ID), move it into JOB_LOG_DIR and
+        return the new path, otherwise delete it and return None. Closing again
+        is harmless.
+        """
+        transfers.finish(self)
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+        if not os.path.exists(self.path):
+            return None
+        if keep_as is None:
+            os.remove(self.path)
+            return None
+        os.makedirs(JOB_LOG_DIR, exist_ok=True)
+        kept = os.path.join(JOB_LOG_DIR, job_log_name(keep_as))
+        # Copy, not rename: the staging root may be another filesystem
+        shutil.copyfile(self.path, kept)
+        os.remove(self.path)
+        return kept
+
+def forward_output(line, output):
+    """Hand one line of yt-dlp output to the job's *output*, or print it if there is none."""
+    if output is not None:
+        output.write(line)
+    elif PROGRESS_MARKER not in line:
+        sys.stderr.write(line if line.endswith("\n") else line + "\n")
+
+def _output_args(tmp_folder, sanitized_artist_name):
+    # Both stages must compute identical file names, so they share these options
+    return [
+        "-f", "bestaudio",
+        "--compat-options", "filename-sanitization",
+        "--output", os.path.join(tmp_folder, sanitized_artist_name, "%(album)s/%(title)s.%(ext)s"),
+    ]
+
+def build_download_args(tmp_folder, sanitized_artist_name, archive=None):
+    """
+    yt-dlp options of the network stage (without cookies and URL): fetch the
+    raw audio, its thumbnail and its info JSON, no post-processing.
+    With *archive*, finished tracks are recorded there and skipped on the next attempt.
+    """
+    args = [
+        "--retries", "5",
+        # Exponential instead of fixed sleeps; the shared throttle spaces out whole runs
+        "--retry-sleep", "exp=1:30",
+        "--concurrent-fragments", "10",
+        "-t", "sleep",
+        "--write-info-json",
+        "--no-write-playlist-metafiles",
+        "--write-thumbnail",
+        *_output_args(tmp_folder, sanitized_artist_name),
+    ]
+    if archive:
+        args += ["--download-archive", archive]
+    # Machine-readable progress for the summary line; messages and errors go to the job log
+    args += ["--progress", "--newline", "--progress-template", PROGRESS_TEMPLATE]
+    if not VERBOSE:
+        args += ["--quiet"]
+    return args
+
+def build_postprocess_args(tmp_folder, sanitized_artist_name, track_log):
+    """
+    yt-dlp options of the CPU stage, run per track on the info JSON written by
+    the network stage: transcode to m4a, embed metadata and cover art.
+    """
+    args = [
+        "--extract-audio",
+        "--parse-metadata", "release_year:(?s)(?P<meta_date>.+)",
+        "--parse-metadata", "playlist_index:(?s)(?P<track_number>.+)",
+        "--audio-format", "m4a",
+        "--embed-metadata",
+        "--add-metadata",
+        "--embed-thumbnail",
+        # Registers the thumbnail written by the network stage for embedding
+        "--write-thumbnail",
+        "--print-to-file", "after_move:%(id)s\t%(filepath)s", track_log,
+        *_output_args(tmp_folder, sanitized_artist_name),
+    ]
+    if not VERBOSE:
+        args += ["--quiet", "--no-progress"]
+    return args
+
+def resolve_download_backend(name):
+    """Map 'auto' to 'api' when the yt_dlp module is importable, else 'subprocess'."""
+    if name != "auto":
+        return name
+    try:
+        import yt_dlp  # noqa: F401
+        return "api"
+    except ImportError:
+        return "subprocess"
+
+def run_ytdlp_subprocess(item_url, args, info_file=False, output=None):
+    start = time.monotonic()
+    errors = []
+    target = ["--load-info-json", item_url] if info_file else [item_url]
+    try:
+        proc = subprocess.Popen([YTDLP_BINARY, "--cookies", latest_cookie_file(), *args, *target],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace")
+        # Progress, messages and errors in one stream; keep the ERROR lines for throttle detection
+        for line in proc.stdout:
+            forward_output(line, output)
+            if line.startswith("ERROR:"):
+                errors.append(line.strip())
+        proc.wait()
+    except OSError as e:
+        return DownloadResult(False, -1, "subprocess", time.monotonic() - start, str(e))
+    return DownloadResult(proc.returncode == 0, proc.returncode, "subprocess", time.monotonic() - start,
+                          None if proc.returncode == 0
+                          else "; ".join(errors) or f"yt-dlp exited with {proc.returncode}", errors)
+
+# One long-lived YoutubeDL per worker thread and stage (extractors, PPs and cookies stay loaded)
+_ydl_local = threading.local()
+_pp_local = threading.local()
+
+def _http_cookie(c):
+    from http.cookiejar import Cookie
+    return Cookie(
+        version=0, name=c["name"], value=c["value"], port=None, port_specified=False,
+        domain="." + c["domain"].lstrip("."), domain_specified=True, domain_initial_dot=True,
+        path=c.get("path") or "/", path_specified=True, secure=bool(c.get("secure")),
+        expires=c.get("expiry"), discard=False, comment=None, comment_url=None, rest={},
+    )
+
+class _JobLogger:
+    """yt-dlp logger of a worker's YoutubeDL: every message goes to the thread's current JobOutput."""
+
+    def __init__(self, local):
+        self.local = local
+
+    def debug(self, message):
+        forward_output(message, getattr(self.local, "output", None))
+
+    def warning(self, message):
+        # Errors come prefixed, warnings don't
+        self.debug(f"WARNING: {message}")
+
+    info = error = debug
+
+def _worker_ydl(ydl_opts, local=_ydl_local, output=None):
+    """Return this thread's YoutubeDL, retargeted to the current job, its output and cookie version."""
+    import yt_dlp
+    local.output = output
+    ydl = getattr(local, "ydl", None)
+    if ydl is None:
+        # Progress lines (--progress-template) reach the logger like any other message
+        ydl_opts["logger"] = _JobLogger(local)
+        ydl = local.ydl = yt_dlp.YoutubeDL(ydl_opts)
+        local.cookie_version = None
+        # Per-track errors don't raise (ignoreerrors=only_download), so record them
+        report_error = ydl.report_error
+        def recording_report_error(message, *args, **kwargs):
+            local.errors.append(message)
+            return report_error(message, *args, **kwargs)
+        ydl.report_error = recording_report_error
+    else:
+        # Only the per-job paths differ between runs
+        ydl.params["outtmpl"].update(ydl_opts["outtmpl"])
+        ydl.params["print_to_file"] = ydl_opts["print_to_file"]
+        # YoutubeDL only preloads the archive in __init__, so reload it per job
+        archive = ydl.params["download_archive"] = ydl_opts.get("download_archive")
+        ydl.archive = set()
+        if archive and os.path.exists(archive):
+            with open(archive, "r", encoding="utf-8") as fh:
+                ydl.archive = {line.strip() for line in fh if line.strip()}
+
+    local.errors = []
+    _sync_cookies(ydl, local)
+    return ydl
+
+def _sync_cookies(ydl, local):
+    """Reload *ydl*'s cookie jar if the shared jar changed since *local*.cookie_version."""
+    version, cookies = session_cookies.snapshot()
+    if version != getattr(local, "cookie_version", None):
+        ydl.cookiejar.clear()
+        for c in cookies:
+            ydl.cookiejar.set_cookie(_http_cookie(c))
+        local.cookie_version = version
+
+def run_ytdlp_api(item_url, args, info_file=False, output=None):
+    import yt_dlp
+    # Download and post-processing options differ, so each stage keeps its own instance
+    local = _pp_local if info_file else _ydl_local
+    start = time.monotonic()
+    try:
+        ydl = _worker_ydl(yt_dlp.parse_options(args).ydl_opts, local, output)
+        retcode = ydl.download_with_info_file(item_url) if info_file else ydl.download([item_url])
+    except yt_dlp.utils.DownloadError as e:
+        return DownloadResult(False, 1, "api", time.monotonic() - start, str(e), local.errors)
+    except Exception as e:
+        # Drop the instance, it may be in an inconsistent state
+        local.ydl = None
+        return DownloadResult(False, -1, "api", time.monotonic() - start, f"{type(e).__name__}: {e}")
+    return DownloadResult(retcode == 0, retcode, "api", time.monotonic() - start,
+                          None if retcode == 0
+                          else "; ".join(local.errors) or f"yt-dlp returned {retcode}", local.errors)
+
+def run_ytdlp(item_url, args, info_file=False, output=None):
+    """
+    Run yt-dlp with *args* on *item_url* using the configured DOWNLOAD_BACKEND.
+    With *info_file*, *item_url* is an info JSON to post-process (``--load-info-json``).
+    Its output goes to the JobOutput *output*, if given.
+    """
+    if resolve_download_backend(DOWNLOAD_BACKEND) == "api":
+        return run_ytdlp_api(item_url, args, info_file, output)
+    return run_ytdlp_subprocess(item_url, args, info_file, output)
+
+# Separate per-thread instance for flat playlist listings (different params)
+_lister_local = threading.local()
+
+def list_playlist_entries(item_url):
+    """
+    Return ``[(video_id, title), ...]`` for the tracks of an album/single
+    without downloading anything, or None if the listing failed. Listings
+    are yt-dlp requests like downloads, so they go through the throttle.
+    """
+    if throttle is not None:
+        with metrics.time("throttle_wait"):
+            throttle.acquire()
+    result = None
+    try:
+        with metrics.time("listing"):
+            entries, result = _list_playlist_entries(item_url)
+    finally:
+        # No result: the listing was cancelled or crashed – neither a clean run nor a throttling signal
+        release_throttle(result, None if result is None else [])
+    return entries
+
+def _list_playlist_entries(item_url):
+    """list_playlist_entries() without the throttle: ``(entries or None, DownloadResult)``."""
+    backend = resolve_download_backend(DOWNLOAD_BACKEND)
+    start = time.monotonic()
+    try:
+        if backend == "api":
+            import yt_dlp
+            ydl = getattr(_lister_local, "ydl", None)
+            if ydl is None:
+                ydl = _lister_local.ydl = yt_dlp.YoutubeDL(
+                    {"extract_flat": "in_playlist", "quiet": True, "no_warnings": True})
+            _sync_cookies(ydl, _lister_local)
+            info = ydl.extract_info(item_url, download=False) or {}
+            entries = info.get("entries") or [info]
+            return ([(e["id"], e.get("title") or "") for e in entries if e and e.get("id")],
+                    DownloadResult(True, 0, backend, time.monotonic() - start))
+
+        proc = subprocess.run(
+            [YTDLP_BINARY, "--cookies", latest_cookie_file(), "--flat-playlist",
+             "--print", "%(id)s\t%(title)s", item_url],
+            capture_output=True, text=True)
+        return listing_outcome(proc.returncode, proc.stdout, proc.stderr, backend, time.monotonic() - start)
+    except Exception as e:
+        debug(f"Could not list tracks of {item_url} – {e}")
+        return None, DownloadResult(False, -1, backend, time.monotonic() - start, str(e))
+
+def listing_outcome(returncode, stdout, stderr, backend, duration):
+    """``(entries or None, DownloadResult)`` of a ``--flat-playlist`` subprocess (429s reach the throttle)."""
+    if returncode != 0:
+        errors = [line.strip() for line in stderr.splitlines() if line.startswith("ERROR:")]
+        return None, DownloadResult(False, returncode, backend, duration,
+                                    "; ".join(errors) or f"yt-dlp exited with {returncode}", errors)
+    return parse_playlist_listing(stdout), DownloadResult(True, 0, backend, duration)
+
+def parse_playlist_listing(text):
+    """Parse yt-dlp ``--print '%(id)s\t%(title)s'`` output into ``[(video_id, title), ...]``."""
+    entries = []
+    for line in text.splitlines():
+        video_id, _, title = line.partition("\t")
+        if video_id:
+            entries.append((video_id, title))
+    return entries
+
+def read_download_archive(path):
+    """Return the set of video IDs recorded in a yt-dlp download archive."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as fh:
+        return {line.split()[-1] for line in fh if line.strip()}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── ADAPTIVE THROTTLE (AIMD, SHARED BY ALL DOWNLOAD WORKERS) ─────────────────
+
+# yt-dlp runs started per second at most; the rate never drops below the minimum
+THROTTLE_MAX_RATE = 1.0
+THROTTLE_MIN_RATE = 1 / 30
+
+# Additive increase after each clean run, multiplicative decrease on throttling
+THROTTLE_RATE_STEP = 0.05
+THROTTLE_BACKOFF = 0.5
+
+# Signals within this many seconds count as one congestion event (one decrease)
+THROTTLE_COOLDOWN = 10
+
+# yt-dlp error texts that mean YouTube is throttling us rather than a broken track
+THROTTLE_ERROR_PATTERNS = (
+    "HTTP Error 429",
+    "Too Many Requests",
+    "Requested format is not available",
+    "rate-limited",
+    "try again later",
+)
+
+def throttle_reason(result, unfinished):
+    """Return why a run looks throttled (error text or *unfinished* downloads), or None."""
+    error = (result.error or "").lower()
+    for pattern in THROTTLE_ERROR_PATTERNS:
+        if pattern.lower() in error:
+            return pattern
+    if unfinished:
+        return f"{len(unfinished)} unfinished .part downloads"
+    return None
+
+class AdaptiveThrottle:
+    """
+    Process-wide AIMD controller for yt-dlp runs.
+
+    Two limits are enforced in ``acquire()``: a concurrency window (how many
+    runs may be active) and a token bucket (how fast runs may start).  Both
+    are halved on a throttling signal, at most once per THROTTLE_COOLDOWN,
+    and grow back additively with every clean run.
+    """
+
+    def __init__(self, max_concurrency, max_rate=None, min_rate=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.max_rate = max_rate = max_rate or THROTTLE_MAX_RATE
+        self.min_rate = min(min_rate or THROTTLE_MIN_RATE, max_rate)
+        self.rate = max_rate
+        self.tokens = self.limit
+        self.active = 0
+        self.throttle_events = 0
+        self._stamp = time.monotonic()
+        self._last_backoff = float("-inf")
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(max(1.0, self.limit), self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def status(self):
+        return (f"concurrency {int(self.limit)}/{self.max_concurrency} "
+                f"({self.active} active), rate {self.rate:.2f} starts/s")
+
+    def _try_acquire(self):
+        """
+        Start a run if the window and rate allow it (returns 0.0); otherwise
+        return the seconds until the next token, or None if the window is full.
+        Called with ``_cond`` held.
+        """
+        self._refill()
+        if self.active >= int(self.limit):
+            return None
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.active += 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a run may start within the current window and rate."""
+        with self._cond:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0.0:
+                    return
+                # Window full: wait for a release; otherwise wait for the next token
+                self._cond.wait(wait)
+
+    async def acquire_async(self):
+        """acquire() for the asyncio orchestrator; polls instead of blocking the event loop."""
+        while True:
+            with self._cond:
+                wait = self._try_acquire()
+            if wait == 0.0:
+                return
+            await asyncio.sleep(min(wait or ASYNC_THROTTLE_POLL, ASYNC_THROTTLE_POLL))
+
+    def release(self, ok, reason=None):
+        """
+        End a run.  *reason* (see throttle_reason) shrinks both limits, a clean
+        run (*ok*) grows them; other failures leave them unchanged.
+        """
+        with self._cond:
+            self.active -= 1
+            if reason:
+                now = time.monotonic()
+                if now - self._last_backoff >= THROTTLE_COOLDOWN:
+                    self._last_backoff = now
+                    self.throttle_events += 1
+                    metrics.inc("throttle_events")
+                    self.limit = max(1.0, self.limit * THROTTLE_BACKOFF)
+                    self.rate = max(self.min_rate, self.rate * THROTTLE_BACKOFF)
+                    self.tokens = min(self.tokens, 0.0)
+                    debug(f"Throttled ({reason}) – {self.status()}")
+            elif ok:
+                before = int(self.limit)
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+                self.rate = min(self.max_rate, self.rate + THROTTLE_RATE_STEP)
+                if int(self.limit) != before:
+                    debug(f"Throttle recovering – {self.status()}")
+            self._cond.notify_all()
+
+# Set by download_items_in_parallel(); None means unthrottled (e.g. in ad-hoc use)
+throttle = None
+
+def shared_throttle(max_concurrency):
+    """
+    The throttle for a download run: the one of an earlier run in this
+    process (watch mode cycles) if it has the same ceiling, so the rate it
+    learned carries over, else a new one.
+    """
+    if throttle is not None and throttle.max_concurrency == max(1, max_concurrency):
+        return throttle
+    return AdaptiveThrottle(max_concurrency)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── STAGING MANAGER (WHERE tmpN FOLDERS LIVE AND HOW MUCH THEY MAY TAKE) ──────
+
+# Releases with at most this many tracks may be staged on the small root (e.g. a tmpfs)
+SMALL_RELEASE_TRACKS = 3
+# Space reserved per track while an album is staged: raw audio, .m4a, thumbnail, info JSON
+STAGING_TRACK_BYTES = 16 * 1024 * 1024
+# Tracks assumed when the track list is not known before the download starts
+STAGING_DEFAULT_TRACKS = 12
+# Free space always left on a staging filesystem (--min-free)
+STAGING_MIN_FREE = 1024 * 1024 * 1024
+# Seconds between free-space checks while a job is held back
+STAGING_POLL = 5.0
+STAGING_FULL_ERROR = "not enough free space for staging"
+
+_STAGING_FOLDER_RE = re.compile(r"tmp\d+")
+
+def staging_side_files(tmp_folder):
+    """Track log, download archive, job file and yt-dlp log that live next to a staging folder."""
+    return f"{tmp_folder}.tracks.tsv", f"{tmp_folder}.archive", f"{tmp_folder}.job.json", f"{tmp_folder}.log"
+
+class StagingManager:
+    """
+    Admission control for the tmpN staging folders. Before a job starts, its
+    estimated size (tracks × STAGING_TRACK_BYTES) is reserved on a staging
+    root, the *small_root* for short releases if it has room. A job is held
+    back while the root's free space minus all reservations would drop below
+    *min_free*, or all reservations together would exceed *quota* bytes.
+    The reservation ends with the job (DownloadJob.finish).
+    """
+
+    def __init__(self, root="", small_root=None, min_free=STAGING_MIN_FREE, quota=None):
+        self.root = root
+        self.small_root = small_root
+        self.min_free = min_free
+        self.quota = quota
+        self._reserved = {}    # job_id → (root, bytes)
+        self._cond = threading.Condition()
+        for path in filter(None, (root, small_root)):
+            os.makedirs(path, exist_ok=True)
+
+    @property
+    def roots(self):
+        return [r for r in (self.small_root, self.root) if r is not None]
+
+    @staticmethod
+    def estimate(job, track_counts=None):
+        """``(tracks or None, bytes)`` to reserve for *job*."""
+        if job.listed and job.expected is not None:
+            tracks = len(job.expected)
+        else:
+            tracks = (track_counts or {}).get(item_id_from_url(job.item_url))
+        return tracks, (tracks or STAGING_DEFAULT_TRACKS) * STAGING_TRACK_BYTES
+
+    def _free(self, root):
+        try:
+            free = shutil.disk_usage(root or ".").free
+        except OSError:
+            return 0
+        return free - sum(size for r, size in self._reserved.values() if r == root)
+
+    def _try_reserve(self, job, tracks, size):
+        """Return 'ok' (reserved), 'wait' or 'full' (nothing staged, still no room). Caller holds _cond."""
+        total = sum(size for _, size in self._reserved.values())
+        if self.quota is not None and self._reserved and total + size > self.quota:
+            return "wait"
+        small = self.small_root is not None and tracks is not None and tracks <= SMALL_RELEASE_TRACKS
+        for root in ([self.small_root] if small else []) + [self.root]:
+            if self._free(root) - size >= self.min_free:
+                self._reserved[job.job_id] = (root, size)
+                job.staging_root = root
+                metrics.gauge("staging_reserved_bytes", total + size)
+                return "ok"
+        return "wait" if self._reserved else "full"
+
+    def _held_back(self, job, size):
+        metrics.inc("jobs_held_back")
+        debug(f"Holding back {job.item_url} – {size / 2**20:.0f} MB do not fit into the staging space yet")
+
+    def _full(self, job, size):
+        print(f"Error: Not enough free space to stage {job.item_url} (about {size / 2**20:.0f} MB, "
+              f"{self.min_free / 2**20:.0f} MB are kept free)")
+        return False
+
+    @staticmethod
+    def _needs_listing(job, track_counts):
+        return not job.listed and item_id_from_url(job.item_url) not in (track_counts or {})
+
+    def reserve(self, job, track_counts=None):
+        """
+        Block until *job* fits; False if it never will (nothing else staged and
+        still no room). The track list is fetched here if unknown, and reused
+        by the download.
+        """
+        if self._needs_listing(job, track_counts):
+            job.expected, job.listed = list_playlist_entries(job.item_url), True
+        tracks, size = self.estimate(job, track_counts)
+        with self._cond:
+            state = self._try_reserve(job, tracks, size)
+            if state == "wait":
+                self._held_back(job, size)
+            while state == "wait":
+                self._cond.wait(STAGING_POLL)
+                state = self._try_reserve(job, tracks, size)
+        return state == "ok" or self._full(job, size)
+
+    async def reserve_async(self, job, track_counts=None):
+        """reserve() for the asyncio orchestrator; polls instead of blocking the event loop."""
+        if self._needs_listing(job, track_counts):
+            job.expected, job.listed = await list_playlist_entries_async(job.item_url), True
+        tracks, size = self.estimate(job, track_counts)
+        held = False
+        while True:
+            with self._cond:
+                state = self._try_reserve(job, tracks, size)
+            if state != "wait":
+                return state == "ok" or self._full(job, size)
+            if not held:
+                held = True
+                self._held_back(job, size)
+            await asyncio.sleep(ASYNC_THROTTLE_POLL)
+
+    def release(self, job):
+        with self._cond:
+            if self._reserved.pop(job.job_id, None) is not None:
+                metrics.gauge("staging_reserved_bytes", sum(size for _, size in self._reserved.values()))
+                self._cond.notify_all()
+
+# Set by main(); None means "stage in the current directory, no admission control"
+staging = None
+
+def process_alive(pid):
+    if pid == os.getpid():
+        return True
+    if os.name != "posix":
+        return False   # os.kill() would terminate it on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+def recover_staging_folders(roots):
+    """
+    Clean up the tmpN folders a crashed or killed run left in the staging
+    *roots*. Finished tracks of a known release (those yt-dlp recorded in the
+    track log) are committed as a partial album, so a later --sync run only
+    fetches the rest; everything else is removed. Only folders with a side
+    file of this tool (job file, track log or download archive) are touched,
+    and folders of a run that is still alive are left alone.
+    """
+    host = socket.gethostname()
+    for root in dict.fromkeys(roots):
+        try:
+            names = os.listdir(root or ".")
+        except FileNotFoundError:
+            continue
+        for name in names:
+            tmp_folder = os.path.join(root, name)
+            if not _STAGING_FOLDER_RE.fullmatch(name) or os.path.islink(tmp_folder) \
+                    or not os.path.isdir(tmp_folder):
+                continue
+            track_log, archive, job_file, _ = side_files = staging_side_files(tmp_folder)
+            # A tmpN folder of another program (e.g. with --staging-dir /tmp) is none of our business
+            if not any(os.path.exists(p) for p in (job_file, track_log, archive)):
+                continue
+            try:
+                with open(job_file, "r", encoding="utf-8") as fh:
+                    info = json.load(fh)
+            except (OSError, ValueError):
+                info = {}
+            if info.get("host") == host and process_alive(info.get("pid", -1)):
+                continue
+
+            try:
+                tracks = read_track_log(track_log)
+                finished = {os.path.normpath(path) for path in tracks.values()}
+                scan = scan_staging_folder(tmp_folder)
+                # .temp.m4a and other half-written files were never reported finished
+                for path in scan.partial + [p for p in scan.other if p.endswith(".info.json")] \
+                        + [p for p in scan.complete if os.path.normpath(p) not in finished]:
+                    os.remove(path)
+                scan = scan_staging_folder(tmp_folder)
+                if info.get("item_url") and scan.complete:
+                    print(f"Recovering {len(scan.complete)} finished track(s) of {info['item_url']} from '{tmp_folder}'")
+                    finalize_album(tmp_folder, info["artist_name"], scan, item_id=item_id_from_url(info["item_url"]),
+                                   item_url=info["item_url"], tracks=tracks, status="partial")
+                    metrics.inc("staging_recovered")
+                else:
+                    debug(f"Removing orphaned staging folder '{tmp_folder}'")
+            except Exception as e:
+                print(f"Error: Could not recover '{tmp_folder}': {e}")
+                continue
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+            for path in side_files:
+                if os.path.exists(path):
+                    os.remove(path)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── DOWNLOADER (MODIFIED TO ALWAYS USE LATEST COOKIES SAFELY) ────────────────
+
+# Attempts per album; each retry only fetches tracks missing from its download archive
+MAX_DOWNLOAD_ATTEMPTS = 10
+
+# Exponential backoff between attempts: base * 2^(n-1) seconds, capped, with jitter
+RETRY_BACKOFF_BASE = 5
+RETRY_BACKOFF_MAX = 120
+
+# One JSON line per track that could not be downloaded
+FAILED_TRACKS_REPORT = "failed-tracks.jsonl"
+_report_lock = Lock()
+
+def retry_delay(attempt):
+    """Backoff before retry *attempt* (1-based), jittered so workers don't retry in lockstep."""
+    return min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+def report_failed_tracks(item_url, artist_name, failures, attempts, error, log_file=None, track_errors=None):
+    """
+    Append ``(video_id, title)`` *failures* of one album to FAILED_TRACKS_REPORT,
+    with the album's kept yt-dlp *log_file*. Each track gets its own error from
+    *track_errors* (``{video_id: message}``), the album's *error* otherwise.
+    """
+    track_errors = track_errors or {}
+    with _report_lock, open(FAILED_TRACKS_REPORT, "a", encoding="utf-8") as fh:
+        for video_id, title in failures:
+            fh.write(json.dumps({
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "artist": artist_name,
+                "item_url": item_url,
+                "item_id": item_id_from_url(item_url),
+                "video_id": video_id,
+                "title": title,
+                "attempts": attempts,
+                "error": track_errors.get(video_id, error),
+                "log": log_file,
+            }, ensure_ascii=False) + "\n")
+    print(f"Error: {len(failures)} track(s) of {item_url} failed after {attempts} attempts "
+          f"– see {FAILED_TRACKS_REPORT}" + (f" and {log_file}" if log_file else ""))
+
+# Tracks another release already downloaded: 'off', 'reference', 'link' or 'copy' (set by main())
+DEDUP_MODES = ("off", "reference", "link", "copy")
+DEDUP_MODE = "off"
+
+# Extensions of downloads yt-dlp did not finish (network stage)
+DOWNLOAD_PARTIAL_EXTENSIONS = (".part", ".ytdl")
+
+@dataclass
+class PostProcessJob:
+    """One album/single on its way through the network stage and the CPU stage."""
+    item_url: str
+    artist_name: str
+    tmp_folder: str
+    track_log: str
+    archive: str
+    expected: Optional[list] = None    # [(video_id, title)] or None if the listing failed
+    missing: list = field(default_factory=list)   # tracks the network stage could not download
+    attempts: int = 0
+    result: Optional[DownloadResult] = None       # last yt-dlp download run
+    job: Optional["DownloadJob"] = None
+    duplicates: dict = field(default_factory=dict)  # video_id → (track number, file, owner), see find_duplicates
+    output: Optional[JobOutput] = None             # yt-dlp output of both stages, kept if the job fails
+    track_errors: dict = field(default_factory=dict)  # video_id → last error yt-dlp reported for it
+
+def prepare_item(item_url, artist_name, tmp_folder, job=None):
+    """Create *tmp_folder* and its side files, resuming from the state DB; return the PostProcessJob."""
+    item_id = item_id_from_url(item_url)
+
+    # Per-job side files live next to (not inside) the staging folder
+    track_log, archive, job_file, log_file = staging_side_files(tmp_folder)
+    os.makedirs(os.path.dirname(tmp_folder) or ".", exist_ok=True)
+    for path in (track_log, archive, log_file):
+        if os.path.exists(path):
+            os.remove(path)
+    # Lets recover_staging_folders() commit what a crashed run finished; written
+    # before the folder, so every tmpN folder of ours has one
+    with open(job_file, "w", encoding="utf-8") as fh:
+        json.dump({"item_url": item_url, "artist_name": artist_name, "host": socket.gethostname(),
+                   "pid": os.getpid()}, fh, ensure_ascii=False)
+
+    if not os.path.exists(tmp_folder):
+        os.makedirs(tmp_folder)
+
+    if manifest is not None:
+        manifest.mark_status(item_id, item_url, artist_name, "pending")
+        # Resume a partial album: tracks committed earlier are skipped via the archive
+        committed = manifest.track_ids(item_id)
+        if committed:
+            with open(archive, "w", encoding="utf-8") as fh:
+                fh.writelines(f"youtube {vid}\n" for vid in sorted(committed))
+            debug(f"Resuming {item_url} – {len(committed)} tracks already committed")
+    return PostProcessJob(item_url, artist_name, tmp_folder, track_log, archive, job=job,
+                          output=JobOutput(log_file))
+
+class TrackClaims:
+    """
+    Which release of this run downloads which video ID (DEDUP_MODE), so a
+    release sharing tracks with one still in flight waits for it instead of
+    downloading them a second time. A release claims all its tracks at once
+    and only ever waits for releases that claimed before it, so the waits
+    cannot form a cycle.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._owners = {}   # video_id → item_id
+        self._stages = {}   # item_id → (handed off, committed) Events
+
+    def claim(self, item_id, video_ids):
+        """Claim *video_ids* for *item_id*; return ``{video_id: item_id}`` of those claimed earlier."""
+        with self._lock:
+            self._stages.setdefault(item_id, (Event(), Event()))
+            taken = {}
+            for video_id in video_ids:
+                owner = self._owners.setdefault(video_id, item_id)
+                if owner != item_id:
+                    taken[video_id] = owner
+            return taken
+
+    def _set(self, item_id, committed):
+        with self._lock:
+            events = self._stages.get(item_id)
+            if committed:
+                # From now on the manifest knows which of its tracks exist
+                self._owners = {vid: owner for vid, owner in self._owners.items() if owner != item_id}
+        if events:
+            events[0].set()
+            if committed:
+                events[1].set()
+
+    def handed_off(self, item_id):
+        """*item_id* left the network stage (queued for post-processing)."""
+        self._set(item_id, False)
+
+    def committed(self, item_id):
+        """*item_id* is committed, failed or cancelled."""
+        self._set(item_id, True)
+
+    def prune(self):
+        """Forget releases that are committed (end of a run or watch cycle)."""
+        with self._lock:
+            self._stages = {item_id: events for item_id, events in self._stages.items()
+                            if not events[1].is_set()}
+
+    def event(self, item_id, committed=False):
+        with self._lock:
+            events = self._stages.get(item_id)
+        return events[1 if committed else 0] if events else None
+
+    def wait(self, owners, committed=False):
+        for owner in set(owners):
+            event = self.event(owner, committed)
+            if event is not None:
+                event.wait()
+
+    async def wait_async(self, owners, committed=False):
+        for owner in set(owners):
+            event = self.event(owner, committed)
+            while event is not None and not event.is_set():
+                await asyncio.sleep(ASYNC_THROTTLE_POLL)
+
+track_claims = TrackClaims()
+
+def find_duplicates(state):
+    """
+    With DEDUP_MODE, take the expected tracks that another release already
+    downloaded – or is downloading in this run – out of this download: they
+    go into the download archive, so yt-dlp skips them, and
+    reuse_duplicates() places them after the commit.
+    """
+    if DEDUP_MODE == "off" or manifest is None or not state.expected:
+        return
+    item_id = item_id_from_url(state.item_url)
+    committed = manifest.track_ids(item_id)
+    wanted = {}
+    for number, (video_id, _) in enumerate(state.expected, 1):
+        if video_id in committed:
+            continue
+        source = manifest.track_path(video_id)
+        if source and os.path.isfile(source):
+            state.duplicates[video_id] = (number, source, None)
+        else:
+            wanted[video_id] = number
+    for video_id, owner in track_claims.claim(item_id, wanted).items():
+        state.duplicates[video_id] = (wanted[video_id], None, owner)
+    if state.duplicates:
+        with open(state.archive, "a", encoding="utf-8") as fh:
+            fh.writelines(f"youtube {vid}\n" for vid in state.duplicates)
+        debug(f"{len(state.duplicates)} of {len(state.expected)} tracks of {state.item_url} "
+              f"are downloaded by another release – not downloading them again")
+
+def pending_owners(state):
+    """Releases of this run that still have to deliver some of *state*'s duplicates."""
+    return [owner for _, source, owner in state.duplicates.values() if source is None]
+
+def resolve_duplicates(job):
+    """
+    Look up the library files of duplicates whose release was still in
+    flight (waiting for its commit); return ``(video_id, title)`` of those
+    it did not deliver, they count as failed tracks.
+    """
+    track_claims.wait(pending_owners(job), committed=True)
+    titles = dict(job.expected or [])
+    failures = []
+    for video_id, (number, source, owner) in list(job.duplicates.items()):
+        if source is None:
+            source = manifest.track_path(video_id)
+            if source and os.path.isfile(source):
+                job.duplicates[video_id] = (number, source, owner)
+                continue
+            del job.duplicates[video_id]
+            failures.append((video_id, titles.get(video_id, "")))
+            job.track_errors[video_id] = f"shared track was not delivered by {owner}"
+    return failures
+
+def unique_path(path):
+    base, ext = os.path.splitext(path)
+    index = 1
+    while os.path.exists(path):
+        path = f"{base} ({index}){ext}"
+        index += 1
+    return path
+
+def reuse_duplicates(job, item_id, tracks=None):
+    """
+    Satisfy the tracks find_duplicates() took out of *job* from the library:
+    hardlink ('link', the file keeps the other release's tags) or copy and
+    retag them like the album's downloaded *tracks* ('copy'), in the
+    committed album folder. With 'reference', or if nothing of the album
+    was downloaded, only the existing file is recorded for the album.
+    """
+    album_folder = manifest.album_folder(item_id) if manifest is not None else None
+    siblings = [os.path.join(album_folder, os.path.basename(p)) for p in (tracks or {}).values()] \
+        if album_folder else []
+    sibling = next((p for p in siblings if os.path.isfile(p)), None)
+    refs = {}
+    if DEDUP_MODE != "reference" and album_folder and os.path.isdir(album_folder):
+        with timed_acquire(artist_commit_lock(os.path.dirname(album_folder)), "commit_lock_wait"):
+            for video_id, (number, source, _) in job.duplicates.items():
+                dest = unique_path(os.path.join(album_folder, os.path.basename(source)))
+                try:
+                    if DEDUP_MODE == "link":
+                        try:
+                            os.link(source, dest)
+                            refs[video_id] = dest
+                            continue
+                        except OSError:
+                            pass   # e.g. another filesystem – fall back to a copy
+                    shutil.copy2(source, dest)
+                    if sibling:
+                        retag_like(dest, sibling, number)
+                    refs[video_id] = dest
+                except OSError as e:
+                    print(f"Error: Could not reuse '{source}' for {job.item_url}: {e}")
+            if library is not None and refs:
+                library.add_album(album_folder, len(refs), set(refs), merge=True)
+    for video_id, (_, source, _) in job.duplicates.items():
+        refs.setdefault(video_id, source)
+    if manifest is not None:
+        manifest.add_refs(item_id, refs)
+    metrics.inc("tracks_deduplicated", len(job.duplicates))
+
+def unfinished_downloads(tmp_folder):
+    return [p for p in scan_staging_folder(tmp_folder).partial if p.endswith(DOWNLOAD_PARTIAL_EXTENSIONS)]
+
+def release_throttle(result, unfinished):
+    """End one throttled run; *unfinished* is None if the staging folder could not be scanned."""
+    if throttle is not None:
+        throttle.release(bool(unfinished is not None and result is not None and result.ok and not unfinished),
+                         throttle_reason(result, unfinished) if unfinished is not None else None)
+
+def record_attempt(state, result, unfinished):
+    """Book one download attempt on *state*; return True once nothing is left to retry."""
+    state.attempts += 1
+    state.result = result
+    state.track_errors.update(result.track_errors())
+    if not result.ok:
+        debug(f"yt-dlp ({result.backend}) failed for {state.item_url} after "
+              f"{result.duration:.1f}s: {result.error}")
+    if state.expected is not None:
+        done_ids = read_download_archive(state.archive)
+        state.missing = [(vid, title) for vid, title in state.expected if vid not in done_ids]
+        if not state.missing and not unfinished:
+            return True
+        debug(f"{len(state.missing)} of {len(state.expected)} tracks missing for {state.item_url}")
+        return False
+    if not unfinished and result.ok:
+        return True
+    debug(f"Found unfinished downloads for {state.item_url}")
+    return False
+
+def end_download_stage(state, unfinished):
+    """Drop what the network stage could not finish and mark the job as post-processing."""
+    # Unfinished downloads are never post-processed
+    for path in unfinished:
+        os.remove(path)
+    if state.expected is None and unfinished:
+        state.missing = [("", os.path.splitext(os.path.splitext(os.path.basename(p))[0])[0])
+                         for p in unfinished]
+    if state.job is not None:
+        state.job.status = "postprocessing"
+
+def download_item(item_url, artist_name, tmp_folder, postprocess_pool=None, job=None):
+    """
+    Network stage: download the raw tracks of one album/single into *tmp_folder*,
+    retrying missing tracks, then hand the folder to *postprocess_pool* (or
+    post-process it right here if no pool is given). The outcome is recorded
+    on the scheduler's DownloadJob *job*, if given.
+    """
+    sanitized_artist_name = sanitize_filename(artist_name)
+    item_id = item_id_from_url(item_url)
+    state = prepare_item(item_url, artist_name, tmp_folder, job)
+
+    def run_download():
+        """One throttled yt-dlp run; returns the result and its unfinished downloads."""
+        if throttle is not None:
+            with metrics.time("throttle_wait"):
+                throttle.acquire()
+        result = unfinished = None
+        try:
+            with metrics.time("download"):
+                result = run_ytdlp(item_url, build_download_args(tmp_folder, sanitized_artist_name, state.archive),
+                                   output=state.output)
+            unfinished = unfinished_downloads(tmp_folder)
+        finally:
+            release_throttle(result, unfinished)
+        return result, unfinished
+
+    try:
+        # Expected tracks (None if the listing failed – then only leftovers are checked)
+        state.expected = job.expected if job is not None and job.listed else list_playlist_entries(item_url)
+        find_duplicates(state)
+
+        while state.attempts < MAX_DOWNLOAD_ATTEMPTS:
+            if state.attempts:
+                metrics.inc("retries")
+                delay = retry_delay(state.attempts)
+                debug(f"Retrying {item_url} in {delay:.0f}s (attempt {state.attempts + 1}/{MAX_DOWNLOAD_ATTEMPTS})")
+                time.sleep(delay)
+            result, unfinished = run_download()
+            if record_attempt(state, result, unfinished):
+                break
+
+        end_download_stage(state, unfinished)
+        # Releases this one shares tracks with commit first, so they must be queued first
+        track_claims.wait(pending_owners(state))
+        if postprocess_pool is None:
+            postprocess_item(state)
+        else:
+            postprocess_pool.submit(state)
+        track_claims.handed_off(item_id)
+    except BaseException:
+        if state.output is not None:
+            with contextlib.suppress(OSError):
+                state.output.close(keep_as=item_id)
+        track_claims.committed(item_id)
+        raise
+
+def read_info_track(info_file):
+    """``(video_id, title)`` of the track described by a yt-dlp info JSON."""
+    try:
+        with open(info_file, "r", encoding="utf-8") as fh:
+            info = json.load(fh)
+        return info.get("id", ""), info.get("title", "")
+    except (OSError, ValueError):
+        return "", os.path.basename(info_file)[:-len(".info.json")]
+
+def pending_info_files(tmp_folder):
+    return [p for p in scan_staging_folder(tmp_folder).other if p.endswith(".info.json")]
+
+def postprocess_item(job):
+    """
+    CPU stage: transcode, embed metadata and cover art track by track from the
+    info JSONs of the network stage, then tag and commit the album.
+    """
+    pp_args = build_postprocess_args(job.tmp_folder, sanitize_filename(job.artist_name), job.track_log)
+    downloaded = []
+    error = job.result.error
+    try:
+        for info_file in pending_info_files(job.tmp_folder):
+            downloaded.append(read_info_track(info_file))
+            with metrics.time("postprocess"):
+                result = run_ytdlp(info_file, pp_args, info_file=True, output=job.output)
+            if not result.ok:
+                error = job.track_errors[downloaded[-1][0]] = result.error
+                debug(f"Post-processing failed for {info_file}: {result.error}")
+            os.remove(info_file)
+        commit_item(job, downloaded, error)
+    finally:
+        track_claims.committed(item_id_from_url(job.item_url))
+
+def commit_item(job, downloaded, error):
+    """
+    Tag and commit what post-processing produced for *job*, record failed
+    tracks and clean up. *downloaded* lists the ``(video_id, title)`` handed
+    to post-processing.
+    """
+    item_id = item_id_from_url(job.item_url)
+    # Tracks without a final file failed in post-processing
+    tracks = read_track_log(job.track_log)
+    failures = list(job.missing) + [(vid, title) for vid, title in downloaded if vid not in tracks]
+    if job.duplicates:
+        failures += resolve_duplicates(job)
+
+    scan = scan_staging_folder(job.tmp_folder)
+    # Unconverted leftovers (.webm/.webp …) are never committed
+    for path in scan.partial:
+        os.remove(path)
+    failed = bool(failures) or (job.expected is None and not job.result.ok)
+    scan.partial = []
+
+    metrics.inc("tracks_downloaded", len(scan.complete))
+    metrics.inc("bytes_downloaded", sum(os.path.getsize(p) for p in scan.complete))
+    metrics.inc("albums_failed" if failed and not scan.complete
+                else "albums_partial" if failed else "albums_committed")
+    if failed:
+        metrics.inc("tracks_failed", len(failures or [("", "")]))
+
+    if scan.complete:
+        finalize_album(job.tmp_folder, job.artist_name, scan, item_id=item_id, item_url=job.item_url,
+                       tracks=tracks, status="partial" if failed else "complete")
+    else:
+        shutil.rmtree(job.tmp_folder, ignore_errors=True)
+        if manifest is not None:
+            manifest.mark_status(item_id, job.item_url, job.artist_name, "failed" if failed else "complete")
+
+    if job.duplicates:
+        reuse_duplicates(job, item_id, tracks)
+
+    # The yt-dlp log is only worth keeping when something failed
+    log_file = job.output.close(keep_as=item_id if failed else None) if job.output is not None else None
+    if failed:
+        report_failed_tracks(job.item_url, job.artist_name, failures or [("", "")], job.attempts, error, log_file,
+                             job.track_errors)
+
+    for path in staging_side_files(job.tmp_folder):
+        if os.path.exists(path):
+            os.remove(path)
+
+    if job.job is not None:
+        job.job.finish("failed" if failed and not scan.complete else "partial" if failed else "complete",
+                       error if failed else None)
+
+class PostProcessPool:
+    """
+    Worker threads for the CPU stage (ffmpeg transcodes, cover embedding,
+    tagging, commit), sized to the core count by default. Jobs arrive through
+    a bounded queue, so download workers block instead of piling up raw audio
+    when post-processing falls behind.
+    """
+
+    def __init__(self, size=None, queue_size=None):
+        self.size = max(1, size or os.cpu_count() or 1)
+        self._queue = queue.Queue(maxsize=queue_size or self.size)
+        self._threads = [Thread(target=self._worker, name=f"PostProcess-{i}", daemon=True)
+                         for i in range(self.size)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, job):
+        with metrics.time("postprocess_queue_wait"):
+            self._queue.put(job)
+        metrics.gauge("postprocess_queue_depth", self._queue.qsize())
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            metrics.gauge("postprocess_queue_depth", self._queue.qsize())
+            if job is None:
+                break
+            metrics.adjust("postprocess_active", 1)
+            try:
+                postprocess_item(job)
+            except Exception as e:
+                if job.job is not None:
+                    job.job.finish("failed", str(e))
+                log_file = None
+                if job.output is not None:
+                    with contextlib.suppress(OSError):
+                        log_file = job.output.close(keep_as=item_id_from_url(job.item_url))
+                print(f"Error: Post-processing failed for {job.item_url}: {e}"
+                      + (f" (log: {log_file})" if log_file else ""))
+            finally:
+                metrics.adjust("postprocess_active", -1)
+
+    def close(self):
+        """Wait until every queued job has been post-processed."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+
+# Job ordering within one artist's queue (artists themselves take turns)
+JOB_ORDERS = ("discovery", "new", "longest")
+# Queued jobs buffered per download thread when reading a lazy stream
+SCHEDULER_BUFFER_PER_THREAD = 4
+JOB_SUMMARY_FILE = "ytmad-jobs.json"
+# Failed and partial jobs in '-da' format, ready to be re-queued
+REQUEUE_FILE = "ytmad-requeue.txt"
+
+@dataclass
+class DownloadJob:
+    """One album/single handed to the JobScheduler, and its outcome."""
+    job_id: int
+    item_url: str
+    artist_name: str
+    priority: tuple = ()
+    listed: bool = False               # expected was fetched while queueing
+    expected: Optional[list] = None
+    status: str = "queued"             # queued → downloading → postprocessing → complete/partial/failed/skipped/cancelled
+    error: Optional[str] = None
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    staging_root: str = ""             # chosen by StagingManager.reserve()
+
+    @property
+    def tmp_folder(self):
+        return os.path.join(self.staging_root, f"tmp{self.job_id}")
+
+    @property
+    def duration(self):
+        if self.started is None:
+            return None
+        return (self.finished or time.monotonic()) - self.started
+
+    def start(self):
+        self.status, self.started = "downloading", time.monotonic()
+
+    def finish(self, status, error=None):
+        self.status, self.error, self.finished = status, error, time.monotonic()
+        if staging is not None:
+            staging.release(self)
+
+    def as_dict(self):
+        duration = self.duration
+        return {"job_id": self.job_id, "artist": self.artist_name, "item_url": self.item_url,
+                "status": self.status, "error": self.error,
+                "duration_seconds": round(duration, 3) if duration is not None else None}
+
+class JobScheduler:
+    """
+    Queue of DownloadJobs for the download workers.
+
+    Artists take turns (round robin), so one artist with 200 releases does not
+    hold up everyone else. Within an artist, jobs are ordered by *order*:
+
+    - ``discovery``: in the order they were found (newest releases first on YouTube Music)
+    - ``new``: items never seen in the state DB before earlier failed/partial ones
+    - ``longest``: most tracks first, so long albums do not finish last
+      (the track list is fetched while queueing and reused by the download)
+
+    put() blocks while *capacity* jobs are queued; get() returns None once
+    close() was called and the queue is empty. *track_counts* (``{item_id:
+    count}``, e.g. from a plan file) spares the listing for ``longest``.
+    """
+
+    def __init__(self, order="discovery", capacity=None, track_counts=None):
+        if order not in JOB_ORDERS:
+            raise ValueError(f"Unknown job order '{order}'")
+        self.order = order
+        self.capacity = capacity
+        self.track_counts = track_counts or {}
+        self.jobs = []
+        self._queues = {}                  # artist → heap of (priority, job_id, job), in turn order
+        self._queued = 0
+        self._closed = False
+        self.cancelled = False
+        self._ids = itertools.count()
+        self._cond = threading.Condition()
+
+    def _new_job(self, item_url, artist_name):
+        job = DownloadJob(next(self._ids), item_url, artist_name)
+        with self._cond:
+            self.jobs.append(job)
+        return job
+
+    def _prioritize(self, job):
+        if self.order == "new" and manifest is not None:
+            job.priority = (manifest.status(item_id_from_url(job.item_url)) is not None,)
+        elif self.order == "longest":
+            count = self.track_counts.get(item_id_from_url(job.item_url))
+            if count is None:
+                job.expected, job.listed = list_playlist_entries(job.item_url), True
+                count = len(job.expected or ())
+            job.priority = (-count,)
+
+    def put(self, item_url, artist_name):
+        job = self._new_job(item_url, artist_name)
+        self._prioritize(job)
+        with self._cond:
+            while self.capacity and self._queued >= self.capacity and not self.cancelled:
+                self._cond.wait()
+            if self.cancelled:
+                job.status = "cancelled"
+                return job
+            heapq.heappush(self._queues.setdefault(artist_name, []), (job.priority, job.job_id, job))
+            self._queued += 1
+            metrics.gauge("downloads_queued", self._queued)
+            metrics.inc("albums_queued")
+            self._cond.notify_all()
+        return job
+
+    def skip(self, item_url, artist_name):
+        """Record an item that is not downloaded (e.g. already complete in --sync mode)."""
+        job = self._new_job(item_url, artist_name)
+        job.status = "skipped"
+        return job
 
-    def run_download():
-        command = [
-            "yt-dlp",
-            "--cookies", latest_cookie_file(),
-            "--retries", "5",
-            "--retry-sleep", "5",
-            "--concurrent-fragments", "10",
-            "-f", "bestaudio",
-            "-t", "sleep",
-            "--extract-audio",
-            "--parse-metadata", "release_year:(?s)(?P<meta_date>.+)",
-            "--parse-metadata", "playlist_index:(?s)(?P<track_number>.+)",
-            "--audio-format", "m4a",
-            "--embed-metadata",
-            "--add-metadata",
-            "--embed-thumbnail",
-            "--compat-options", "filename-sanitization",
-            "--output", os.path.join(tmp_folder, sanitized_artist_name, "%(album)s/%(title)s.%(ext)s"),
-            item_url
-        ]
-        subprocess.run(command)
+    def get(self):
+        with self._cond:
+            while not self._queued and not self._closed:
+                self._cond.wait()
+            if not self._queued:
+                return None
+            # Front artist's turn; it goes to the back if it has more jobs
+            artist, heap = next(iter(self._queues.items()))
+            job = heapq.heappop(heap)[2]
+            del self._queues[artist]
+            if heap:
+                self._queues[artist] = heap
+            self._queued -= 1
+            metrics.gauge("downloads_queued", self._queued)
+            self._cond.notify_all()
+            return job
+
+    def close(self):
+        """No more jobs will be put; idle workers stop once the queue is empty."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        """Stop accepting jobs and drop the queued ones (they end up 'cancelled')."""
+        with self._cond:
+            self._closed = self.cancelled = True
+            for heap in self._queues.values():
+                for _, _, job in heap:
+                    job.status = "cancelled"
+            self._queues.clear()
+            self._queued = 0
+            metrics.gauge("downloads_queued", 0)
+            self._cond.notify_all()
+
+def write_job_summary(jobs, path=JOB_SUMMARY_FILE, requeue_file=REQUEUE_FILE):
+    """Write every job's status/error/duration to *path* and failed/partial jobs to *requeue_file*."""
+    counts = {}
+    for job in jobs:
+        counts[job.status] = counts.get(job.status, 0) + 1
+    retry = [job for job in jobs if job.status in ("failed", "partial")]
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "counts": counts,
+                   "jobs": [job.as_dict() for job in jobs]}, fh, indent=2, ensure_ascii=False)
+    if retry:
+        with open(requeue_file, "w", encoding="utf-8") as fh:
+            for job in retry:
+                href = job.item_url[len("ytsearch:"):] if job.item_url.startswith("ytsearch:") else job.item_url
+                fh.write(f"{job.artist_name}, {href}\n")
+        print(f"Error: {len(retry)} job(s) failed or are incomplete – re-queue them with "
+              f"'-da {requeue_file}'")
+    elif os.path.exists(requeue_file):
+        os.remove(requeue_file)
+    debug(f"Jobs – {counts}, summary written to '{path}'")
+
+def download_items_in_parallel(item_urls, max_threads, skip_complete=False, postprocess_threads=None,
+                               order="discovery", track_counts=None):
+    """
+    Download every ``(item_url, artist_name)`` in *item_urls* on *max_threads*
+    network workers and post-process them on *postprocess_threads* CPU workers
+    (default: one per core). Jobs are scheduled by JobScheduler with *order*
+    and *track_counts*.
+
+    *item_urls* may be a list or a lazy stream such as DiscoveryPool.discover();
+    a stream is buffered up to ``SCHEDULER_BUFFER_PER_THREAD * max_threads``
+    jobs, so downloads start with the first discovered album.
+
+    Returns the list of DownloadJobs with their final status, error and duration.
+    """
+    global throttle
+    throttle = shared_throttle(max_threads)
+    postprocess_pool = PostProcessPool(postprocess_threads)
+    capacity = None if hasattr(item_urls, "__len__") else SCHEDULER_BUFFER_PER_THREAD * max_threads
+    scheduler = JobScheduler(order, capacity, track_counts)
+    debug(f"{max_threads} download workers, {postprocess_pool.size} post-processing workers, "
+          f"job order '{order}'")
+
+    def worker():
+        while True:
+            job = scheduler.get()
+            if job is None:
+                break
+            # Held back here while the staging space is short
+            if staging is not None and not staging.reserve(job, scheduler.track_counts):
+                job.finish("failed", STAGING_FULL_ERROR)
+                continue
+            job.start()
+            metrics.adjust("downloads_active", 1)
+            try:
+                download_item(job.item_url, job.artist_name, job.tmp_folder, postprocess_pool, job=job)
+            except Exception as e:
+                job.finish("failed", str(e))
+                print(f"Error: Download of {job.item_url} failed: {e}")
+            finally:
+                metrics.adjust("downloads_active", -1)
+
+    workers = [Thread(target=worker, name=f"Download-{i}", daemon=True) for i in range(max_threads)]
+    for t in workers:
+        t.start()
+    try:
+        for item_url, artist_name in item_urls:
+            if skip_complete and manifest is not None and manifest.is_complete(item_id_from_url(item_url)):
+                scheduler.skip(item_url, artist_name)
+                metrics.inc("albums_skipped")
+                continue
+            scheduler.put(item_url, artist_name)
+    finally:
+        scheduler.close()
+        for t in workers:
+            t.join()
+        postprocess_pool.close()
+        track_claims.prune()
+
+    debug(f"Throttle – {throttle.throttle_events} throttling events, final {throttle.status()}")
+    if skip_complete:
+        skipped = sum(1 for job in scheduler.jobs if job.status == "skipped")
+        debug(f"Sync mode – {skipped} items already in '{FINISHED_FOLDER}', "
+              f"{len(scheduler.jobs) - skipped} fetched")
+    try:
+        write_job_summary(scheduler.jobs)
+    except OSError as e:
+        print(f"Error: Could not write the job summary – {e}")
+    return scheduler.jobs
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── ASYNCIO ORCHESTRATOR (TASKS INSTEAD OF THREADS, ASYNC SUBPROCESSES) ───────
+
+# Seconds between throttle polls of a waiting job
+ASYNC_THROTTLE_POLL = 0.1
+# Line limit for yt-dlp's output; progress output without newlines can get long
+ASYNC_STREAM_LIMIT = 1 << 20
+
+async def _reap(proc):
+    """Kill *proc* if it is still running (cancelled job) and wait for it."""
+    if proc.returncode is None:
+        with contextlib.suppress(ProcessLookupError):
+            proc.kill()
+        await proc.wait()
+
+async def run_ytdlp_async(item_url, args, info_file=False, output=None):
+    """run_ytdlp_subprocess() on the event loop; cancelling it kills yt-dlp."""
+    start = time.monotonic()
+    errors = []
+    target = ["--load-info-json", item_url] if info_file else [item_url]
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            YTDLP_BINARY, "--cookies", latest_cookie_file(), *args, *target,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, limit=ASYNC_STREAM_LIMIT)
+    except OSError as e:
+        return DownloadResult(False, -1, "asyncio", time.monotonic() - start, str(e))
+    try:
+        # Progress, messages and errors in one stream; keep the ERROR lines for throttle detection
+        async for raw in proc.stdout:
+            line = raw.decode(errors="replace")
+            forward_output(line, output)
+            if line.startswith("ERROR:"):
+                errors.append(line.strip())
+        await proc.wait()
+    except asyncio.CancelledError:
+        await _reap(proc)
+        raise
+    return DownloadResult(proc.returncode == 0, proc.returncode, "asyncio", time.monotonic() - start,
+                          None if proc.returncode == 0
+                          else "; ".join(errors) or f"yt-dlp exited with {proc.returncode}", errors)
+
+async def list_playlist_entries_async(item_url):
+    """list_playlist_entries() on the event loop (subprocess backend only)."""
+    if throttle is not None:
+        with metrics.time("throttle_wait"):
+            await throttle.acquire_async()
+    result = None
+    start = time.monotonic()
+    try:
+        with metrics.time("listing"):
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    YTDLP_BINARY, "--cookies", latest_cookie_file(), "--flat-playlist",
+                    "--print", "%(id)s\t%(title)s", item_url,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            except OSError as e:
+                debug(f"Could not list tracks of {item_url} – {e}")
+                result = DownloadResult(False, -1, "asyncio", time.monotonic() - start, str(e))
+                return None
+            try:
+                stdout, stderr = await proc.communicate()
+            except asyncio.CancelledError:
+                await _reap(proc)
+                raise
+        entries, result = listing_outcome(proc.returncode, stdout.decode(errors="replace"),
+                                          stderr.decode(errors="replace"), "asyncio", time.monotonic() - start)
+        return entries
+    finally:
+        # No result: the listing was cancelled or crashed – neither a clean run nor a throttling signal
+        release_throttle(result, None if result is None else [])
+
+async def download_item_async(job, postprocess_slots, executor):
+    """
+    download_item() plus postprocess_item() for one DownloadJob as a task.
+    At most *postprocess_slots* albums are post-processed at once; tagging and
+    the commit run on *executor* so they never block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    state = await loop.run_in_executor(executor, prepare_item, job.item_url, job.artist_name,
+                                       job.tmp_folder, job)
+    try:
+        await _download_item_async(job, state, postprocess_slots, executor)
+    except BaseException as e:
+        cancelled = isinstance(e, asyncio.CancelledError)
+        # A commit still running on the executor closes the log itself
+        if state.output is not None and not (cancelled and job.status == "committing"):
+            with contextlib.suppress(OSError):
+                state.output.close(keep_as=None if cancelled else item_id_from_url(job.item_url))
+        raise
+
+async def _download_item_async(job, state, postprocess_slots, executor):
+    loop = asyncio.get_running_loop()
+    sanitized_artist_name = sanitize_filename(job.artist_name)
+    metrics.adjust("downloads_active", 1)
+    try:
+        state.expected = job.expected if job.listed else await list_playlist_entries_async(job.item_url)
+        find_duplicates(state)
+        while state.attempts < MAX_DOWNLOAD_ATTEMPTS:
+            if state.attempts:
+                metrics.inc("retries")
+                delay = retry_delay(state.attempts)
+                debug(f"Retrying {job.item_url} in {delay:.0f}s "
+                      f"(attempt {state.attempts + 1}/{MAX_DOWNLOAD_ATTEMPTS})")
+                await asyncio.sleep(delay)
+            if throttle is not None:
+                with metrics.time("throttle_wait"):
+                    await throttle.acquire_async()
+            result = unfinished = None
+            try:
+                with metrics.time("download"):
+                    result = await run_ytdlp_async(
+                        job.item_url, build_download_args(job.tmp_folder, sanitized_artist_name, state.archive),
+                        output=state.output)
+                unfinished = unfinished_downloads(job.tmp_folder)
+            finally:
+                release_throttle(result, unfinished)
+            if record_attempt(state, result, unfinished):
+                break
+        end_download_stage(state, unfinished)
+    finally:
+        metrics.adjust("downloads_active", -1)
+
+    pp_args = build_postprocess_args(job.tmp_folder, sanitized_artist_name, state.track_log)
+    downloaded = []
+    error = state.result.error
+    async with postprocess_slots:
+        metrics.adjust("postprocess_active", 1)
+        try:
+            for info_file in pending_info_files(job.tmp_folder):
+                downloaded.append(read_info_track(info_file))
+                with metrics.time("postprocess"):
+                    result = await run_ytdlp_async(info_file, pp_args, info_file=True, output=state.output)
+                if not result.ok:
+                    error = state.track_errors[downloaded[-1][0]] = result.error
+                    debug(f"Post-processing failed for {info_file}: {result.error}")
+                os.remove(info_file)
+        finally:
+            metrics.adjust("postprocess_active", -1)
+
+    await track_claims.wait_async(pending_owners(state), committed=True)
+    # From here on the album is moved into the library; an interrupt lets it finish
+    job.status = "committing"
+    await loop.run_in_executor(executor, commit_item, state, downloaded, error)
+
+def discard_staging(tmp_folder):
+    """Remove a staging folder and its side files (interrupted job)."""
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    for path in staging_side_files(tmp_folder):
+        if os.path.exists(path):
+            os.remove(path)
+
+async def run_job_async(job, postprocess_slots, executor, track_counts=None):
+    try:
+        # Held back here (holding its job slot) while the staging space is short
+        if staging is not None and not await staging.reserve_async(job, track_counts):
+            job.finish("failed", STAGING_FULL_ERROR)
+            return
+        job.start()
+        await download_item_async(job, postprocess_slots, executor)
+    except asyncio.CancelledError:
+        if job.status != "committing":
+            discard_staging(job.tmp_folder)
+            job.finish("cancelled", "interrupted")
+        raise
+    except Exception as e:
+        job.finish("failed", str(e))
+        print(f"Error: Download of {job.item_url} failed: {e}")
+    finally:
+        track_claims.committed(item_id_from_url(job.item_url))
+
+async def refresh_cookies_async(session, refresh):
+    """Cookie refresher as a task: refresh() every COOKIE_DUMP_INTERVAL seconds on a worker thread."""
+    try:
+        while True:
+            await asyncio.sleep(COOKIE_DUMP_INTERVAL)
+            try:
+                debug(f"Refreshed cookies (jar version {await asyncio.to_thread(refresh)}).")
+            except Exception as e:
+                debug(f"Cookie refresh failed – {e}")
+    finally:
+        session.close()
+
+async def print_summary_async(prometheus_file=None):
+    """Live summary line as a task (see start_summary_thread)."""
+    tick, clear = summary_printer(prometheus_file)
+    try:
+        while True:
+            await asyncio.sleep(SUMMARY_INTERVAL)
+            tick()
+    finally:
+        clear()
+
+async def download_items_async(item_urls, max_jobs, skip_complete=False, postprocess_threads=None,
+                               order="discovery", user_agent=None, prometheus_file=None, track_counts=None):
+    """
+    asyncio counterpart of download_items_in_parallel(): up to *max_jobs*
+    albums are in flight as tasks instead of threads and yt-dlp runs as
+    asyncio subprocesses, so hundreds of concurrent jobs stay cheap.
+    Tagging and commits run on *postprocess_threads* executor threads;
+    discovery and the JobScheduler are fed from one thread.  The cookie
+    refresher and the summary line run as tasks of this loop.
+
+    Cancelling the task (Ctrl-C) kills the running yt-dlp processes and
+    removes the staging folders of unfinished jobs.  Returns the jobs.
+    """
+    global throttle
+    loop = asyncio.get_running_loop()
+    throttle = shared_throttle(max_jobs)
+    postprocess_size = max(1, postprocess_threads or os.cpu_count() or 1)
+    postprocess_slots = asyncio.Semaphore(postprocess_size)
+    job_slots = asyncio.Semaphore(max_jobs)
+    capacity = None if hasattr(item_urls, "__len__") else SCHEDULER_BUFFER_PER_THREAD * max_jobs
+    scheduler = JobScheduler(order, capacity, track_counts)
+    executor = concurrent.futures.ThreadPoolExecutor(postprocess_size, thread_name_prefix="Commit")
+    dispatcher = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="Dispatch")
+    debug(f"asyncio mode – {max_jobs} jobs in flight, {postprocess_size} post-processing slots, "
+          f"job order '{order}'")
 
-    def contains_webm_or_webp(folder):
-        for root, dirs, files in os.walk(folder):
-            for file in files:
-                if file.endswith(".webm") or file.endswith(".webp"):
-                    return True
+    feed_errors = []
+
+    def feed():
+        try:
+            for item_url, artist_name in item_urls:
+                if scheduler.cancelled:
+                    break
+                if skip_complete and manifest is not None and manifest.is_complete(item_id_from_url(item_url)):
+                    scheduler.skip(item_url, artist_name)
+                    metrics.inc("albums_skipped")
+                    continue
+                scheduler.put(item_url, artist_name)
+        except Exception as e:
+            feed_errors.append(e)
+        finally:
+            scheduler.close()
+
+    session, refresh = await asyncio.to_thread(cookie_refresh_session, True, user_agent)
+    background = [asyncio.create_task(refresh_cookies_async(session, refresh)),
+                  asyncio.create_task(print_summary_async(prometheus_file))]
+    Thread(target=feed, name="Feeder", daemon=True).start()
+    tasks = set()
+
+    def done(task):
+        tasks.discard(task)
+        job_slots.release()
+
+    try:
+        while True:
+            await job_slots.acquire()
+            job = await loop.run_in_executor(dispatcher, scheduler.get)
+            if job is None:
+                break
+            task = asyncio.create_task(run_job_async(job, postprocess_slots, executor, scheduler.track_counts))
+            tasks.add(task)
+            task.add_done_callback(done)
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        print("Interrupted – stopping yt-dlp and removing unfinished staging folders …")
+        scheduler.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        # Commits already handed to the executor are atomic – let them finish
+        executor.shutdown(wait=True)
+        track_claims.prune()
+        dispatcher.shutdown(wait=False)
+        debug(f"Throttle – {throttle.throttle_events} throttling events, final {throttle.status()}")
+        try:
+            write_job_summary(scheduler.jobs)
+        except OSError as e:
+            print(f"Error: Could not write the job summary – {e}")
+
+    if feed_errors:
+        raise feed_errors[0]
+    return scheduler.jobs
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── DISCOVERY POOL (N SESSIONS, STREAMED INTO THE DOWNLOADERS) ────────────────
+
+# Concurrent "see all" grid requests per artist (HTTP backend)
+GRID_FETCH_THREADS = 4
+
+class DiscoveryPool:
+    """
+    Resolve and scrape artists on up to *size* concurrent sessions.
+
+    A session is a WebDriver of its own for the Selenium backend, or the shared
+    HttpSession (one keep-alive connection per thread) for the HTTP backend.
+    Releases are put on a bounded queue as soon as they are found, so downloads
+    start while later artists are still being scraped and memory stays flat no
+    matter how long the artist list is. Sessions stay open across discover()
+    calls until close().
+
+    *release_filter(artist, hrefs)*, if given, decides which of the hrefs found
+    for the input tuple *artist* are queued (see ReleaseWatch).
+    """
+
+    def __init__(self, backend="selenium", size=1, http_session=None, queue_size=100,
+                 artist_cache=None, refresh_artists=False, record_types=False, release_filter=None):
+        self.backend = backend
+        self.release_filter = release_filter
+        # {item_href: (release type, shelf title)} of every release found, if record_types (plan files)
+        self.release_types = {} if record_types else None
+        self.artist_cache = artist_cache
+        self.refresh_artists = refresh_artists
+        self.size = max(1, size)
+        self.http_session = http_session
+        self.queue_size = queue_size
+        self.found = 0
+        self._drivers = []
+        self._idle = []     # (session, privacy_done) of finished workers, reused by the next discover()
+        self._lock = Lock()
+        self._stop = Event()
+
+    def _open_session(self):
+        if self.backend == "http":
+            return self.http_session
+        drv = build_main_driver()
+        with self._lock:
+            self._drivers.append(drv)
+        return drv
+
+    def _reuse_session(self):
+        with self._lock:
+            return self._idle.pop() if self._idle else (None, False)
+
+    def _cached(self, artist):
+        if self.artist_cache is None or self.refresh_artists:
+            return None
+        return self.artist_cache.get(artist)
+
+    def _resolve(self, session, artist):
+        encoded_artist = urllib.parse.quote(artist, safe='')
+        if self.backend == "http":
+            title, href, similarity = http_extract_artist_href(session, encoded_artist, artist)
+        else:
+            title, href, similarity = extract_artist_href(session, encoded_artist, artist)
+        if href and self.artist_cache is not None:
+            self.artist_cache.put(artist, title, href, similarity)
+        return title, href
+
+    def _scrape(self, session, artist_name, artist_href, click_privacy):
+        """All release hrefs of an artist: one artist page, then each "see all" grid."""
+        if self.backend == "http":
+            shelves = http_extract_release_shelves(session, artist_href)
+            base_url = session.base_url
+        else:
+            shelves = extract_release_shelves(session, artist_href, click_privacy)
+            base_url = YTM_BASE_URL
+        if not shelves:
+            debug(f"No release shelves found for {artist_name}.")
+
+        def shelf_hrefs(shelf):
+            """``(hrefs, {href: release type})`` of one shelf."""
+            types = {}
+            if self.backend == "http" and shelf["more"]:
+                ids = http_extract_grid_ids(session, shelf["more"], types)
+            elif shelf.get("url"):
+                return extract_grid_hrefs(session, shelf["url"], types), types
+            else:
+                ids, types = shelf["items"], shelf["types"]
+            return ([f"{base_url}/browse/{browse_id}" for browse_id in ids],
+                    {f"{base_url}/browse/{browse_id}": t for browse_id, t in types.items()})
+
+        if self.backend == "http" and len(shelves) > 1:
+            # HttpSession keeps one connection per thread, so the grids load side by side
+            with concurrent.futures.ThreadPoolExecutor(min(len(shelves), GRID_FETCH_THREADS),
+                                                       thread_name_prefix="Grid") as pool:
+                found = list(pool.map(shelf_hrefs, shelves))
+        else:
+            # A WebDriver loads one page at a time
+            found = [shelf_hrefs(shelf) for shelf in shelves]
+
+        hrefs = {}
+        for shelf, (shelf_found, types) in zip(shelves, found):
+            debug(f"Found {len(shelf_found)} releases in '{shelf['title']}' for {artist_name}")
+            for href in shelf_found:
+                # The type comes from the release itself: shelf titles are localized, and
+                # an artist with only singles has the singles shelf first
+                hrefs.setdefault(href, (types.get(href), shelf["title"]))
+        if self.release_types is not None:
+            with self._lock:
+                self.release_types.update(hrefs)
+        return list(hrefs)
+
+    def _put(self, out_q, item):
+        # Blocks while the downloaders are behind, but stays responsive to close()
+        while not self._stop.is_set():
+            try:
+                out_q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
         return False
 
-    def get_error_folder_name(base_folder):
-        index = 0
+    def _worker(self, in_q, out_q):
+        session, privacy_done = self._reuse_session()
+        try:
+            while not self._stop.is_set():
+                job = in_q.get()
+                if job is None:
+                    break
+                artist_name, artist_href = job
+                try:
+                    cached = self._cached(artist_name) if artist_href is None else None
+                    if cached:
+                        debug(f"Artist cache hit for {artist_name}")
+                        artist_name, artist_href = cached
+                    if session is None:
+                        session = self._open_session()
+                    if artist_href is None:
+                        query = artist_name
+                        artist_name, artist_href = self._resolve(session, query)
+                        privacy_done = True
+                        if not artist_href:
+                            debug(f"Kein href für {query} gefunden!")
+                            metrics.inc("artists_not_found")
+                            continue
+                    debug(f"Processing artist: {artist_name}")
+                    debug(f"Artist href found: {artist_href}")
+                    hrefs = self._scrape(session, artist_name, artist_href, not privacy_done)
+                    privacy_done = True
+                    if self.release_filter is not None:
+                        hrefs = self.release_filter(job, hrefs)
+                except Exception as e:
+                    print(f"Error: Discovery failed for {artist_name}: {e}")
+                    metrics.inc("artists_failed")
+                    continue
+                for href in hrefs:
+                    if not self._put(out_q, (href, artist_name)):
+                        return
+                    with self._lock:
+                        self.found += 1
+                    metrics.inc("releases_found")
+                    metrics.gauge("discovery_queue_depth", out_q.qsize())
+        finally:
+            # Keep the browser warm for the next discover() call
+            if session is not None:
+                with self._lock:
+                    self._idle.append((session, privacy_done))
+
+    def discover(self, artists):
+        """
+        Yield ``(item_href, artist_name)`` for every release of *artists*, an
+        iterable of ``(artist_name, artist_href)`` where ``artist_href=None``
+        means "resolve through the search page first".
+        """
+        in_q = queue.Queue(maxsize=self.size)
+        out_q = queue.Queue(maxsize=self.queue_size)
+        done = object()
+
+        def feed():
+            for artist in artists:
+                if self._stop.is_set():
+                    break
+                in_q.put(artist)
+            for _ in range(self.size):
+                in_q.put(None)
+
+        def run():
+            workers = [Thread(target=self._worker, args=(in_q, out_q), name=f"Discovery-{i}", daemon=True)
+                       for i in range(self.size)]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            self._put(out_q, done)
+
+        Thread(target=feed, name="DiscoveryFeed", daemon=True).start()
+        Thread(target=run, name="DiscoveryPool", daemon=True).start()
         while True:
-            error_folder = f"{base_folder}_Error{index}"
-            if not os.path.exists(error_folder):
-                return error_folder
-            index += 1
-
-    attempts = 0
-    max_attempts = 10
-    while attempts < max_attempts:
-        run_download()
-        attempts += 1
-        album_folder = os.path.join(tmp_folder, sanitized_artist_name)
-        if not contains_webm_or_webp(album_folder):
-            break
-        print(f"Debug: Found .webm or .webp files, retrying download attempt {attempts}/{max_attempts}")
-
-    if not contains_webm_or_webp(album_folder):
-        for root, dirs, files in os.walk(tmp_folder):
-            for file in files:
-                if file.endswith(".m4a"):
-                    file_path = os.path.join(root, file)
-                    update_metadata(file_path, artist_name)
-
-        time.sleep(1)
-        finished_folder = "music"
-        move_to_finished_folder(tmp_folder, finished_folder)
-        time.sleep(1)
-    else:
-        error_folder = get_error_folder_name(tmp_folder)
-        os.rename(tmp_folder, error_folder)
-        print(f"Error: Failed to download {item_url} after {max_attempts} attempts")
+            item = out_q.get()
+            metrics.gauge("discovery_queue_depth", out_q.qsize())
+            if item is done:
+                break
+            yield item
+        debug(f"Discovery finished – {self.found} albums and singles found")
+        if self.artist_cache is not None:
+            debug(f"Artist cache – {self.artist_cache.hits} hits, {self.artist_cache.misses} searches")
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+            self._idle = []
+        for drv in drivers:
+            try:
+                drv.quit()
+            except Exception:
+                pass
+
+def read_artist_queries(path):
+    """Yield ``(artist, None)`` for every artist name in *path* (resolved via search later)."""
+    with open(path, "r") as file:
+        for line in file:
+            artist = line.strip()
+            if artist:
+                yield artist, None
+
+def read_artist_link_list(path):
+    """Yield ``(artist_name, artist_href)`` for every line of an ``-all`` list."""
+    with open(path, 'r') as file:
+        for line in file:
+            if line.strip():
+                artist_name, artist_href = line.strip().split(",", 1)
+                yield artist_name.strip(), artist_href.strip()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── PLANS AND SHARDS (DISCOVER ONCE, DOWNLOAD ON SEVERAL HOSTS) ───────────────
+
+# Parallel track listings while writing a plan
+PLAN_LISTING_THREADS = 8
+
+def write_plan(items, path, release_types=None, listing_threads=PLAN_LISTING_THREADS):
+    """
+    Write every ``(item_url, artist_name)`` of *items* as one JSON line
+    ``{"artist", "item_id", "url", "type", "shelf", "tracks"}`` to *path*.
+    "tracks" is the expected track count (None if the listing failed), "type"
+    ('album', 'single', 'ep' or None if the release's subtitle does not say)
+    and "shelf" (its localized title, for display) come from *release_types*
+    (see DiscoveryPool). Returns the number of items written.
+    """
+    count = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh, \
+            concurrent.futures.ThreadPoolExecutor(listing_threads, thread_name_prefix="PlanListing") as pool:
+        def write(item_url, artist_name, entries):
+            release_type, shelf = (release_types or {}).get(item_url, (None, None))
+            fh.write(json.dumps({
+                "artist": artist_name,
+                "item_id": item_id_from_url(item_url),
+                "url": item_url,
+                "type": release_type,
+                "shelf": shelf or None,
+                "tracks": len(entries) if entries is not None else None,
+            }, ensure_ascii=False) + "\n")
+
+        pending = collections.deque()
+        for item_url, artist_name in items:
+            pending.append((item_url, artist_name, pool.submit(list_playlist_entries, item_url)))
+            # Keep the listings bounded and the plan in discovery order
+            while len(pending) > 2 * listing_threads or (pending and pending[0][2].done()):
+                item_url, artist_name, future = pending.popleft()
+                write(item_url, artist_name, future.result())
+                count += 1
+        while pending:
+            item_url, artist_name, future = pending.popleft()
+            write(item_url, artist_name, future.result())
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+def read_plan(path):
+    """
+    Return ``(items, track_counts)`` from a plan file: ``[(item_url,
+    artist_name), ...]`` and ``{item_id: expected track count}``.
+    """
+    items, track_counts = [], {}
+    with open(path, "r", encoding="utf-8") as fh:
+        for number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                items.append((entry["url"], entry["artist"]))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"line {number}: {e}") from None
+            if entry.get("tracks") is not None:
+                track_counts[entry.get("item_id") or item_id_from_url(entry["url"])] = entry["tracks"]
+    return items, track_counts
+
+def parse_shard(value):
+    """argparse type for ``--shard i/N`` (0 <= i < N)."""
+    try:
+        index, total = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' ist nicht im Format i/N") from None
+    if total < 1 or not 0 <= index < total:
+        raise argparse.ArgumentTypeError(f"'{value}': i muss zwischen 0 und N-1 liegen")
+    return index, total
+
+def shard_of(item_id, total):
+    """Stable shard of *item_id* – the same on every host and in every run."""
+    return int(hashlib.sha1(item_id.encode("utf-8")).hexdigest()[:16], 16) % total
+
+def in_shard(items, shard):
+    """Yield the ``(item_url, artist_name)`` of *items* that belong to *shard* ``(i, N)``."""
+    index, total = shard
+    for item in items:
+        if shard_of(item_id_from_url(item[0]), total) == index:
+            yield item
 
-def download_items_in_parallel(item_urls, max_threads):
-    semaphore = Semaphore(max_threads)
+# ──────────────────────────────────────────────────────────────────────────────
+# ── WATCH MODE (RE-CHECK EACH ARTIST ON ITS OWN SCHEDULE) ─────────────────────
+
+# Re-check interval per artist in seconds: it starts at WATCH_START_INTERVAL,
+# drops to WATCH_MIN_INTERVAL when a new release shows up and grows by
+# WATCH_BACKOFF after every check without one, up to WATCH_MAX_INTERVAL
+WATCH_MIN_INTERVAL = 6 * 3600
+WATCH_START_INTERVAL = 24 * 3600
+WATCH_MAX_INTERVAL = 14 * 24 * 3600
+WATCH_BACKOFF = 1.5
+# ± fraction added to every interval, so artists added together drift apart
+WATCH_JITTER = 0.1
+# Longest sleep between cycles (changes to the artist list are picked up after it)
+WATCH_POLL_INTERVAL = 300
+
+class ReleaseWatch:
+    """
+    Known releases and the re-check schedule of every watched artist, kept in
+    the state DB. Artists are keyed like the artist cache (normalized
+    artists.txt line). The first check of an artist queues everything it has;
+    later checks only queue browse IDs that were never seen before.
+    """
+
+    def __init__(self, path=STATE_DB_FILE):
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS watched_artists (
+                    query       TEXT PRIMARY KEY,
+                    interval    REAL NOT NULL,
+                    next_check  REAL NOT NULL,
+                    last_check  REAL,
+                    last_new    REAL
+                )""")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS known_releases (
+                    query       TEXT NOT NULL,
+                    item_id     TEXT NOT NULL,
+                    item_url    TEXT NOT NULL,
+                    first_seen  REAL NOT NULL,
+                    PRIMARY KEY (query, item_id)
+                )""")
+
+    @staticmethod
+    def _jitter(interval):
+        return interval * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER)
+
+    def _schedule(self, query):
+        row = self._db.execute(
+            "SELECT interval, next_check FROM watched_artists WHERE query = ?", (query,)).fetchone()
+        return row if row else (WATCH_START_INTERVAL, 0.0)
 
-    def worker(item_data, idx):
-        item_url, artist_name = item_data
-        tmp_folder = f"tmp{idx}"
-        with semaphore:
-            download_item(item_url, artist_name, tmp_folder)
+    def due(self, artists, now=None):
+        """
+        Return ``(due, next_check)``: the ``(artist_name, artist_href)`` of
+        *artists* whose check is due, and the earliest check time of the rest.
+        """
+        now = time.time() if now is None else now
+        due, next_check = [], None
+        with self._lock:
+            for artist in artists:
+                when = self._schedule(normalize_artist_query(artist[0]))[1]
+                if when <= now:
+                    due.append(artist)
+                elif next_check is None or when < next_check:
+                    next_check = when
+        return due, next_check
 
-    total = len(item_urls)
-    open(f"{total}_Albums_are downloaded.txt", 'w').close()
+    def begin(self, artists):
+        """Book a check of *artists*; if discovery fails, the next one is one interval later."""
+        now = time.time()
+        with self._lock, self._db:
+            for artist in artists:
+                query = normalize_artist_query(artist[0])
+                interval = self._schedule(query)[0]
+                self._db.execute(
+                    "INSERT INTO watched_artists (query, interval, next_check) VALUES (?, ?, ?) "
+                    "ON CONFLICT(query) DO UPDATE SET next_check = excluded.next_check",
+                    (query, interval, now + self._jitter(interval)))
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
-        executor.map(worker, item_urls, range(len(item_urls)))
-    os.remove(f"{total}_Albums_are downloaded.txt")
+    def observe(self, artist, hrefs):
+        """
+        DiscoveryPool release filter: record the *hrefs* found for *artist*,
+        reschedule it and return the hrefs seen for the first time, plus known
+        ones that were never committed completely (failed, partial or
+        interrupted jobs of earlier checks).
+        """
+        query = normalize_artist_query(artist[0])
+        now = time.time()
+        with self._lock, self._db:
+            known = {row[0] for row in self._db.execute(
+                "SELECT item_id FROM known_releases WHERE query = ?", (query,))}
+            new = [href for href in dict.fromkeys(hrefs) if item_id_from_url(href) not in known]
+            # A release is "known" from its first sighting on, not from its commit
+            retry = [href for href in dict.fromkeys(hrefs) if item_id_from_url(href) in known
+                     and manifest is not None and not manifest.is_complete(item_id_from_url(href))]
+            self._db.executemany(
+                "INSERT OR IGNORE INTO known_releases (query, item_id, item_url, first_seen) VALUES (?, ?, ?, ?)",
+                [(query, item_id_from_url(href), href, now) for href in new])
+            interval = self._schedule(query)[0]
+            if known and new:
+                interval = WATCH_MIN_INTERVAL
+            elif known:
+                interval = min(WATCH_MAX_INTERVAL, interval * WATCH_BACKOFF)
+            self._db.execute(
+                "INSERT OR REPLACE INTO watched_artists (query, interval, next_check, last_check, last_new) "
+                "VALUES (?, ?, ?, ?, COALESCE(?, (SELECT last_new FROM watched_artists WHERE query = ?)))",
+                (query, interval, now + self._jitter(interval), now, now if known and new else None, query))
+        if known and new:
+            metrics.inc("releases_new", len(new))
+            print(f"{len(new)} new release(s) of {artist[0]}")
+        debug(f"{artist[0]}: {len(hrefs)} releases, {len(new)} new, {len(retry)} to retry – "
+              f"next check in {interval / 3600:.1f}h")
+        return new + retry
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def watch_artists(read_artists, discovery_pool, watch, download):
+    """
+    Watch mode: every cycle, discover the artists of *read_artists()* that are
+    due and *download()* the releases *watch* has not seen before. Runs until
+    interrupted; browsers and cookies stay open between cycles.
+    """
+    while True:
+        due, next_check = watch.due(list(read_artists()))
+        if due:
+            debug(f"Watch cycle – checking {len(due)} artist(s)")
+            watch.begin(due)
+            download(discovery_pool.discover(due))
+            continue
+        sleep = WATCH_POLL_INTERVAL if next_check is None else min(WATCH_POLL_INTERVAL, next_check - time.time())
+        debug(f"Watch mode – next check in {max(0.0, sleep):.0f}s")
+        time.sleep(max(1.0, sleep))
 
 # ──────────────────────────────────────────────────────────────────────────────
 # ── CLEANUP UTILITIES (NEW) ───────────────────────────────────────────────────
 
 def cleanup_resources(main_driver=None, cookie_thread=None):
-    # ── FIX 3: proactively quit the cookie driver before/while joining the thread ──
-    global _cookie_driver
     try:
         if main_driver:
             main_driver.quit()
@@ -556,13 +4146,6 @@ def cleanup_resources(main_driver=None, cookie_thread=None):
     if cookie_thread:
         stop_cookie_refresher.set()
 
-        # try to close the cookie driver to unblock potential network waits
-        if _cookie_driver is not None:
-            try:
-                _cookie_driver.quit()
-            except Exception:
-                pass
-
         # wait at most 15 seconds
         if cookie_thread.is_alive():
             cookie_thread.join(timeout=15)
@@ -573,17 +4156,37 @@ def cleanup_resources(main_driver=None, cookie_thread=None):
             return
 
     shutil.rmtree(TMP_COOKIE_DIR, ignore_errors=True)
-    _cookie_driver = None
-    print("Debug: Cleanup completed.")
+    debug("Cleanup completed.")
+
+def write_run_report(args):
+    """Write the JSON run report and the final Prometheus textfile, then print the summary."""
+    with _wait_stats_lock:
+        waits = {page: round(seconds, 3) for page, seconds in wait_stats.items()}
+    with _round_trip_lock:
+        trips = dict(round_trip_stats)
+    extra = {
+        "arguments": {k: v for k, v in vars(args).items()},
+        "backend": DOWNLOAD_BACKEND,
+        "page_waits_seconds": waits,
+        "webdriver_round_trips": trips,
+    }
+    if throttle is not None:
+        extra["throttle"] = {"events": throttle.throttle_events, "concurrency": int(throttle.limit),
+                             "max_concurrency": throttle.max_concurrency, "rate": round(throttle.rate, 3)}
+    try:
+        metrics.write_report(args.report, extra)
+        if args.prometheus_file:
+            metrics.write_prometheus(args.prometheus_file)
+    except OSError as e:
+        print(f"Error: Could not write the run report – {e}")
+    print(f"Summary: {metrics.summary_line()}")
+    print(f"Run report written to '{args.report}'")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # ── MAIN ──────────────────────────────────────────────────────────────────────
 
 def main():
-    # Check if logincookies.txt is present
-    if not os.path.isfile(COOKIE_BOOT_FILE):
-        print(f"Error: Required '{COOKIE_BOOT_FILE}' not found! Aborting.")
-        return
+    global manifest, library, staging, DOWNLOAD_BACKEND, WAIT_CEILING, VERBOSE, SHARED_LIBRARY, DEDUP_MODE
 
     parser = argparse.ArgumentParser(
         description=(
@@ -599,7 +4202,9 @@ def main():
             "  python youtubemusicartistdownloader.py -lat\n"
             "  python youtubemusicartistdownloader.py -t 4\n"
             "  python youtubemusicartistdownloader.py -da Albums.txt\n"
-            "  python youtubemusicartistdownloader.py -t 10\n\n"
+            "  python youtubemusicartistdownloader.py -t 10\n"
+            "  python youtubemusicartistdownloader.py --sync\n"
+            "  python youtubemusicartistdownloader.py --discovery http\n\n"
             "Optionen:"
         ),
         formatter_class=argparse.RawTextHelpFormatter
@@ -616,6 +4221,27 @@ def main():
         default=1,
         help="Setzt die Anzahl gleichzeitiger Downloads (Default: 1)."
     )
+    parser.add_argument(
+        '-pp', '--postprocess-threads',
+        type=int,
+        default=None,
+        help="Anzahl der Threads für Umwandlung, Cover, Tags und Verschieben (Default: Anzahl CPU-Kerne)."
+    )
+    parser.add_argument(
+        '--order',
+        choices=JOB_ORDERS,
+        default='discovery',
+        help="Reihenfolge der Downloads je Künstler; Künstler kommen abwechselnd dran.\n"
+             "discovery: wie gefunden, new: noch nie geladene zuerst, longest: längste Alben zuerst "
+             "(Default: discovery)."
+    )
+    parser.add_argument(
+        '--asyncio',
+        action='store_true',
+        help="Steuert die Downloads mit asyncio statt mit einem Thread pro Download.\n"
+             "-t gibt dann die Anzahl gleichzeitig laufender Alben an und darf auch in die Hunderte gehen.\n"
+             "Nutzt immer das subprocess-Backend; Strg-C beendet laufende yt-dlp-Prozesse."
+    )
     parser.add_argument(
         '-all', '--artistlinklist',
         type=str,
@@ -626,20 +4252,229 @@ def main():
         type=str,
         help="Datei mit Albumliste (Format: artist_name, album_href)."
     )
+    parser.add_argument(
+        '--sync', '--resume',
+        dest='sync',
+        action='store_true',
+        help=f"Überspringt Alben, die laut '{STATE_DB_FILE}' bereits vollständig in 'music' liegen."
+    )
+
+    parser.add_argument(
+        '--discovery',
+        choices=('selenium', 'http'),
+        default='selenium',
+        help="Backend für die Suche nach Künstlern/Alben: 'selenium' (Chrome, Default)\n"
+             "oder 'http' (ohne Browser, liest ytInitialData/innertube-JSON)."
+    )
+
+    parser.add_argument(
+        '--backend',
+        choices=('auto', 'api', 'subprocess'),
+        default='auto',
+        help="yt-dlp Backend: 'api' (in-process, ein YoutubeDL pro Thread), 'subprocess'\n"
+             "(ein yt-dlp-Prozess pro Versuch) oder 'auto' (api, falls yt_dlp importierbar)."
+    )
+
+    parser.add_argument(
+        '-ds', '--discovery-sessions',
+        type=int,
+        default=1,
+        help="Anzahl paralleler Discovery-Sessions (Browser bzw. HTTP-Verbindungen, Default: 1)."
+    )
+
+    parser.add_argument(
+        '--wait-ceiling',
+        type=float,
+        default=WAIT_CEILING,
+        help=f"Maximale Wartezeit in Sekunden, bis eine Seite bzw. ein Scroll-Schritt\n"
+             f"als fertig gilt (Default: {WAIT_CEILING:g})."
+    )
+
+    parser.add_argument(
+        '--rebuild-index',
+        action='store_true',
+        help="Indiziert den Ordner 'music' neu (nach Änderungen außerhalb des Skripts) und beendet sich."
+    )
+
+    parser.add_argument(
+        '--refresh-artists',
+        action='store_true',
+        help="Ignoriert den Künstler-Cache und sucht alle Künstler aus 'artists.txt' neu."
+    )
+
+    parser.add_argument(
+        '--export-artists',
+        type=str,
+        metavar='DATEI',
+        help="Schreibt alle gecachten Künstler im '-all'-Format (artist_name, artist_href) in DATEI und beendet sich."
+    )
+
+    parser.add_argument(
+        '--dedup',
+        choices=DEDUP_MODES,
+        default='off',
+        help="Titel, die schon mit einem anderen Release (gleiche Video-ID) geladen wurden, nicht erneut laden:\n"
+             "reference: nur in der Datenbank vermerken, link: als Hardlink ins Album legen,\n"
+             "copy: kopieren und mit den Album-Tags versehen (Default: off)."
+    )
+
+    parser.add_argument(
+        '--plan-out',
+        type=str,
+        metavar='DATEI',
+        help="Sucht nur die Alben und Singles der Künstler und schreibt sie als Plan (JSONL) in DATEI,\n"
+             "ohne etwas herunterzuladen."
+    )
+
+    parser.add_argument(
+        '--plan',
+        type=str,
+        metavar='DATEI',
+        help="Lädt die Einträge eines mit '--plan-out' geschriebenen Plans herunter."
+    )
+
+    parser.add_argument(
+        '--shard',
+        type=parse_shard,
+        metavar='i/N',
+        help="Lädt nur den Teil i (0 bis N-1) von N herunter, z. B. '--shard 0/4' auf dem ersten von vier Rechnern.\n"
+             "Die Zuordnung ist stabil; 'music' darf von allen Rechnern gemeinsam genutzt werden."
+    )
+
+    parser.add_argument(
+        '--staging-dir',
+        type=str,
+        default='',
+        metavar='ORDNER',
+        help="Ordner für die temporären tmpN-Ordner (Default: aktuelles Verzeichnis)."
+    )
+
+    parser.add_argument(
+        '--staging-small-dir',
+        type=str,
+        metavar='ORDNER',
+        help=f"Ordner für Releases mit höchstens {SMALL_RELEASE_TRACKS} Titeln, z. B. ein tmpfs wie /dev/shm.\n"
+             "Passt ein Release dort nicht hinein, wird '--staging-dir' verwendet."
+    )
+
+    parser.add_argument(
+        '--min-free',
+        type=int,
+        default=STAGING_MIN_FREE // 2**20,
+        metavar='MB',
+        help="Freier Speicher, der in den tmp-Ordnern immer übrig bleiben soll; neue Downloads warten,\n"
+             f"bis genug Platz frei ist (Default: {STAGING_MIN_FREE // 2**20})."
+    )
+
+    parser.add_argument(
+        '--staging-quota',
+        type=int,
+        metavar='MB',
+        help="Höchstens so viel Platz für alle gleichzeitig laufenden Downloads reservieren\n"
+             f"(geschätzt {STAGING_TRACK_BYTES // 2**20} MB pro Titel)."
+    )
+
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help="Läuft dauerhaft und prüft jeden Künstler nach eigenem Zeitplan auf neue Alben und Singles:\n"
+             f"oft bei Künstlern, die häufig veröffentlichen, selten bei inaktiven "
+             f"({WATCH_MIN_INTERVAL // 3600} Stunden bis {WATCH_MAX_INTERVAL // 86400} Tage).\n"
+             "Geladen werden nur neu gefundene Releases; Browser und Cookies bleiben offen."
+    )
+
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help="Gibt alle Debug-Meldungen und die yt-dlp-Ausgabe aus statt der Statuszeile."
+    )
+
+    parser.add_argument(
+        '--report',
+        type=str,
+        default=RUN_REPORT_FILE,
+        metavar='DATEI',
+        help=f"JSON-Laufbericht mit Zeiten pro Phase und Zählern (Standard: {RUN_REPORT_FILE})."
+    )
+
+    parser.add_argument(
+        '--prometheus-file',
+        type=str,
+        default=PROMETHEUS_FILE,
+        metavar='DATEI',
+        help=f"Prometheus-Textdatei, die während des Laufs aktualisiert wird (Standard: {PROMETHEUS_FILE})."
+    )
 
     args = parser.parse_args()
+    VERBOSE = args.verbose
+
+    if args.export_artists:
+        artist_cache = ArtistCache(STATE_DB_FILE)
+        count = artist_cache.export(args.export_artists)
+        artist_cache.close()
+        print(f"Exported {count} artists to '{args.export_artists}'")
+        return
+
+    if args.rebuild_index:
+        manifest = DownloadManifest(STATE_DB_FILE)
+        library = LibraryIndex(FINISHED_FOLDER, STATE_DB_FILE, rebuild_if_empty=False)
+        library.rebuild()
+        library.close()
+        manifest.close()
+        return
+
+    # Check if logincookies.txt is present (after argparse so --help always works)
+    if not os.path.isfile(COOKIE_BOOT_FILE):
+        print(f"Error: Required '{COOKIE_BOOT_FILE}' not found! Aborting.")
+        return
+
+    WAIT_CEILING = args.wait_ceiling
+    # Other shards commit into the same "music" tree
+    SHARED_LIBRARY = args.shard is not None
+    DEDUP_MODE = args.dedup
+    manifest = DownloadManifest(STATE_DB_FILE)
+    library = LibraryIndex(FINISHED_FOLDER, STATE_DB_FILE)
+    artist_cache = ArtistCache(STATE_DB_FILE)
+    staging = StagingManager(args.staging_dir, args.staging_small_dir, args.min_free * 2**20,
+                             args.staging_quota * 2**20 if args.staging_quota else None)
+    if not args.plan_out:
+        # tmpN folders of a crashed run: commit their finished tracks, drop the rest
+        recover_staging_folders(staging.roots)
+    DOWNLOAD_BACKEND = resolve_download_backend(args.backend)
+    if args.asyncio and DOWNLOAD_BACKEND != "subprocess":
+        debug("asyncio mode runs yt-dlp as async subprocesses – ignoring the 'api' backend")
+        DOWNLOAD_BACKEND = "subprocess"
+    debug(f"Using yt-dlp backend '{DOWNLOAD_BACKEND}'")
+
+    def download(items, track_counts=None):
+        if args.shard:
+            items = list(in_shard(items, args.shard)) if hasattr(items, "__len__") else in_shard(items, args.shard)
+            debug(f"Shard {args.shard[0]}/{args.shard[1]}"
+                  + (f" – {len(items)} items" if hasattr(items, "__len__") else ""))
+        if args.asyncio:
+            # Cookie refresh and the summary line run as tasks of the event loop
+            return asyncio.run(download_items_async(
+                items, args.threads, skip_complete=args.sync or args.watch,
+                postprocess_threads=args.postprocess_threads,
+                order=args.order, user_agent=cookie_user_agent, prometheus_file=args.prometheus_file,
+                track_counts=track_counts))
+        return download_items_in_parallel(items, args.threads, skip_complete=args.sync or args.watch,
+                                          postprocess_threads=args.postprocess_threads, order=args.order,
+                                          track_counts=track_counts)
 
     # Start cookie refresher in background
     cookie_thread = None
+    http_session = None
+    discovery_pool = None
+    release_watch = None
+    stop_summary = None if args.asyncio else start_summary_thread(args.prometheus_file)
     try:
-        cookie_thread = start_cookie_refresher()
-
-        # Wait (briefly) for the first atomic dump to avoid starting with stale cookies
-        first_cookie_dump_ready.wait(timeout=10)
-
-        # ── FIX: create the main Selenium driver only now (after cookie check) ──
-        global driver
-        driver = build_main_driver()
+        session_cookies.load(COOKIE_BOOT_FILE)
+        # The version check (chromedriver/Chrome --version) waits until a browser is started
+        cookie_user_agent = user_agent or cached_user_agent()
+        if not args.asyncio:
+            cookie_thread = start_cookie_refresher(
+                dump_file=DOWNLOAD_BACKEND == "subprocess", user_agent=cookie_user_agent)
 
         if args.directalbum:
             album_file = args.directalbum
@@ -651,7 +4486,7 @@ def main():
                             artist_name, album_href = line.strip().split(",", 1)
                             albums.append((artist_name.strip(), album_href.strip()))
 
-                print(f"Debug: Found {len(albums)} albums in '{album_file}'")
+                debug(f"Found {len(albums)} albums in '{album_file}'")
 
                 album_urls = []
                 for artist_name, album_href in albums:
@@ -660,81 +4495,58 @@ def main():
                     else:
                         album_urls.append((f"ytsearch:{album_href}", artist_name))
 
-                download_items_in_parallel(album_urls, args.threads)
+                download(album_urls)
             except ValueError:
                 print("Error: Invalid format in album file. Each line should be: 'artist_name, album_href'")
             except FileNotFoundError:
                 print(f"Error: File '{album_file}' not found!")
             return
 
-        if args.artistlinklist:
-            artist_file = args.artistlinklist
-            artists = []
-            with open(artist_file, 'r') as file:
-                for line in file:
-                    if line.strip():
-                        artist_name, artist_href = line.strip().split(",", 1)
-                        artists.append((artist_name.strip(), artist_href.strip()))
-        else:
-            artists = []
-            with open("artists.txt", "r") as file:
-                for line in file:
-                    artist = line.strip()
-                    if artist:
-                        encoded_artist = urllib.parse.quote(artist, safe='')
-                        artist_name, artist_href = extract_artist_href(encoded_artist, artist)
-                        if artist_href:
-                            artists.append((artist_name, artist_href))
-                        else:
-                            print(f"Debug: Kein href für {artist} gefunden!")
-
-        all_hrefs = []
-
-        for artist_name, artist_href in artists:
-            print(f"Debug: Processing artist: {artist_name}")
-            if artist_href:
-                print(f"Debug: Artist href found: {artist_href}")
-                driver.get(artist_href)
-                time.sleep(1)
-
-                if args.artistlinklist:
-                    click_privacy_button()
-
-                albums_section, is_album_href = extract_section_hrefs("Albums")
-                if albums_section:
-                    if is_album_href:
-                        album_hrefs = extract_item_hrefs_from_page()
-                    else:
-                        album_hrefs = extract_item_hrefs_from_page(albums_section)
-                    print(f"Debug: Found {len(album_hrefs)} albums for {artist_name}")
-                    all_hrefs.extend([(href, artist_name) for href in album_hrefs])
-                else:
-                    print("Debug: Albums section not found.")
-
-                driver.get(artist_href)
-                time.sleep(1)
-                singles_section, is_single_href = extract_section_hrefs("Singles")
-                if singles_section:
-                    if is_single_href:
-                        single_hrefs = extract_item_hrefs_from_page()
-                    else:
-                        single_hrefs = extract_item_hrefs_from_page(singles_section)
-                    print(f"Debug: Found {len(single_hrefs)} singles for {artist_name}")
-                    all_hrefs.extend([(href, artist_name) for href in single_hrefs])
-                else:
-                    print("Debug: Singles section not found.")
-            else:
-                print("Debug: Artist href not found.")
+        if args.plan:
+            try:
+                items, track_counts = read_plan(args.plan)
+            except FileNotFoundError:
+                print(f"Error: File '{args.plan}' not found!")
+                return
+            except ValueError as e:
+                print(f"Error: Invalid plan file '{args.plan}' – {e}")
+                return
+            debug(f"Found {len(items)} items in plan '{args.plan}'")
+            download(items, track_counts)
+            return
 
-        print(f"Debug: Total {len(all_hrefs)} albums and singles to download")
+        # ── FIX: browsers are only started for discovery, one per pool session ──
+        if args.discovery == 'http':
+            http_session = HttpSession(user_agent=cookie_user_agent)
+        if args.watch and not args.plan_out:
+            release_watch = ReleaseWatch(STATE_DB_FILE)
+        discovery_pool = DiscoveryPool(args.discovery, args.discovery_sessions, http_session,
+                                       artist_cache=artist_cache, refresh_artists=args.refresh_artists,
+                                       record_types=bool(args.plan_out),
+                                       release_filter=release_watch.observe if release_watch else None)
 
-        download_items_in_parallel(all_hrefs, args.threads)
+        def read_artists():
+            if args.artistlinklist:
+                return read_artist_link_list(args.artistlinklist)
+            return read_artist_queries("artists.txt")
+
+        artists = read_artists()
+        if release_watch:
+            # Runs until Ctrl-C; the artist list is re-read every cycle
+            watch_artists(read_artists, discovery_pool, release_watch, download)
+        elif args.plan_out:
+            count = write_plan(discovery_pool.discover(artists), args.plan_out, discovery_pool.release_types)
+            print(f"Plan with {count} items written to '{args.plan_out}'")
+        else:
+            # Discovery and downloading overlap: releases stream straight into the workers
+            download(discovery_pool.discover(artists))
 
-        print("Debug: Quitting driver")
+        print_wait_stats()
+        debug("Quitting driver")
 
-        if args.livealbumtagger:
+        if args.livealbumtagger and not args.plan_out:
             if os.path.exists('livealbumtagger.py'):
-                print("Debug: Running livealbumtagger.py")
+                debug("Running livealbumtagger.py")
                 os.system('python livealbumtagger.py -p \"music\"')
             else:
                 print("Error: livealbumtagger.py not found!")
@@ -742,7 +4554,19 @@ def main():
     except KeyboardInterrupt:
         print("Interrupted by user – shutting down …")
     finally:
-        cleanup_resources(driver, cookie_thread)
+        if stop_summary:
+            stop_summary.set()
+        if discovery_pool:
+            discovery_pool.close()
+        if release_watch:
+            release_watch.close()
+        cleanup_resources(None, cookie_thread)
+        if http_session:
+            http_session.close()
+        write_run_report(args)
+        artist_cache.close()
+        library.close()
+        manifest.close()
 
 if __name__ == "__main__":
     main()